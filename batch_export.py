@@ -0,0 +1,152 @@
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib
+matplotlib.use("Agg")
+import networkx as nx
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from cba_model import load_model
+from layout_cache import LayoutCache, DEFAULT_CACHE_DIR, layout_key
+from layout_engine import get_engine, resolve_engine_name
+from scene import EDGE_WIDTH, ViewScene, generate_colors, integration_widths
+
+EXPORT_FORMATS = ("png", "svg", "pdf")
+VECTOR_FORMATS = ("svg", "pdf")
+# Views with more nodes than this are exported without labels
+EXPORT_MAX_LABELS = 500
+
+
+def file_stem(area):
+    return re.sub(r"[^A-Za-z0-9]+", "_", area).strip("_") or "area"
+
+
+def view_tasks(model, areas=None):
+    # One picklable description per view; workers rebuild the graph from plain name lists
+    names = model.store.names
+    overview_edges = list(model.overview_G.edges(data="weight"))
+    tasks = [("Overview", list(model.overview_G.nodes()), [(u, v) for u, v, _ in overview_edges],
+              generate_colors(len(model.overview_G)), integration_widths([w for _, _, w in overview_edges]))]
+    color = generate_colors(1)[0]
+    for area in sorted(model.functional_areas):
+        if areas and area not in areas:
+            continue
+        ids = model.area_ids(area)
+        src, dst = model.store.subgraph_edges(ids)
+        nodes = [names[i] for i in ids.tolist()]
+        edges = list(zip([names[i] for i in src.tolist()], [names[i] for i in dst.tolist()]))
+        tasks.append((area, nodes, edges, [color] * len(nodes), EDGE_WIDTH))
+    return tasks
+
+
+def render_view(area, nodes, edges, colors, edge_widths, out_dir, formats, dpi=100, cache_dir=None,
+                layouts=None, engine="auto"):
+    start = time.perf_counter()
+    graph = nx.DiGraph()
+    graph.add_nodes_from(nodes)
+    graph.add_edges_from(edges)
+
+    engine_name = resolve_engine_name(engine, graph)
+    layout_engine = get_engine(engine_name)
+    cache = LayoutCache(max_entries=4, cache_dir=cache_dir)
+    cache.preload(layouts or {})
+    graph_hash = layout_key(graph, engine_name)
+    cached = cache.get(area, graph_hash) is not None
+    pos = cache.layout(area, graph, lambda g, initial: layout_engine.compute(g, initial), graph_hash=graph_hash)
+
+    figure = Figure(figsize=(12, 10), dpi=dpi)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.axis('off')
+    ax.set_title(f"CBA System Visualization - {area}")
+    scene = ViewScene(ax, graph_hash, nodes, pos, edges, colors, edge_widths=edge_widths,
+                      max_labels=EXPORT_MAX_LABELS)
+    ax.set_xlim(*scene.limits[0])
+    ax.set_ylim(*scene.limits[1])
+
+    paths = []
+    for fmt in formats:
+        # Arrowheads are sized in display units, so recompute them at the dpi being written
+        figure.set_dpi(72 if fmt in VECTOR_FORMATS else dpi)
+        scene.refresh_arrows()
+        path = os.path.join(out_dir, f"{file_stem(area)}.{fmt}")
+        figure.savefig(path, format=fmt, dpi=figure.dpi)
+        paths.append(path)
+    return area, paths, cached, time.perf_counter() - start
+
+
+def export_views(model, out_dir, formats=("png",), jobs=None, dpi=100, cache_dir=None, layouts=None,
+                 areas=None):
+    os.makedirs(out_dir, exist_ok=True)
+    layouts = layouts or {}
+    tasks = view_tasks(model, areas)
+    # Largest views first so the pool does not finish on one long straggler
+    tasks.sort(key=lambda task: len(task[1]) + len(task[2]), reverse=True)
+
+    def arguments(task):
+        area = task[0]
+        area_layouts = {key: pos for key, pos in layouts.items() if key[0] == area}
+        return task + (out_dir, formats, dpi, cache_dir, area_layouts)
+
+    results = []
+    if jobs == 1:
+        for task in tasks:
+            results.append(render_view(*arguments(task)))
+            print(f"Exported {results[-1][0]}")
+        return results
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(render_view, *arguments(task)) for task in tasks]
+        for future in as_completed(futures):
+            results.append(future.result())
+            print(f"Exported {results[-1][0]}")
+    return results
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Render CBA diagrams without a display")
+    parser.add_argument("out_dir", help="Directory to write the diagrams to")
+    parser.add_argument("--inventory", action="append", metavar="FILE",
+                        help="Asset/edge inventory (.jsonl or .csv); may be given more than once")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="Open a binary snapshot instead of building the model")
+    parser.add_argument("--format", action="append", choices=EXPORT_FORMATS,
+                        help="Output format; may be given more than once (default: png)")
+    parser.add_argument("--area", action="append", metavar="AREA",
+                        help="Only export this functional area (plus the overview); may be repeated")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="Worker processes (default: %(default)s)")
+    parser.add_argument("--dpi", type=int, default=100, help="Raster resolution (default: %(default)s)")
+    parser.add_argument("--layout-cache", default=os.environ.get("CBA_LAYOUT_CACHE", DEFAULT_CACHE_DIR),
+                        help="Directory for persisted layouts (default: %(default)s)")
+    parser.add_argument("--no-layout-cache", action="store_true",
+                        help="Do not read or write persisted layouts")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    model, layouts = load_model(args.inventory, args.snapshot)
+    if args.area:
+        unknown = sorted(set(args.area) - set(model.functional_areas))
+        if unknown:
+            print(f"Unknown functional areas: {', '.join(unknown)}")
+            return 1
+    results = export_views(model, args.out_dir, formats=args.format or ["png"], jobs=args.jobs, dpi=args.dpi,
+                           cache_dir=None if args.no_layout_cache else args.layout_cache, layouts=layouts,
+                           areas=args.area)
+    reused = sum(1 for _, _, cached, _ in results if cached)
+    files = sum(len(paths) for _, paths, _, _ in results)
+    print(f"Wrote {files} files for {len(results)} views ({reused} cached layouts) "
+          f"in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,243 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# Everything runs without a display
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+# The application imports networkx on first use; imported here so the first load is not charged for it
+import networkx
+import numpy as np
+from PyQt5.QtWidgets import QApplication
+
+from cba_model import CBAModel, load_model
+from cba_visualization import CBAVisualization
+from instrumentation import tracer
+from snapshot import save_snapshot
+from synthetic_estate import SyntheticEstate
+
+DEFAULT_SIZES = (100, 1_000, 10_000, 100_000)
+# "All Assets" is only benchmarked up to this many assets
+ALL_ASSETS_LIMIT = 10_000
+# Largest areas switched to at every size
+SWITCH_AREAS = 5
+DRAW_REPEATS = 5
+PICK_SAMPLES = 1000
+# Longest wait for one view to be laid out and drawn, in seconds
+VIEW_TIMEOUT = 600
+# A result regresses when it is slower than the baseline by more than the tolerance and by more
+# than the noise floor in seconds
+DEFAULT_TOLERANCE = 0.25
+NOISE_FLOOR = 0.0002
+APPLICATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cba_visualization.py")
+
+
+def _median(values):
+    return float(np.median(values)) if len(values) else 0.0
+
+
+class Benchmark:
+    def __init__(self, app, seed=0):
+        self.app = app
+        self.seed = seed
+        self.results = []
+
+    def record(self, name, assets, seconds, **extra):
+        self.results.append(dict(name=name, assets=assets, seconds=seconds, **extra))
+        print(f"{assets:>8} {name:<28}{seconds * 1000:>12.2f} ms")
+
+    def wait_for_view(self, window, area):
+        deadline = time.perf_counter() + VIEW_TIMEOUT
+        while window.view_area != area:
+            if time.perf_counter() > deadline:
+                raise RuntimeError(f"Timed out waiting for {area}")
+            window.layout_worker.wait()
+            self.app.processEvents()
+
+    def switch_to(self, window, area):
+        # From picking the area to the view drawn on the canvas
+        start = time.perf_counter()
+        window.area_selector.setCurrentText(area)
+        self.wait_for_view(window, area)
+        window.canvas.draw()
+        return time.perf_counter() - start
+
+    def count_overview_edges(self, model):
+        # The incremental aggregation on its own: every edge counted into an empty overview, as
+        # add_edge counts it while an inventory loads
+        store = model.store
+        areas = [store.record(i).area for i in range(len(store))]
+        src, dst = store.edge_arrays()
+        counted = CBAModel()
+        start = time.perf_counter()
+        for s, t in zip(src.tolist(), dst.tolist()):
+            counted._count_integration(areas[s], areas[t], +1)
+        seconds = time.perf_counter() - start
+        assert sorted(counted.overview_G.edges(data="weight")) == sorted(model.overview_G.edges(data="weight"))
+        return seconds
+
+    def run_size(self, size, workdir):
+        path = os.path.join(workdir, f"estate_{size}.jsonl")
+        SyntheticEstate(size, seed=self.seed).write_jsonl(path)
+
+        start = time.perf_counter()
+        model, _ = load_model([path])
+        self.record("load inventory", size, time.perf_counter() - start)
+        self.record("overview edge counting", size, self.count_overview_edges(model))
+        snapshot_path = os.path.join(workdir, f"estate_{size}.cbasnap")
+        save_snapshot(model, snapshot_path)
+        tracer.clear()
+        start = time.perf_counter()
+        load_model(None, snapshot_path)
+        self.record("load snapshot", size, time.perf_counter() - start)
+        self.record("snapshot overview read", size, tracer.recent("overview load", 1)[-1] / 1000)
+        del model
+
+        # A fresh process up to the first view on screen, broken down by the application's own report
+        report_path = os.path.join(workdir, f"startup_{size}.json")
+        start = time.perf_counter()
+        subprocess.run([sys.executable, APPLICATION, "--inventory", path, "--no-layout-cache",
+                        "--startup-report", report_path, "--quit-after-startup"],
+                       check=True, capture_output=True, timeout=VIEW_TIMEOUT)
+        self.record("cold start", size, time.perf_counter() - start)
+        with open(report_path, "r", encoding="utf-8") as f:
+            startup = json.load(f)
+        for step in ("imports", "first paint", "first view"):
+            self.record(f"startup {step}", size, startup[step])
+
+        # Window shell, model and the overview laid out and drawn, as at startup
+        start = time.perf_counter()
+        window = CBAVisualization(inventory_paths=[path], layout_cache_dir=None)
+        window.show()
+        self.wait_for_view(window, "Overview")
+        window.canvas.draw()
+        self.record("window first view", size, time.perf_counter() - start)
+
+        areas = sorted(window.functional_areas, key=lambda area: -len(window.functional_areas[area]))
+        areas = areas[:SWITCH_AREAS]
+        if size <= ALL_ASSETS_LIMIT:
+            areas.append("All Assets")
+        tracer.clear()
+        cold = [self.switch_to(window, area) for area in areas]
+        self.record("area switch", size, _median(cold), max=max(cold), views=len(areas))
+        self.record("layout", size, _median(tracer.recent("layout")) / 1000)
+        self.record("artist creation", size, _median(tracer.recent("artist creation")) / 1000)
+        # Back to views whose layouts and artists are kept
+        self.switch_to(window, "Overview")
+        warm = [self.switch_to(window, area) for area in areas]
+        self.record("area switch (cached)", size, _median(warm), max=max(warm))
+
+        # The most crowded view is drawn and picked on
+        busiest = areas[-1] if size <= ALL_ASSETS_LIMIT else areas[0]
+        self.switch_to(window, busiest)
+        draws = []
+        for _ in range(DRAW_REPEATS):
+            start = time.perf_counter()
+            window.canvas.draw()
+            draws.append(time.perf_counter() - start)
+        self.record("full draw", size, _median(draws), view=busiest, nodes=len(window.scene.nodes))
+
+        rng = np.random.default_rng(self.seed)
+        bbox = window.ax.bbox
+        # Half the picks land on drawn nodes, half anywhere in the axes
+        on_nodes = window.ax.transData.transform(window.scene.xy[rng.integers(0, len(window.scene.xy),
+                                                                               PICK_SAMPLES // 2)])
+        anywhere = np.column_stack([rng.uniform(bbox.x0, bbox.x1, PICK_SAMPLES // 2),
+                                    rng.uniform(bbox.y0, bbox.y1, PICK_SAMPLES // 2)])
+        picks = []
+        for x, y in np.concatenate([on_nodes, anywhere]).tolist():
+            start = time.perf_counter()
+            window.hit_test(x, y)
+            picks.append(time.perf_counter() - start)
+        self.record("pick", size, _median(picks), p95=float(np.percentile(picks, 95)), view=busiest)
+
+        window.close()
+        window.deleteLater()
+        self.app.processEvents()
+
+
+def compare(results, baseline, tolerance):
+    # Marks every result that has a baseline with its threshold and whether it regressed
+    previous = {(r["name"], r["assets"]): r["seconds"] for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        seconds = previous.get((result["name"], result["assets"]))
+        if seconds is None:
+            continue
+        result["baseline"] = seconds
+        result["threshold"] = max(seconds * (1 + tolerance), seconds + NOISE_FLOOR)
+        result["regressed"] = result["seconds"] > result["threshold"]
+        if result["regressed"]:
+            regressions.append(result)
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark loading, layout, drawing and picking on synthetic "
+                                                 "estates, without a display")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), metavar="N",
+                        help="Estate sizes in assets (default: %(default)s)")
+    parser.add_argument("--out", default="benchmark_results.json",
+                        help="JSON file to write the results to (default: %(default)s)")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="Earlier results to check for regressions; exits 1 if any are found")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown against the baseline as a fraction (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic estates (default: %(default)s)")
+    parser.add_argument("--keep", metavar="DIR",
+                        help="Write the generated inventories and snapshots here instead of a temporary directory")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    benchmark = Benchmark(app, seed=args.seed)
+    if args.keep:
+        os.makedirs(args.keep, exist_ok=True)
+        for size in args.sizes:
+            benchmark.run_size(size, args.keep)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            for size in args.sizes:
+                benchmark.run_size(size, workdir)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(benchmark.results, json.load(f), args.tolerance)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.machine(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "tolerance": args.tolerance,
+        "results": benchmark.results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"Results written to {args.out}")
+    for result in regressions:
+        print(f"Regression: {result['name']} at {result['assets']} assets took {result['seconds'] * 1000:.2f} ms, "
+              f"threshold {result['threshold'] * 1000:.2f} ms")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,636 @@
+from graph_store import AssetMap, AssetRecord, GraphStore
+from instrumentation import span
+
+# Built-in sample estate, used when no inventory file is given
+SAMPLE_ASSETS = {
+    "Portico": {
+        "area": "Pre-Sales",
+        "description": "Cloud-based fleet design and asset utilization tool for Managed Print Services.",
+        "key_features": [
+            "Fleet design optimization",
+            "Asset utilization analysis",
+            "TCO calculation",
+            "Proposal generation"
+        ],
+        "related_systems": ["DART", "HP Dynamics"],
+        "data_flow": "Sends optimized fleet designs to DART for pricing",
+        "business_impact": "Improves win rates by providing optimized fleet designs and accurate TCO projections"
+    },
+    "HP Dynamics": {
+        "area": "Sales",
+        "description": "Sales platform for relationship management and opportunity creation.",
+        "key_features": [
+            "Customer relationship management",
+            "Opportunity tracking",
+            "Sales pipeline management",
+            "Integration with other CBA tools"
+        ],
+        "related_systems": ["DART", "Portico"],
+        "data_flow": "Receives customer data from Portico, sends opportunity data to DART",
+        "business_impact": "Centralizes customer information and streamlines the sales process"
+    },
+    "DART": {
+        "area": "Sales",
+        "description": "Deal Analysis Response Tool for creating CBA-compliant deals and pricing.",
+        "key_features": [
+            "Pricing engine",
+            "Deal structuring",
+            "Compliance checking",
+            "Approval workflow"
+        ],
+        "related_systems": ["Portico", "HP Dynamics", "MPC"],
+        "data_flow": "Receives fleet designs from Portico, pricing requests from HP Dynamics, sends structured deals to MPC",
+        "business_impact": "Ensures consistent and compliant pricing across all deals"
+    },
+    "MPC": {
+        "area": "Sales",
+        "description": "Managed Print Central, a web-based application for partners to create and manage CBA contracts.",
+        "key_features": [
+            "Contract creation and management",
+            "Partner portal",
+            "Integration with billing systems"
+        ],
+        "related_systems": ["DART", "TMC"],
+        "data_flow": "Receives structured deals from DART, sends contract information to TMC",
+        "business_impact": "Streamlines contract management and improves partner experience"
+    },
+    "TMC": {
+        "area": "Transition Management",
+        "description": "Transition Management Central, manages transition to account/contract management through service delivery.",
+        "key_features": [
+            "Project management",
+            "Service delivery coordination",
+            "Status tracking and reporting"
+        ],
+        "related_systems": ["MPC", "Broker"],
+        "data_flow": "Receives contract information from MPC, sends transition plans to Broker",
+        "business_impact": "Ensures smooth transition from sales to service delivery, improving customer satisfaction"
+    },
+    "Broker": {
+        "area": "Transition Management",
+        "description": "Workflow engine for onboarding data, bridging TMC, SAP, and ITSM.",
+        "key_features": [
+            "Data transformation",
+            "System integration",
+            "Workflow automation"
+        ],
+        "related_systems": ["TMC", "ITSM ServiceNow"],
+        "data_flow": "Receives transition plans from TMC, sends onboarding data to ITSM ServiceNow",
+        "business_impact": "Automates and streamlines the onboarding process, reducing errors and improving efficiency"
+    },
+    "ITSM ServiceNow": {
+        "area": "Asset Management",
+        "description": "IT Service Management platform for managing assets and services.",
+        "key_features": [
+            "Asset tracking",
+            "Service catalog",
+            "Incident management",
+            "Change management"
+        ],
+        "related_systems": ["Broker", "MS4"],
+        "data_flow": "Receives onboarding data from Broker, sends asset information to MS4",
+        "business_impact": "Centralizes asset management and improves service delivery efficiency"
+    },
+    "MS4": {
+        "area": "Entitlement, Billing & Invoicing",
+        "description": "Master data replication system.",
+        "key_features": [
+            "Data synchronization",
+            "Master data management",
+            "Data quality assurance"
+        ],
+        "related_systems": ["ITSM ServiceNow", "S4"],
+        "data_flow": "Receives asset information from ITSM ServiceNow, replicates master data to S4",
+        "business_impact": "Ensures data consistency across systems, improving reporting accuracy"
+    },
+    "S4": {
+        "area": "Entitlement, Billing & Invoicing",
+        "description": "SAP S/4HANA system for financial processes.",
+        "key_features": [
+            "Financial accounting",
+            "Contract management",
+            "Billing and invoicing"
+        ],
+        "related_systems": ["MS4", "BRIM"],
+        "data_flow": "Receives master data from MS4, sends billing information to BRIM",
+        "business_impact": "Centralizes financial processes and improves financial reporting"
+    },
+    "BRIM": {
+        "area": "Entitlement, Billing & Invoicing",
+        "description": "Billing and Revenue Innovation Management system.",
+        "key_features": [
+            "Complex billing scenarios",
+            "Revenue recognition",
+            "Subscription management"
+        ],
+        "related_systems": ["S4", "CC/CM"],
+        "data_flow": "Receives billing information from S4, sends charging data to CC/CM",
+        "business_impact": "Enables flexible billing models and improves revenue management"
+    },
+    "CC/CM": {
+        "area": "Entitlement, Billing & Invoicing",
+        "description": "Convergent Charging and Mediation system.",
+        "key_features": [
+            "Usage-based charging",
+            "Real-time rating",
+            "Mediation of usage data"
+        ],
+        "related_systems": ["BRIM", "Usage Service"],
+        "data_flow": "Receives charging data from BRIM, processes usage data from Usage Service",
+        "business_impact": "Enables accurate usage-based billing and improves billing flexibility"
+    },
+    "CDAX": {
+        "area": "Case Management",
+        "description": "Custom version of Microsoft Dynamics CRM for HP Customer Support.",
+        "key_features": [
+            "Case tracking",
+            "Customer interaction history",
+            "Knowledge base integration",
+            "Service level agreement (SLA) tracking"
+        ],
+        "related_systems": ["DCC", "ITSM ServiceNow"],
+        "data_flow": "Receives customer support requests from DCC, sends case information to ITSM ServiceNow",
+        "business_impact": "Improves customer support efficiency and enhances customer satisfaction"
+    },
+    "DCC": {
+        "area": "Customer Portal",
+        "description": "Device Control Center, interface for customers to view and manage their fleet.",
+        "key_features": [
+            "Fleet overview",
+            "Device status monitoring",
+            "Supply ordering",
+            "Service request initiation"
+        ],
+        "related_systems": ["CDAX", "ARC"],
+        "data_flow": "Sends customer requests to CDAX, receives supply status from ARC",
+        "business_impact": "Enhances customer experience and reduces support calls through self-service capabilities"
+    },
+    "ARC": {
+        "area": "Replenishment",
+        "description": "Automated Reordering of Consumables, manages supplies orders and distribution.",
+        "key_features": [
+            "Automated supply ordering",
+            "Inventory management",
+            "Order tracking",
+            "Predictive analytics for supply needs"
+        ],
+        "related_systems": ["DCC", "HP Direct"],
+        "data_flow": "Receives supply status from DCC, sends orders to HP Direct",
+        "business_impact": "Reduces supply outages and optimizes inventory levels, improving customer satisfaction"
+    },
+    "HP Direct": {
+        "area": "Replenishment",
+        "description": "Direct fulfillment service for supplies orders.",
+        "key_features": [
+            "Order processing",
+            "Warehouse management",
+            "Shipping and logistics",
+            "Return handling"
+        ],
+        "related_systems": ["ARC", "Usage Service"],
+        "data_flow": "Receives orders from ARC, sends fulfillment data to Usage Service",
+        "business_impact": "Ensures timely delivery of supplies, reducing customer downtime"
+    },
+    "Usage Service": {
+        "area": "Telemetry Processor",
+        "description": "Processes telemetry data, analyzes supplies levels, and determines fulfillment needs.",
+        "key_features": [
+            "Real-time data processing",
+            "Supplies level monitoring",
+            "Usage pattern analysis",
+            "Predictive maintenance"
+        ],
+        "related_systems": ["HP Direct", "Fulfillment Service"],
+        "data_flow": "Receives telemetry data from devices, sends usage data to Fulfillment Service",
+        "business_impact": "Enables proactive supply replenishment and reduces device downtime"
+    },
+    "Fulfillment Service": {
+        "area": "Telemetry Processor",
+        "description": "Determines auto-replenishment needs based on usage data.",
+        "key_features": [
+            "Auto-replenishment algorithms",
+            "Supply chain optimization",
+            "Demand forecasting",
+            "Integration with ARC"
+        ],
+        "related_systems": ["Usage Service", "ARC"],
+        "data_flow": "Receives usage data from Usage Service, sends replenishment requests to ARC",
+        "business_impact": "Optimizes supply chain efficiency and reduces costs associated with overstocking or stockouts"
+    },
+    "HP SDS": {
+        "area": "Device Connectivity",
+        "description": "Smart Device Services, provides advanced monitoring and management capabilities.",
+        "key_features": [
+            "Remote device monitoring",
+            "Predictive maintenance",
+            "Firmware updates",
+            "Security management"
+        ],
+        "related_systems": ["JAM", "Usage Service"],
+        "data_flow": "Collects device data, sends to JAM and Usage Service",
+        "business_impact": "Improves device uptime and reduces service costs through predictive maintenance"
+    },
+    "JAM": {
+        "area": "Device Connectivity",
+        "description": "JetAdvantage Management, part of the device connectivity and management ecosystem.",
+        "key_features": [
+            "Device fleet management",
+            "Security policy enforcement",
+            "Remote configuration",
+            "Reporting and analytics"
+        ],
+        "related_systems": ["HP SDS", "Stratus"],
+        "data_flow": "Receives device data from HP SDS, sends management commands to Stratus",
+        "business_impact": "Centralizes device management, improving operational efficiency and security"
+    },
+    "Stratus": {
+        "area": "Device Connectivity",
+        "description": "Handles IoT connectivity and device management in the cloud.",
+        "key_features": [
+            "Cloud-based device connectivity",
+            "Data aggregation",
+            "Device provisioning",
+            "Scalable IoT infrastructure"
+        ],
+        "related_systems": ["JAM", "JAMc"],
+        "data_flow": "Receives management commands from JAM, sends device data to JAMc",
+        "business_impact": "Provides scalable and reliable infrastructure for device connectivity and management"
+    },
+    "JAMc": {
+        "area": "Device Connectivity",
+        "description": "JAM Connector, facilitates connection and management of devices.",
+        "key_features": [
+            "Device discovery",
+            "Connection brokering",
+            "Protocol translation",
+            "Data normalization"
+        ],
+        "related_systems": ["Stratus", "FM Audit Server"],
+        "data_flow": "Receives device data from Stratus, sends normalized data to FM Audit Server",
+        "business_impact": "Enables seamless integration of diverse device types into the management ecosystem"
+    },
+    "FM Audit Server": {
+        "area": "Device Connectivity",
+        "description": "Fleet Management Auditing server for comprehensive data collection.",
+        "key_features": [
+            "Device data collection",
+            "Usage auditing",
+            "Compliance checking",
+            "Historical data storage"
+        ],
+        "related_systems": ["JAMc", "FM Audit Agent"],
+        "data_flow": "Receives normalized data from JAMc, sends audit instructions to FM Audit Agent",
+        "business_impact": "Provides accurate and comprehensive fleet data for billing and management purposes"
+    },
+    "FM Audit Agent": {
+        "area": "Device Connectivity",
+        "description": "Local data collection agent for FM Audit.",
+        "key_features": [
+            "Local device discovery",
+            "Secure data collection",
+            "Offline data caching",
+            "Bandwidth optimization"
+        ],
+        "related_systems": ["FM Audit Server", "BIRD"],
+        "data_flow": "Receives audit instructions from FM Audit Server, sends collected data to BIRD",
+        "business_impact": "Ensures accurate data collection even in challenging network environments"
+    },
+    "BIRD": {
+        "area": "Business Intelligence",
+        "description": "Business Intelligence Reporting Dashboard, used for various reporting and data management tasks.",
+        "key_features": [
+            "Data visualization",
+            "Custom report generation",
+            "KPI tracking",
+            "Predictive analytics"
+        ],
+        "related_systems": ["FM Audit Agent", "Fleet Ops"],
+        "data_flow": "Receives collected data from FM Audit Agent, sends analytics to Fleet Ops",
+        "business_impact": "Provides actionable insights for decision-making and business optimization"
+    },
+    "Fleet Ops": {
+        "area": "Fleet Operations",
+        "description": "Manages device operations, including remote diagnostics and remediation.",
+        "key_features": [
+            "Remote diagnostics",
+            "Proactive maintenance",
+            "Fleet optimization",
+            "Service dispatch management"
+        ],
+        "related_systems": ["BIRD", "HP SDS"],
+        "data_flow": "Receives analytics from BIRD, sends operational commands to HP SDS",
+        "business_impact": "Maximizes fleet uptime and efficiency through proactive management and optimization"
+    }
+}
+
+SAMPLE_EDGES = [
+    ("Portico", "DART"),
+    ("Portico", "HP Dynamics"),
+    ("HP Dynamics", "DART"),
+    ("DART", "MPC"),
+    ("MPC", "TMC"),
+    ("TMC", "Broker"),
+    ("Broker", "ITSM ServiceNow"),
+    ("ITSM ServiceNow", "MS4"),
+    ("MS4", "S4"),
+    ("S4", "BRIM"),
+    ("BRIM", "CC/CM"),
+    ("CC/CM", "Usage Service"),
+    ("CDAX", "DCC"),
+    ("DCC", "ARC"),
+    ("ARC", "HP Direct"),
+    ("HP Direct", "Usage Service"),
+    ("Usage Service", "Fulfillment Service"),
+    ("Fulfillment Service", "ARC"),
+    ("HP SDS", "JAM"),
+    ("JAM", "Stratus"),
+    ("Stratus", "JAMc"),
+    ("JAMc", "FM Audit Server"),
+    ("FM Audit Server", "FM Audit Agent"),
+    ("FM Audit Agent", "BIRD"),
+    ("BIRD", "Fleet Ops"),
+    ("Fleet Ops", "HP SDS"),
+    ("ITSM ServiceNow", "CDAX"),
+    ("DCC", "CDAX"),
+    ("Usage Service", "HP SDS"),
+    ("JAM", "HP SDS"),
+    ("BRIM", "S4"),
+    ("CC/CM", "BRIM"),
+    ("Fulfillment Service", "HP Direct"),
+    ("ARC", "Fulfillment Service"),
+    ("JAMc", "Stratus"),
+    ("FM Audit Server", "JAMc"),
+    ("BIRD", "FM Audit Server"),
+    ("Fleet Ops", "BIRD"),
+    ("HP SDS", "Fleet Ops"),
+    ("CDAX", "ITSM ServiceNow"),
+    ("S4", "MS4"),
+    ("Usage Service", "CC/CM"),
+    ("HP Dynamics", "Portico"),
+    ("MPC", "DART"),
+    ("TMC", "MPC"),
+    ("Broker", "TMC"),
+    ("ITSM ServiceNow", "Broker"),
+    ("MS4", "ITSM ServiceNow"),
+    ("S4", "BRIM"),
+    ("CC/CM", "BRIM"),
+    ("DCC", "CDAX"),
+    ("ARC", "DCC"),
+    ("HP Direct", "ARC"),
+    ("Usage Service", "HP Direct"),
+    ("Fulfillment Service", "Usage Service"),
+    ("JAM", "HP SDS"),
+    ("Stratus", "JAM"),
+    ("JAMc", "Stratus"),
+    ("FM Audit Server", "JAMc"),
+    ("FM Audit Agent", "FM Audit Server"),
+    ("BIRD", "FM Audit Agent"),
+    ("Fleet Ops", "BIRD")
+]
+
+class CBAModel:
+    def __init__(self, store=None):
+        # Imported here so the window can be shown before networkx has loaded
+        import networkx as nx
+        self.store = store if store is not None else GraphStore()
+        self.overview_G = nx.DiGraph()
+        self.functional_areas = {}
+        # Per area: member name -> position in its functional_areas list, built on the first removal
+        self._area_positions = {}
+        # Read-only name -> AssetRecord mapping backed by the store
+        self.assets = AssetMap(self.store)
+        self.version = 0
+        self._G = None
+        self._area_ids = {}
+        self._subgraphs = {}
+        self._reachability = None
+        self._search = None
+        self._clusters = {}
+
+    @property
+    def G(self):
+        # Structure-only networkx view of the whole estate, built on first use
+        if self._G is None:
+            with span("graph build", view="estate"):
+                self._G = self.store.to_networkx()
+        return self._G
+
+    def _changed(self, areas=None):
+        self.version += 1
+        self._G = None
+        self._reachability = None
+        self._subgraphs.clear()
+        self._clusters.clear()
+        if areas is None:
+            self._area_ids.clear()
+        else:
+            for area in areas:
+                self._area_ids.pop(area, None)
+
+    def number_of_assets(self):
+        return len(self.store)
+
+    def number_of_edges(self):
+        return self.store.number_of_edges()
+
+    def _count_integration(self, source_area, target_area, delta):
+        # overview_G edges carry the number of asset-level edges between two areas as 'weight'
+        if source_area == target_area:
+            return
+        data = self.overview_G.get_edge_data(source_area, target_area)
+        weight = (data["weight"] if data else 0) + delta
+        if weight > 0:
+            self.overview_G.add_edge(source_area, target_area, weight=weight)
+        elif data:
+            self.overview_G.remove_edge(source_area, target_area)
+
+    def _move_integrations(self, node_id, old_area, new_area):
+        # Re-attribute node_id's edges from old_area to new_area; O(degree)
+        store = self.store
+        for s, t in store.incident_edges(node_id):
+            s_area = store.record(s).area if s != node_id else None
+            t_area = store.record(t).area if t != node_id else None
+            self._count_integration(s_area or old_area, t_area or old_area, -1)
+            self._count_integration(s_area or new_area, t_area or new_area, +1)
+
+    def _add_member(self, area, name):
+        members = self.functional_areas.setdefault(area, [])
+        positions = self._area_positions.get(area)
+        if positions is not None:
+            positions[name] = len(members)
+        members.append(name)
+
+    def _remove_member(self, area, name):
+        # Swap-remove in O(1); like the store, this changes the order of the area's members
+        members = self.functional_areas[area]
+        positions = self._area_positions.get(area)
+        if positions is None:
+            positions = self._area_positions[area] = {member: i for i, member in enumerate(members)}
+        i = positions.pop(name)
+        last = members.pop()
+        if i < len(members):
+            members[i] = last
+            positions[last] = i
+
+    def _drop_area_if_empty(self, area):
+        if not self.functional_areas.get(area):
+            self.functional_areas.pop(area, None)
+            self._area_positions.pop(area, None)
+            if area in self.overview_G:
+                self.overview_G.remove_node(area)
+
+    def add_asset(self, name, data):
+        record = data if isinstance(data, AssetRecord) else AssetRecord.from_dict(data)
+        area = record.area
+        changed_areas = [area]
+        self.overview_G.add_node(area)
+        if name in self.store:
+            old_area = self.assets[name].area
+            if old_area != area:
+                self._remove_member(old_area, name)
+                self._add_member(area, name)
+                self._move_integrations(self.store.ids[name], old_area, area)
+                self._drop_area_if_empty(old_area)
+                changed_areas.append(old_area)
+        else:
+            self._add_member(area, name)
+        node_id = self.store.add_node(name, record)
+        self._changed(changed_areas)
+        # Text changes never affect the structure, so the search index is updated in place
+        if self._search is not None:
+            self._search.update(node_id)
+
+    def remove_asset(self, name):
+        store = self.store
+        node_id = store.ids.get(name)
+        if node_id is None:
+            return False
+        area = store.record(node_id).area
+        for s, t in store.incident_edges(node_id):
+            self._count_integration(store.record(s).area, store.record(t).area, -1)
+        self._remove_member(area, name)
+        self._drop_area_if_empty(area)
+        moved = store.remove_node(node_id)
+        changed_areas = [area]
+        if moved is not None:
+            # The moved asset's id changed, so its area's cached id array is stale too
+            changed_areas.append(store.record(node_id).area)
+        self._changed(changed_areas)
+        if self._search is not None:
+            self._search.remove(node_id, moved)
+        return True
+
+    def add_edge(self, source, target):
+        store = self.store
+        source_id, target_id = store.ids[source], store.ids[target]
+        if not store.add_edge(source_id, target_id):
+            return False
+        self._count_integration(store.record(source_id).area, store.record(target_id).area, +1)
+        self._changed(())
+        return True
+
+    def remove_edge(self, source, target):
+        store = self.store
+        source_id, target_id = store.ids[source], store.ids[target]
+        if not store.remove_edge(source_id, target_id):
+            return False
+        self._count_integration(store.record(source_id).area, store.record(target_id).area, -1)
+        self._changed(())
+        return True
+
+    def integration_counts(self, area):
+        # {other area: (edges from area, edges into area)}
+        counts = {}
+        for _, other, weight in self.overview_G.out_edges(area, data="weight"):
+            counts[other] = (weight, 0)
+        for other, _, weight in self.overview_G.in_edges(area, data="weight"):
+            counts[other] = (counts.get(other, (0, 0))[0], weight)
+        return counts
+
+    def edges(self):
+        names = self.store.names
+        src, dst = self.store.edge_arrays()
+        for s, t in zip(src.tolist(), dst.tolist()):
+            yield names[s], names[t]
+
+    def area_ids(self, area):
+        ids = self._area_ids.get(area)
+        if ids is None:
+            ids = self._area_ids[area] = self.store.id_array(self.functional_areas[area])
+        return ids
+
+    def reachability(self):
+        # Built on the first impact query and kept until the graph changes
+        if self._reachability is None:
+            from reachability import ReachabilityIndex
+            self._reachability = ReachabilityIndex(self.store)
+        return self._reachability
+
+    def search_index(self):
+        if self._search is None:
+            from search_index import SearchIndex
+            self._search = SearchIndex(self.store)
+        return self._search
+
+    def cluster_tree(self, area):
+        # Nested clusters for drawing a large area, built on first use and kept until the graph changes
+        tree = self._clusters.get(area)
+        if tree is None:
+            tree = self.keep_cluster_tree(area, build_cluster_tree(area, self.cluster_inputs(area)), self.version)
+        return tree
+
+    def cached_cluster_tree(self, area):
+        return self._clusters.get(area)
+
+    def cluster_inputs(self, area):
+        # Copies of everything a cluster tree is built from, so it can be built on a worker while
+        # live updates change the model
+        ids = self.area_ids(area).copy()
+        src, dst = self.store.subgraph_edges(ids)
+        names = self.store.names
+        return [names[i] for i in ids.tolist()], ids, src, dst
+
+    def keep_cluster_tree(self, area, tree, version):
+        # A tree built from an older version of the model may hold ids that now belong to other assets
+        if version == self.version:
+            self._clusters[area] = tree
+        return tree
+
+    def subgraph(self, area):
+        graph = self._subgraphs.get(area)
+        if graph is None:
+            with span("graph build", view="subgraph", area=area):
+                graph = self._subgraphs[area] = self.store.to_networkx(self.area_ids(area))
+        return graph
+
+
+def build_cluster_tree(area, inputs):
+    from clustering import ClusterTree
+    with span("graph build", view="clusters", area=area):
+        return ClusterTree(*inputs)
+
+
+def build_sample_model():
+    model = CBAModel()
+    with span("graph build", view="sample"):
+        for asset, data in SAMPLE_ASSETS.items():
+            model.add_asset(asset, data)
+        for source, target in SAMPLE_EDGES:
+            model.add_edge(source, target)
+    return model
+
+
+def load_model(inventory_paths=None, snapshot_path=None):
+    # Returns the model and any layouts stored alongside it
+    if snapshot_path:
+        from snapshot import load_snapshot
+        with span("load", source="snapshot"):
+            return load_snapshot(snapshot_path)
+    if inventory_paths:
+        from inventory_loader import load_inventory
+        model = CBAModel()
+        with span("load", source="inventory", files=len(inventory_paths)):
+            report = load_inventory(model, inventory_paths)
+        print(report.summary())
+        return model, {}
+    return build_sample_model(), {}
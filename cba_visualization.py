@@ -1,20 +1,70 @@
+import time
+# Taken before anything else is imported, for the startup report
+IMPORT_START = time.perf_counter()
 import sys
-import networkx as nx
-import matplotlib.pyplot as plt
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QTextEdit, QPushButton, QComboBox
+import argparse
+import json
+import multiprocessing
+import os
+import matplotlib
+import numpy as np
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QCursor
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QLabel, QTextEdit, QPushButton, QComboBox, QToolTip, QLineEdit, QListWidget, QListView, QFileDialog, QSlider, QCheckBox
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
-from matplotlib.collections import PathCollection
-import colorsys
+from matplotlib.figure import Figure
+from cba_model import build_cluster_tree, load_model
+from snapshot import save_snapshot
+from layout_cache import LayoutCache, DEFAULT_CACHE_DIR, layout_key
+from layout_engine import LAYOUT_ENGINES, get_engine, resolve_engine_name
+from layout_worker import LayoutWorker
+from scene import SceneLayer, ViewScene, Highlighter, EDGE_WIDTH, generate_colors, integration_widths
+from lod import LevelOfDetail
+from clustering import CLUSTER_THRESHOLD
+from flow_sim import FlowParameters, simulate
+from live_feed import DeltaBatcher, apply_deltas, open_feed
+from snapshot_diff import ModelDiff, load_baseline, REMOVED, STATUS_COLORS, STATUS_NAMES, UNCHANGED
+from consistency import ConsistencyReport, CONSISTENT, PROBLEM_COLORS, PROBLEM_NAMES
+from instrumentation import span, tracer
+from details import DetailsCache, LazyListModel
+IMPORT_END = time.perf_counter()
 
-def generate_colors(n):
-    HSV_tuples = [(x * 1.0 / n, 0.5, 0.5) for x in range(n)]
-    RGB_tuples = list(map(lambda x: colorsys.hsv_to_rgb(*x), HSV_tuples))
-    return ['#%02x%02x%02x' % (int(r * 255), int(g * 255), int(b * 255)) for r, g, b in RGB_tuples]
+CLUSTER_COLOR = "#9467bd"
+HEAT_CMAP = matplotlib.colormaps["YlOrRd"]
+# Animation frame interval in milliseconds
+SIM_FRAME_MS = 50
+# How long status bar messages stay up
+STATUS_MESSAGE_MS = 10_000
+# Full redraws averaged by the frame-time overlay
+FRAME_WINDOW = 30
+
+class TimedCanvas(FigureCanvas):
+    # Every full redraw is a "canvas draw" span; with frame_text set, recent draw times are shown in it
+    frame_text = None
+
+    def draw(self):
+        if self.frame_text is not None and self.frame_text.get_visible():
+            frames = tracer.recent("canvas draw", FRAME_WINDOW)
+            layouts = tracer.recent("layout", 1)
+            text = (f"draw {frames[-1]:.1f} ms (mean {sum(frames) / len(frames):.1f}, max {max(frames):.1f}"
+                    f" over {len(frames)})" if frames else "draw -")
+            if layouts:
+                text += f"\nlast layout {layouts[-1]:.0f} ms"
+            self.frame_text.set_text(text)
+        with span("canvas draw"):
+            super().draw()
 
 class CBAVisualization(QMainWindow):
-    def __init__(self):
+    # Emitted once the model has been built and the first view requested, and once that view is on screen
+    model_loaded = pyqtSignal()
+    started = pyqtSignal()
+
+    def __init__(self, inventory_paths=None, snapshot_path=None, layout_cache_dir=None, watch=(),
+                 compare_path=None, rates_path=None, frame_times=False):
         super().__init__()
+        self.inventory_paths = inventory_paths
+        self.snapshot_path = snapshot_path
         self.setWindowTitle("CBA System Visualization")
         self.setGeometry(100, 100, 1800, 1000)
 
@@ -33,12 +83,39 @@ class CBAVisualization(QMainWindow):
         self.area_selector.currentTextChanged.connect(self.change_area)
         nav_layout.addWidget(QLabel("Select Functional Area:"))
         nav_layout.addWidget(self.area_selector)
+        self.layout_selector = QComboBox()
+        self.layout_selector.addItems(["auto"] + sorted(LAYOUT_ENGINES))
+        self.layout_selector.currentTextChanged.connect(self.change_layout_engine)
+        nav_layout.addWidget(QLabel("Layout:"))
+        nav_layout.addWidget(self.layout_selector)
+        self.relayout_button = QPushButton("Re-layout")
+        self.relayout_button.clicked.connect(self.relayout)
+        nav_layout.addWidget(self.relayout_button)
+        self.frame_times_box = QCheckBox("Frame times")
+        self.frame_times_box.toggled.connect(self.show_frame_times)
+        nav_layout.addWidget(self.frame_times_box)
         left_layout.addLayout(nav_layout)
 
         # Graph visualization
-        self.figure, self.ax = plt.subplots(figsize=(12, 10))
-        self.canvas = FigureCanvas(self.figure)
+        # A plain Figure rather than pyplot, which is slow to import and keeps its own figure registry
+        self.figure = Figure(figsize=(12, 10))
+        self.ax = self.figure.add_subplot()
+        self.canvas = TimedCanvas(self.figure)
         left_layout.addWidget(self.canvas)
+        self.ax.axis('off')
+        # Artists are kept per view and toggled, never cleared
+        self.scene_layer = SceneLayer(self.ax)
+        self.scene = None
+        self.highlighter = Highlighter(self.canvas, self.ax)
+        # Culls, aggregates and labels the visible scene as the view limits change
+        self.lod = LevelOfDetail(self.ax)
+        # Removed assets have no place in the newer model; they are drawn as crosses near their old neighbours
+        self.diff_ghosts = self.ax.scatter([], [], marker='X', s=120, c=STATUS_COLORS[REMOVED], zorder=3)
+        self.placeholder_text = self.ax.text(0.5, 0.5, "", ha='center', va='center', transform=self.ax.transAxes,
+                                             color='gray', fontsize=12, visible=False)
+        self.frame_text = self.ax.text(0.01, 0.01, "", ha='left', va='bottom', transform=self.ax.transAxes,
+                                       color='dimgray', fontsize=8, family='monospace', zorder=6, visible=False)
+        self.canvas.frame_text = self.frame_text
 
         self.toolbar = NavigationToolbar(self.canvas, self)
         left_layout.addWidget(self.toolbar)
@@ -48,529 +125,1135 @@ class CBAVisualization(QMainWindow):
         right_layout = QVBoxLayout(right_panel)
         main_layout.addWidget(right_panel, 1)
 
+        # Search as you type over every asset field
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search assets...")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.textChanged.connect(self.run_search)
+        right_layout.addWidget(self.search_box)
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(200)
+        self.search_results.itemActivated.connect(self.go_to_search_result)
+        self.search_results.itemClicked.connect(self.go_to_search_result)
+        right_layout.addWidget(self.search_results)
+        self.search_status = QLabel("")
+        right_layout.addWidget(self.search_status)
+
         right_layout.addWidget(QLabel("Area/Asset Details:"))
         self.details_text = QTextEdit()
         self.details_text.setReadOnly(True)
         right_layout.addWidget(self.details_text)
+        # Membership and links of the selected area; only the rows in sight are ever formatted, so
+        # areas of any size show at once. Anything else written to the details hides them.
+        self.area_lists = QWidget()
+        area_lists_layout = QVBoxLayout(self.area_lists)
+        area_lists_layout.setContentsMargins(0, 0, 0, 0)
+        area_lists_layout.addWidget(QLabel("Assets in this area:"))
+        self.member_rows = LazyListModel(self)
+        self.member_list = QListView()
+        self.member_list.setUniformItemSizes(True)
+        self.member_list.setModel(self.member_rows)
+        self.member_list.clicked.connect(lambda index: self.go_to_asset(self.member_rows.rows[index.row()]))
+        area_lists_layout.addWidget(self.member_list)
+        area_lists_layout.addWidget(QLabel("Connected Areas (integrations out / in):"))
+        self.connected_rows = LazyListModel(self)
+        self.connected_list = QListView()
+        self.connected_list.setUniformItemSizes(True)
+        self.connected_list.setModel(self.connected_rows)
+        self.connected_list.clicked.connect(lambda index: self.go_to_area(self.connected_rows.rows[index.row()][0]))
+        area_lists_layout.addWidget(self.connected_list)
+        self.area_lists.setVisible(False)
+        self.details_area = None
+        right_layout.addWidget(self.area_lists)
+        self.details_text.textChanged.connect(lambda: self.area_lists.setVisible(False))
 
-        self.create_graph()
-        self.populate_area_selector()
+        # Impact analysis on the selected asset
+        impact_layout = QHBoxLayout()
+        self.downstream_button = QPushButton("Downstream impact")
+        self.downstream_button.clicked.connect(self.show_downstream)
+        impact_layout.addWidget(self.downstream_button)
+        self.upstream_button = QPushButton("Upstream dependencies")
+        self.upstream_button.clicked.connect(self.show_upstream)
+        impact_layout.addWidget(self.upstream_button)
+        right_layout.addLayout(impact_layout)
+        path_layout = QHBoxLayout()
+        self.path_start_button = QPushButton("Mark path start")
+        self.path_start_button.clicked.connect(self.mark_path_start)
+        path_layout.addWidget(self.path_start_button)
+        self.path_button = QPushButton("Path from start")
+        self.path_button.clicked.connect(self.show_path)
+        path_layout.addWidget(self.path_button)
+        self.clear_impact_button = QPushButton("Clear")
+        self.clear_impact_button.clicked.connect(self.clear_impact)
+        path_layout.addWidget(self.clear_impact_button)
+        right_layout.addLayout(path_layout)
+
+        # Differences against an older inventory or snapshot, drawn over every view
+        diff_layout = QHBoxLayout()
+        self.compare_button = QPushButton("Compare with...")
+        self.compare_button.clicked.connect(lambda: self.compare_with())
+        diff_layout.addWidget(self.compare_button)
+        self.clear_diff_button = QPushButton("Clear comparison")
+        self.clear_diff_button.clicked.connect(self.clear_diff)
+        diff_layout.addWidget(self.clear_diff_button)
+        right_layout.addLayout(diff_layout)
+
+        # Related systems and data flows checked against the integrations, problems shown on the graph
+        check_layout = QHBoxLayout()
+        self.check_button = QPushButton("Check consistency")
+        self.check_button.clicked.connect(self.check_consistency)
+        check_layout.addWidget(self.check_button)
+        self.export_check_button = QPushButton("Export report...")
+        self.export_check_button.clicked.connect(self.export_consistency)
+        check_layout.addWidget(self.export_check_button)
+        self.clear_check_button = QPushButton("Clear")
+        self.clear_check_button.clicked.connect(self.clear_consistency)
+        check_layout.addWidget(self.clear_check_button)
+        right_layout.addLayout(check_layout)
+        # Large areas are drawn as clusters: click one to expand it, right-click to fold it back
+        self.collapse_button = QPushButton("Collapse clusters")
+        self.collapse_button.clicked.connect(self.collapse_all_clusters)
+        right_layout.addWidget(self.collapse_button)
+
+        # Data-flow simulation: load shown as heat, scrubbed with the slider or played back
+        sim_layout = QHBoxLayout()
+        self.simulate_button = QPushButton("Simulate flow")
+        self.simulate_button.clicked.connect(self.run_simulation)
+        sim_layout.addWidget(self.simulate_button)
+        self.rates_button = QPushButton("Flow parameters...")
+        self.rates_button.clicked.connect(self.choose_rates)
+        sim_layout.addWidget(self.rates_button)
+        self.play_button = QPushButton("Play")
+        self.play_button.setCheckable(True)
+        self.play_button.toggled.connect(self.toggle_playback)
+        sim_layout.addWidget(self.play_button)
+        self.clear_sim_button = QPushButton("Clear")
+        self.clear_sim_button.clicked.connect(self.clear_simulation)
+        sim_layout.addWidget(self.clear_sim_button)
+        right_layout.addLayout(sim_layout)
+        scrub_layout = QHBoxLayout()
+        self.sim_slider = QSlider(Qt.Horizontal)
+        self.sim_slider.setEnabled(False)
+        self.sim_slider.valueChanged.connect(self.show_sim_frame)
+        scrub_layout.addWidget(self.sim_slider)
+        self.sim_time = QLabel("")
+        scrub_layout.addWidget(self.sim_time)
+        right_layout.addLayout(scrub_layout)
+
+        self.layout_cache = LayoutCache(max_entries=32, cache_dir=layout_cache_dir)
+        # Per-view layout engine choice and nodes the user has dragged into place
+        self.view_engines = {}
+        self.pinned_nodes = {}
+        self._drag_node = None
+        self._hover = None
+        self.view_area = None
+        # (area, structural hash, engine) of the layout drawn; None until the first view arrives
+        self.layout_key = None
+        # Per clustered area: (cluster tree, expanded cluster ids), and where new nodes should start
+        self.cluster_state = {}
+        self.seed_positions = {}
+        self.cluster_view = None
+        # Selected asset, marked path start and the impact result currently highlighted
+        self.selected_node = None
+        self.path_start = None
+        self.impact = None
+        # Asset to select once its view has been drawn, e.g. after picking a search result
+        self.pending_node = None
+
+        self.layout_worker = LayoutWorker(self)
+        self.layout_worker.ready.connect(self.on_layout_ready)
+        self.layout_worker.failed.connect(self.on_layout_failed)
+        # Only show the placeholder if the layout is not back almost immediately
+        self.placeholder_timer = QTimer(self)
+        self.placeholder_timer.setSingleShot(True)
+        self.placeholder_timer.setInterval(150)
+        self.placeholder_timer.timeout.connect(self.show_placeholder)
+
+        # Live topology deltas are batched so a burst costs one model update and one re-layout
+        self.feeds = []
+        unavailable = []
+        for spec in watch:
+            try:
+                self.feeds.append(open_feed(spec))
+            except (OSError, ValueError) as e:
+                # e.g. the port is taken; the window opens without that feed
+                unavailable.append(f"{spec} ({e})")
+        if unavailable:
+            self.statusBar().showMessage(f"Live feed unavailable: {'; '.join(unavailable)}")
+        self.batcher = DeltaBatcher()
+        # Per view: assets whose position may change on the next layout; every other node stays put
+        self.live_touched = {}
+        self.feed_timer = QTimer(self)
+        self.feed_timer.setInterval(100)
+        self.feed_timer.timeout.connect(self.poll_feeds)
+        if self.feeds:
+            self.feed_timer.start()
+
+        # The model is built on a worker once the event loop runs, so the window shows straight away
+        self.model = None
+        self.model_worker = LayoutWorker(self)
+        self.model_worker.ready.connect(self.on_model_ready)
+        self.model_worker.failed.connect(self.on_model_failed)
+        # Seconds since the start of the import at each step of startup
+        self.startup = {"imports": IMPORT_END - IMPORT_START}
+        # The search index is built off the GUI thread; queries typed meanwhile run once it is ready
+        self.search_index = None
+        self.search_hits = []
+        self.search_worker = LayoutWorker(self)
+        self.search_worker.ready.connect(self.on_search_index_ready)
+        self.search_worker.failed.connect(lambda context, message: print(f"Search index failed:\n{message}"))
+        self.baseline = None
+        self.diff = None
+        self.diff_worker = LayoutWorker(self)
+        self.diff_worker.ready.connect(self.on_diff_ready)
+        self.diff_worker.failed.connect(self.on_diff_failed)
+        self.consistency = None
+        self.consistency_worker = LayoutWorker(self)
+        self.consistency_worker.ready.connect(self.on_consistency_ready)
+        self.consistency_worker.failed.connect(self.on_consistency_failed)
+        self.rates_path = rates_path
+        self.simulation = None
+        self._node_groups = None
+        self.sim_worker = LayoutWorker(self)
+        self.sim_worker.ready.connect(self.on_simulation_ready)
+        self.sim_worker.failed.connect(lambda context, message: print(f"Simulation failed:\n{message}"))
+        self.sim_timer = QTimer(self)
+        self.sim_timer.setInterval(SIM_FRAME_MS)
+        self.sim_timer.timeout.connect(self.next_sim_frame)
         self.current_area = "Overview"
-        self.draw_graph()
+        self.compare_path = compare_path
+
+        self.canvas.mpl_connect('button_press_event', self.on_press)
+        self.canvas.mpl_connect('motion_notify_event', self.on_hover)
+        self.canvas.mpl_connect('button_release_event', self.on_release)
+        self.startup_cid = self.canvas.mpl_connect('draw_event', self.on_startup_draw)
+        if frame_times:
+            self.frame_times_box.setChecked(True)
+        # Controls wait for the model
+        central_widget.setEnabled(False)
+        self.placeholder_text.set_text("Loading model...")
+        self.placeholder_text.set_visible(True)
+        QTimer.singleShot(0, self.create_graph)
 
-        self.canvas.mpl_connect('pick_event', self.on_pick)
+    def mark_startup(self, step):
+        self.startup.setdefault(step, time.perf_counter() - IMPORT_START)
+
+    def startup_report(self):
+        lines = ["Startup (seconds since import):"]
+        lines += [f"  {step:<16}{seconds:>8.3f}" for step, seconds in self.startup.items()]
+        return "\n".join(lines)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.mark_startup("window shown")
+
+    def on_startup_draw(self, event):
+        self.mark_startup("first paint")
+        if self.view_area is not None:
+            self.mark_startup("first view")
+            self.canvas.mpl_disconnect(self.startup_cid)
+            self.started.emit()
 
     def create_graph(self):
-        print("Creating graph")
-        self.G = nx.DiGraph()
-        self.overview_G = nx.DiGraph()
-
-        # Define all assets with expanded details (as before)
-        self.assets = {
-            "Portico": {
-                "area": "Pre-Sales",
-                "description": "Cloud-based fleet design and asset utilization tool for Managed Print Services.",
-                "key_features": [
-                    "Fleet design optimization",
-                    "Asset utilization analysis",
-                    "TCO calculation",
-                    "Proposal generation"
-                ],
-                "related_systems": ["DART", "HP Dynamics"],
-                "data_flow": "Sends optimized fleet designs to DART for pricing",
-                "business_impact": "Improves win rates by providing optimized fleet designs and accurate TCO projections"
-            },
-            "HP Dynamics": {
-                "area": "Sales",
-                "description": "Sales platform for relationship management and opportunity creation.",
-                "key_features": [
-                    "Customer relationship management",
-                    "Opportunity tracking",
-                    "Sales pipeline management",
-                    "Integration with other CBA tools"
-                ],
-                "related_systems": ["DART", "Portico"],
-                "data_flow": "Receives customer data from Portico, sends opportunity data to DART",
-                "business_impact": "Centralizes customer information and streamlines the sales process"
-            },
-            "DART": {
-                "area": "Sales",
-                "description": "Deal Analysis Response Tool for creating CBA-compliant deals and pricing.",
-                "key_features": [
-                    "Pricing engine",
-                    "Deal structuring",
-                    "Compliance checking",
-                    "Approval workflow"
-                ],
-                "related_systems": ["Portico", "HP Dynamics", "MPC"],
-                "data_flow": "Receives fleet designs from Portico, pricing requests from HP Dynamics, sends structured deals to MPC",
-                "business_impact": "Ensures consistent and compliant pricing across all deals"
-            },
-            "MPC": {
-                "area": "Sales",
-                "description": "Managed Print Central, a web-based application for partners to create and manage CBA contracts.",
-                "key_features": [
-                    "Contract creation and management",
-                    "Partner portal",
-                    "Integration with billing systems"
-                ],
-                "related_systems": ["DART", "TMC"],
-                "data_flow": "Receives structured deals from DART, sends contract information to TMC",
-                "business_impact": "Streamlines contract management and improves partner experience"
-            },
-            "TMC": {
-                "area": "Transition Management",
-                "description": "Transition Management Central, manages transition to account/contract management through service delivery.",
-                "key_features": [
-                    "Project management",
-                    "Service delivery coordination",
-                    "Status tracking and reporting"
-                ],
-                "related_systems": ["MPC", "Broker"],
-                "data_flow": "Receives contract information from MPC, sends transition plans to Broker",
-                "business_impact": "Ensures smooth transition from sales to service delivery, improving customer satisfaction"
-            },
-            "Broker": {
-                "area": "Transition Management",
-                "description": "Workflow engine for onboarding data, bridging TMC, SAP, and ITSM.",
-                "key_features": [
-                    "Data transformation",
-                    "System integration",
-                    "Workflow automation"
-                ],
-                "related_systems": ["TMC", "ITSM ServiceNow"],
-                "data_flow": "Receives transition plans from TMC, sends onboarding data to ITSM ServiceNow",
-                "business_impact": "Automates and streamlines the onboarding process, reducing errors and improving efficiency"
-            },
-            "ITSM ServiceNow": {
-                "area": "Asset Management",
-                "description": "IT Service Management platform for managing assets and services.",
-                "key_features": [
-                    "Asset tracking",
-                    "Service catalog",
-                    "Incident management",
-                    "Change management"
-                ],
-                "related_systems": ["Broker", "MS4"],
-                "data_flow": "Receives onboarding data from Broker, sends asset information to MS4",
-                "business_impact": "Centralizes asset management and improves service delivery efficiency"
-            },
-            "MS4": {
-                "area": "Entitlement, Billing & Invoicing",
-                "description": "Master data replication system.",
-                "key_features": [
-                    "Data synchronization",
-                    "Master data management",
-                    "Data quality assurance"
-                ],
-                "related_systems": ["ITSM ServiceNow", "S4"],
-                "data_flow": "Receives asset information from ITSM ServiceNow, replicates master data to S4",
-                "business_impact": "Ensures data consistency across systems, improving reporting accuracy"
-            },
-            "S4": {
-                "area": "Entitlement, Billing & Invoicing",
-                "description": "SAP S/4HANA system for financial processes.",
-                "key_features": [
-                    "Financial accounting",
-                    "Contract management",
-                    "Billing and invoicing"
-                ],
-                "related_systems": ["MS4", "BRIM"],
-                "data_flow": "Receives master data from MS4, sends billing information to BRIM",
-                "business_impact": "Centralizes financial processes and improves financial reporting"
-            },
-            "BRIM": {
-                "area": "Entitlement, Billing & Invoicing",
-                "description": "Billing and Revenue Innovation Management system.",
-                "key_features": [
-                    "Complex billing scenarios",
-                    "Revenue recognition",
-                    "Subscription management"
-                ],
-                "related_systems": ["S4", "CC/CM"],
-                "data_flow": "Receives billing information from S4, sends charging data to CC/CM",
-                "business_impact": "Enables flexible billing models and improves revenue management"
-            },
-            "CC/CM": {
-                "area": "Entitlement, Billing & Invoicing",
-                "description": "Convergent Charging and Mediation system.",
-                "key_features": [
-                    "Usage-based charging",
-                    "Real-time rating",
-                    "Mediation of usage data"
-                ],
-                "related_systems": ["BRIM", "Usage Service"],
-                "data_flow": "Receives charging data from BRIM, processes usage data from Usage Service",
-                "business_impact": "Enables accurate usage-based billing and improves billing flexibility"
-            },
-            "CDAX": {
-                "area": "Case Management",
-                "description": "Custom version of Microsoft Dynamics CRM for HP Customer Support.",
-                "key_features": [
-                    "Case tracking",
-                    "Customer interaction history",
-                    "Knowledge base integration",
-                    "Service level agreement (SLA) tracking"
-                ],
-                "related_systems": ["DCC", "ITSM ServiceNow"],
-                "data_flow": "Receives customer support requests from DCC, sends case information to ITSM ServiceNow",
-                "business_impact": "Improves customer support efficiency and enhances customer satisfaction"
-            },
-            "DCC": {
-                "area": "Customer Portal",
-                "description": "Device Control Center, interface for customers to view and manage their fleet.",
-                "key_features": [
-                    "Fleet overview",
-                    "Device status monitoring",
-                    "Supply ordering",
-                    "Service request initiation"
-                ],
-                "related_systems": ["CDAX", "ARC"],
-                "data_flow": "Sends customer requests to CDAX, receives supply status from ARC",
-                "business_impact": "Enhances customer experience and reduces support calls through self-service capabilities"
-            },
-            "ARC": {
-                "area": "Replenishment",
-                "description": "Automated Reordering of Consumables, manages supplies orders and distribution.",
-                "key_features": [
-                    "Automated supply ordering",
-                    "Inventory management",
-                    "Order tracking",
-                    "Predictive analytics for supply needs"
-                ],
-                "related_systems": ["DCC", "HP Direct"],
-                "data_flow": "Receives supply status from DCC, sends orders to HP Direct",
-                "business_impact": "Reduces supply outages and optimizes inventory levels, improving customer satisfaction"
-            },
-            "HP Direct": {
-                "area": "Replenishment",
-                "description": "Direct fulfillment service for supplies orders.",
-                "key_features": [
-                    "Order processing",
-                    "Warehouse management",
-                    "Shipping and logistics",
-                    "Return handling"
-                ],
-                "related_systems": ["ARC", "Usage Service"],
-                "data_flow": "Receives orders from ARC, sends fulfillment data to Usage Service",
-                "business_impact": "Ensures timely delivery of supplies, reducing customer downtime"
-            },
-            "Usage Service": {
-                "area": "Telemetry Processor",
-                "description": "Processes telemetry data, analyzes supplies levels, and determines fulfillment needs.",
-                "key_features": [
-                    "Real-time data processing",
-                    "Supplies level monitoring",
-                    "Usage pattern analysis",
-                    "Predictive maintenance"
-                ],
-                "related_systems": ["HP Direct", "Fulfillment Service"],
-                "data_flow": "Receives telemetry data from devices, sends usage data to Fulfillment Service",
-                "business_impact": "Enables proactive supply replenishment and reduces device downtime"
-            },
-            "Fulfillment Service": {
-                "area": "Telemetry Processor",
-                "description": "Determines auto-replenishment needs based on usage data.",
-                "key_features": [
-                    "Auto-replenishment algorithms",
-                    "Supply chain optimization",
-                    "Demand forecasting",
-                    "Integration with ARC"
-                ],
-                "related_systems": ["Usage Service", "ARC"],
-                "data_flow": "Receives usage data from Usage Service, sends replenishment requests to ARC",
-                "business_impact": "Optimizes supply chain efficiency and reduces costs associated with overstocking or stockouts"
-            },
-            "HP SDS": {
-                "area": "Device Connectivity",
-                "description": "Smart Device Services, provides advanced monitoring and management capabilities.",
-                "key_features": [
-                    "Remote device monitoring",
-                    "Predictive maintenance",
-                    "Firmware updates",
-                    "Security management"
-                ],
-                "related_systems": ["JAM", "Usage Service"],
-                "data_flow": "Collects device data, sends to JAM and Usage Service",
-                "business_impact": "Improves device uptime and reduces service costs through predictive maintenance"
-            },
-            "JAM": {
-                "area": "Device Connectivity",
-                "description": "JetAdvantage Management, part of the device connectivity and management ecosystem.",
-                "key_features": [
-                    "Device fleet management",
-                    "Security policy enforcement",
-                    "Remote configuration",
-                    "Reporting and analytics"
-                ],
-                "related_systems": ["HP SDS", "Stratus"],
-                "data_flow": "Receives device data from HP SDS, sends management commands to Stratus",
-                "business_impact": "Centralizes device management, improving operational efficiency and security"
-            },
-            "Stratus": {
-                "area": "Device Connectivity",
-                "description": "Handles IoT connectivity and device management in the cloud.",
-                "key_features": [
-                    "Cloud-based device connectivity",
-                    "Data aggregation",
-                    "Device provisioning",
-                    "Scalable IoT infrastructure"
-                ],
-                "related_systems": ["JAM", "JAMc"],
-                "data_flow": "Receives management commands from JAM, sends device data to JAMc",
-                "business_impact": "Provides scalable and reliable infrastructure for device connectivity and management"
-            },
-            "JAMc": {
-                "area": "Device Connectivity",
-                "description": "JAM Connector, facilitates connection and management of devices.",
-                "key_features": [
-                    "Device discovery",
-                    "Connection brokering",
-                    "Protocol translation",
-                    "Data normalization"
-                ],
-                "related_systems": ["Stratus", "FM Audit Server"],
-                "data_flow": "Receives device data from Stratus, sends normalized data to FM Audit Server",
-                "business_impact": "Enables seamless integration of diverse device types into the management ecosystem"
-            },
-            "FM Audit Server": {
-                "area": "Device Connectivity",
-                "description": "Fleet Management Auditing server for comprehensive data collection.",
-                "key_features": [
-                    "Device data collection",
-                    "Usage auditing",
-                    "Compliance checking",
-                    "Historical data storage"
-                ],
-                "related_systems": ["JAMc", "FM Audit Agent"],
-                "data_flow": "Receives normalized data from JAMc, sends audit instructions to FM Audit Agent",
-                "business_impact": "Provides accurate and comprehensive fleet data for billing and management purposes"
-            },
-            "FM Audit Agent": {
-                "area": "Device Connectivity",
-                "description": "Local data collection agent for FM Audit.",
-                "key_features": [
-                    "Local device discovery",
-                    "Secure data collection",
-                    "Offline data caching",
-                    "Bandwidth optimization"
-                ],
-                "related_systems": ["FM Audit Server", "BIRD"],
-                "data_flow": "Receives audit instructions from FM Audit Server, sends collected data to BIRD",
-                "business_impact": "Ensures accurate data collection even in challenging network environments"
-            },
-            "BIRD": {
-                "area": "Business Intelligence",
-                "description": "Business Intelligence Reporting Dashboard, used for various reporting and data management tasks.",
-                "key_features": [
-                    "Data visualization",
-                    "Custom report generation",
-                    "KPI tracking",
-                    "Predictive analytics"
-                ],
-                "related_systems": ["FM Audit Agent", "Fleet Ops"],
-                "data_flow": "Receives collected data from FM Audit Agent, sends analytics to Fleet Ops",
-                "business_impact": "Provides actionable insights for decision-making and business optimization"
-            },
-            "Fleet Ops": {
-                "area": "Fleet Operations",
-                "description": "Manages device operations, including remote diagnostics and remediation.",
-                "key_features": [
-                    "Remote diagnostics",
-                    "Proactive maintenance",
-                    "Fleet optimization",
-                    "Service dispatch management"
-                ],
-                "related_systems": ["BIRD", "HP SDS"],
-                "data_flow": "Receives analytics from BIRD, sends operational commands to HP SDS",
-                "business_impact": "Maximizes fleet uptime and efficiency through proactive management and optimization"
-            }
-        }
-
-        # Group assets by functional area
-        self.functional_areas = {}
-        for asset, data in self.assets.items():
-            area = data['area']
-            if area not in self.functional_areas:
-                self.functional_areas[area] = []
-            self.functional_areas[area].append(asset)
-
-        # Add nodes to the graph
-        for asset, data in self.assets.items():
-            self.G.add_node(asset, **data)
-            print(f"Added node: {asset}")
-
-        # Add nodes to the overview graph
+        self.mark_startup("event loop")
+        inventory_paths, snapshot_path = self.inventory_paths, self.snapshot_path
+        self.model_worker.submit(lambda cancel: load_model(inventory_paths, snapshot_path), context=None)
+
+    def on_model_failed(self, context, message):
+        print(f"Loading the model failed:\n{message}")
+        self.placeholder_text.set_text("Loading the model failed")
+        self.details_text.setText(f"Loading the model failed:\n{message}")
+        self.canvas.draw_idle()
+
+    def on_model_ready(self, context, result):
+        model, layouts = result
+        self.mark_startup("model loaded")
+        # Room for every view, so a snapshot's stored layouts are all kept instead of the last few
+        self.layout_cache.max_entries = max(self.layout_cache.max_entries, len(layouts),
+                                            len(model.functional_areas) + 2)
+        self.layout_cache.preload(layouts)
+
+        self.model = model
+        self.details = DetailsCache(model)
+        self.overview_G = model.overview_G
+        self.functional_areas = model.functional_areas
+        self.assets = model.assets
+
+        load_ms = tracer.recent("load", 1)
+        print(f"Graph created with {model.number_of_assets()} nodes and {model.number_of_edges()} edges, "
+              f"{self.overview_G.number_of_nodes()} areas and {self.overview_G.number_of_edges()} area links"
+              + (f" in {load_ms[-1]:.0f} ms" if load_ms else ""))
+        self.search_worker.submit(lambda cancel: model.search_index(), context=model)
+        self.centralWidget().setEnabled(True)
+        self.populate_area_selector()
+        self.draw_graph()
+        if self.compare_path:
+            self.compare_with(self.compare_path)
+        self.model_loaded.emit()
+
+    @property
+    def G(self):
+        return self.model.G
+
+    def save_snapshot(self, path):
+        # Make sure every view has a layout so the snapshot opens without recomputing any
+        self.layout_cache.max_entries = max(self.layout_cache.max_entries, len(self.functional_areas) + 2)
+        self.layout_for("Overview", self.overview_G, self.layout_settings("Overview"))
         for area in self.functional_areas:
-            self.overview_G.add_node(area)
-
-        # Define and add edges
-        edges = [
-            ("Portico", "DART"),
-            ("Portico", "HP Dynamics"),
-            ("HP Dynamics", "DART"),
-            ("DART", "MPC"),
-            ("MPC", "TMC"),
-            ("TMC", "Broker"),
-            ("Broker", "ITSM ServiceNow"),
-            ("ITSM ServiceNow", "MS4"),
-            ("MS4", "S4"),
-            ("S4", "BRIM"),
-            ("BRIM", "CC/CM"),
-            ("CC/CM", "Usage Service"),
-            ("CDAX", "DCC"),
-            ("DCC", "ARC"),
-            ("ARC", "HP Direct"),
-            ("HP Direct", "Usage Service"),
-            ("Usage Service", "Fulfillment Service"),
-            ("Fulfillment Service", "ARC"),
-            ("HP SDS", "JAM"),
-            ("JAM", "Stratus"),
-            ("Stratus", "JAMc"),
-            ("JAMc", "FM Audit Server"),
-            ("FM Audit Server", "FM Audit Agent"),
-            ("FM Audit Agent", "BIRD"),
-            ("BIRD", "Fleet Ops"),
-            ("Fleet Ops", "HP SDS"),
-            ("ITSM ServiceNow", "CDAX"),
-            ("DCC", "CDAX"),
-            ("Usage Service", "HP SDS"),
-            ("JAM", "HP SDS"),
-            ("BRIM", "S4"),
-            ("CC/CM", "BRIM"),
-            ("Fulfillment Service", "HP Direct"),
-            ("ARC", "Fulfillment Service"),
-            ("JAMc", "Stratus"),
-            ("FM Audit Server", "JAMc"),
-            ("BIRD", "FM Audit Server"),
-            ("Fleet Ops", "BIRD"),
-            ("HP SDS", "Fleet Ops"),
-            ("CDAX", "ITSM ServiceNow"),
-            ("S4", "MS4"),
-            ("Usage Service", "CC/CM"),
-            ("HP Dynamics", "Portico"),
-            ("MPC", "DART"),
-            ("TMC", "MPC"),
-            ("Broker", "TMC"),
-            ("ITSM ServiceNow", "Broker"),
-            ("MS4", "ITSM ServiceNow"),
-            ("S4", "BRIM"),
-            ("CC/CM", "BRIM"),
-            ("DCC", "CDAX"),
-            ("ARC", "DCC"),
-            ("HP Direct", "ARC"),
-            ("Usage Service", "HP Direct"),
-            ("Fulfillment Service", "Usage Service"),
-            ("JAM", "HP SDS"),
-            ("Stratus", "JAM"),
-            ("JAMc", "Stratus"),
-            ("FM Audit Server", "JAMc"),
-            ("FM Audit Agent", "FM Audit Server"),
-            ("BIRD", "FM Audit Agent"),
-            ("Fleet Ops", "BIRD")
-        ]
-
-        self.G.add_edges_from(edges)
-        print(f"Added {len(edges)} edges")
-
-        # Add edges to the overview graph
-        for source, target in edges:
-            source_area = self.assets[source]['area']
-            target_area = self.assets[target]['area']
-            if source_area != target_area:
-                self.overview_G.add_edge(source_area, target_area)
-
-        print(f"Graph created with {self.G.number_of_nodes()} nodes and {self.G.number_of_edges()} edges")
-        print(f"Overview graph created with {self.overview_G.number_of_nodes()} nodes and {self.overview_G.number_of_edges()} edges")
+            self.layout_for(area, self.model.subgraph(area), self.layout_settings(area))
+        save_snapshot(self.model, path, self.layout_cache.entries())
+        print(f"Snapshot written to {path}")
 
     def populate_area_selector(self):
         self.area_selector.addItem("Overview")
+        self.area_selector.addItem("All Assets")
         self.area_selector.addItems(sorted(self.functional_areas.keys()))
 
     def change_area(self, area):
         self.current_area = area
+        self.layout_selector.blockSignals(True)
+        self.layout_selector.setCurrentText(self.view_engines.get(area, "auto"))
+        self.layout_selector.blockSignals(False)
         self.draw_graph()
 
-    def draw_graph(self):
-        print(f"Drawing graph for {self.current_area}")
-        self.ax.clear()
+    def change_layout_engine(self, engine_name):
+        self.view_engines[self.current_area] = engine_name
+        self.draw_graph()
+
+    def relayout(self):
+        # Warm start from what is on screen, keeping dragged nodes where the user put them; nothing to
+        # start from before the view asked for has been drawn
+        if self.layout_key is None or self.layout_key[0] != self.current_area:
+            return
+        key = self.layout_key
+        area, graph_hash, engine_name = key
+        graph = self.current_graph
+        engine = get_engine(engine_name)
+        initial = dict(self.node_positions)
+        fixed = set(self.pinned_nodes.get(area, ()))
+
+        def job(cancel):
+            pos = engine.compute(graph, initial, fixed, cancel)
+            self.layout_cache.put(area, graph_hash, pos)
+            return pos, key, graph
 
-        if self.current_area == "Overview":
-            self.draw_overview()
+        self.request_view(area, job)
+
+    def draw_graph(self):
+        area = self.current_area
+        tracer.instant("view requested", area=area)
+        if area == "Overview":
+            # The overview is updated in place by live deltas, so the worker gets its own copy
+            graph = self.overview_G.copy()
+        elif area == "All Assets":
+            graph = self.G
+        elif len(self.functional_areas[area]) > CLUSTER_THRESHOLD:
+            self.draw_clusters(area)
+            return
         else:
-            self.draw_specific_area()
+            graph = self.model.subgraph(area)
+        touched = self.live_touched.pop(area, None)
+        settings = self.layout_settings(area)
+        self.request_view(area, lambda cancel: self.layout_for(area, graph, settings, cancel, touched) + (graph,))
 
-        self.ax.set_title(f"CBA System Visualization - {self.current_area}")
-        self.ax.axis('off')
-        self.canvas.draw()
-
-    def draw_overview(self):
-        pos = nx.spring_layout(self.overview_G, k=0.5, iterations=50)
-        
-        colors = generate_colors(len(self.overview_G))
-        color_map = dict(zip(self.overview_G.nodes(), colors))
-        
-        nx.draw_networkx_nodes(self.overview_G, pos, node_size=3000, node_color=list(color_map.values()), alpha=0.8, ax=self.ax)
-        nx.draw_networkx_labels(self.overview_G, pos, font_size=10, ax=self.ax)
-        nx.draw_networkx_edges(self.overview_G, pos, edge_color='gray', arrows=True, ax=self.ax, arrowsize=20, width=1.5)
+    def draw_clusters(self, area):
+        # Clustering and layout both run on the worker; only the visible clusters and assets are laid
+        # out. The worker gets copies of the area, so live updates can change the model meanwhile.
+        model = self.model
+        state = self.cluster_state.get(area)
+        touched = self.live_touched.pop(area, None)
+        seeds = self.seed_positions.pop(area, None)
+        settings = self.layout_settings(area)
+        cached = model.cached_cluster_tree(area)
+        inputs = model.cluster_inputs(area) if cached is None else None
+        version = model.version
+
+        def job(cancel):
+            tree = cached if cached is not None else build_cluster_tree(area, inputs)
+            expanded = state[1] if state is not None and state[0] is tree else {0}
+            graph = tree.view(expanded).graph
+            graph.graph["version"] = version
+            cancel.check()
+            return self.layout_for(area, graph, settings, cancel, touched, seeds) + (graph,)
+
+        self.request_view(area, job)
+
+    def request_view(self, area, job):
+        # Layout runs on the worker and returns (positions, layout key, graph); a newer request
+        # cancels this one
+        self.layout_worker.submit(job, context=area)
+        self.placeholder_timer.start()
+
+    def show_placeholder(self):
+        self.lod.detach()
+        self.scene_layer.hide()
+        self.highlighter.clear()
+        self.diff_ghosts.set_offsets(np.zeros((0, 2)))
+        self.placeholder_text.set_text(f"Computing layout for {self.current_area}...")
+        self.placeholder_text.set_visible(True)
+        self.view_area = None
+        self.canvas.draw_idle()
+
+    def on_layout_ready(self, area, result):
+        pos, self.layout_key, graph = result
+        self.placeholder_timer.stop()
+        self.placeholder_text.set_visible(False)
+        switching = area != self.view_area
+
+        self.lod.detach()
+        with span("artist creation", area=area, nodes=len(pos)):
+            if area == "Overview":
+                self.draw_overview(pos)
+            elif area == "All Assets":
+                self.draw_all_assets(graph, pos)
+            else:
+                self.draw_specific_area(area, graph, pos)
+
+        self.view_area = area
+        self.current_graph = graph
+        self.cluster_view = graph.graph.get("clusters")
+        if self.cluster_view is not None:
+            self.model.keep_cluster_tree(area, self.cluster_view.tree, graph.graph["version"])
+            self.cluster_state[area] = (self.cluster_view.tree, self.cluster_view.expanded)
+        self.apply_overlay()
+        self.lod.attach(self.scene)
+        self.ax.set_title(f"CBA System Visualization - {area}")
+        if switching:
+            self.highlighter.clear()
+            self._hover = None
+            QToolTip.hideText()
+            self.highlight_impact()
+            # Forget zoom history that belonged to the previous view
+            self.toolbar.update()
+        if self.pending_node is not None and self.pending_node not in self.scene.index and self.reveal(self.pending_node):
+            # Drawn again with the clusters around it expanded; selected then
+            return
+        if self.pending_node is not None and self.pending_node in self.scene.index:
+            self.select_node(self.scene.index[self.pending_node])
+        self.pending_node = None
+        self.canvas.draw_idle()
+
+    def on_layout_failed(self, context, message):
+        self.placeholder_timer.stop()
+        print(f"Layout for {context} failed:\n{message}")
+        self.details_text.setText(f"Layout for {context} failed:\n{message}")
+
+    def layout_settings(self, area):
+        # Taken on the GUI thread, which changes them while layouts run: the engine chosen for the
+        # view and a copy of its pinned nodes
+        return self.view_engines.get(area, "auto"), frozenset(self.pinned_nodes.get(area, ()))
+
+    def layout_for(self, area, graph, settings, cancel=None, touched=None, seeds=None):
+        # Runs on the layout worker; only reads what it is given and the layout cache
+        engine_name, pinned = settings
+        engine_name = resolve_engine_name(engine_name, graph)
+        engine = get_engine(engine_name)
+        fixed = set(pinned)
+
+        def compute(g, initial):
+            if seeds:
+                # Nodes new to this view start next to what they replace
+                initial = dict(initial or {})
+                initial.update(seeds)
+            if touched is not None and initial:
+                # Incremental update: only assets the deltas touched move, warm-started from the old layout
+                fixed.update(node for node in initial if node not in touched)
+            with span("layout", area=area, engine=engine_name, nodes=len(g)):
+                return engine.compute(g, initial, fixed, cancel)
+
+        graph_hash = layout_key(graph, engine_name)
+        pos = self.layout_cache.layout(area, graph, compute, graph_hash=graph_hash)
+        return pos, (area, graph_hash, engine_name)
 
+    def draw_overview(self, pos):
+        # Edge widths show how many asset-level integrations each area-to-area link carries
+        with span("overview aggregation"):
+            edges = list(self.overview_G.edges(data="weight"))
+            widths = integration_widths([w for _, _, w in edges])
+
+        def build():
+            colors = generate_colors(len(self.overview_G))
+            return ViewScene(self.ax, graph_hash, self.overview_G.nodes(), pos, [(u, v) for u, v, _ in edges],
+                             colors, edge_widths=widths, max_labels=self.lod.max_labels)
+
+        graph_hash = self.layout_key[1]
+        self.scene = self.scene_layer.show("Overview", graph_hash, build, pos)
+        # Counts can change without the structure changing, in which case the scene is reused
+        self.scene.update_edge_widths(widths)
+        self.node_positions = pos
+
+    def draw_specific_area(self, area, graph, pos):
+        self.subgraph = graph
+        clusters = graph.graph.get("clusters")
+        # Links between clusters are drawn wider the more asset-level edges they stand for
+        edges = list(graph.edges(data="weight", default=1))
+        widths = integration_widths([w for _, _, w in edges]) if clusters is not None else EDGE_WIDTH
+
+        def build():
+            color = generate_colors(1)[0]
+            colors = [CLUSTER_COLOR if clusters is not None and node in clusters.clusters else color
+                      for node in graph.nodes()]
+            return ViewScene(self.ax, graph_hash, graph.nodes(), pos, [(u, v) for u, v, _ in edges], colors,
+                             edge_widths=widths, max_labels=self.lod.max_labels)
+
+        graph_hash = self.layout_key[1]
+        self.scene = self.scene_layer.show(area, graph_hash, build, pos)
+        self.node_collection = self.scene.node_artist
         self.node_positions = pos
 
-    def draw_specific_area(self):
-        nodes = self.functional_areas[self.current_area]
-        self.subgraph = self.G.subgraph(nodes)
+    def draw_all_assets(self, graph, pos):
+        # The whole estate, coloured by functional area and drawn with small markers
+        self.subgraph = graph
 
-        pos = nx.spring_layout(self.subgraph, k=0.5, iterations=50)
-        
-        color = generate_colors(1)[0]
-        node_colors = [color] * len(self.subgraph)
-        
-        self.node_collection = nx.draw_networkx_nodes(self.subgraph, pos, node_size=3000, node_color=node_colors, ax=self.ax, alpha=0.8)
-        self.node_collection.set_picker(5)
-        nx.draw_networkx_labels(self.subgraph, pos, font_size=10, ax=self.ax)
-        nx.draw_networkx_edges(self.subgraph, pos, edge_color='gray', arrows=True, ax=self.ax, arrowsize=20, width=1.5)
+        def build():
+            area_colors = dict(zip(sorted(self.functional_areas), generate_colors(len(self.functional_areas))))
+            colors = [area_colors[self.assets[node]['area']] for node in graph.nodes()]
+            return ViewScene(self.ax, graph_hash, graph.nodes(), pos, graph.edges(), colors, node_size=120,
+                             edge_widths=0.5, font_size=7, max_labels=self.lod.max_labels)
 
+        graph_hash = self.layout_key[1]
+        self.scene = self.scene_layer.show("All Assets", graph_hash, build, pos)
+        self.node_collection = self.scene.node_artist
         self.node_positions = pos
 
-    def on_pick(self, event):
-        if self.current_area == "Overview":
-            if isinstance(event.artist, PathCollection):
-                ind = event.ind[0]
-                area = list(self.overview_G.nodes())[ind]
-                self.show_area_details(area)
+    def hit_test(self, x, y):
+        # Resolves a display position against what is drawn, which may lag current_area while a
+        # layout is pending. Returns ('node', index), ('aggregate', index) or None.
+        if self.view_area is None:
+            return None
+        ind = self.scene.node_near(x, y)
+        if ind is not None:
+            return 'node', ind
+        ind = self.lod.aggregate_near(x, y)
+        if ind is not None:
+            return 'aggregate', ind
+        return None
+
+    def on_press(self, event):
+        # Leave clicks to the toolbar while it is panning or zooming
+        if event.inaxes is not self.ax or self.toolbar.mode or event.button not in (1, 3):
+            return
+        with span("pick handling", event="press"):
+            self.handle_press(event)
+
+    def handle_press(self, event):
+        hit = self.hit_test(event.x, event.y)
+        if hit is None:
+            return
+        kind, ind = hit
+        if event.button == 3:
+            if kind == 'node' and self.cluster_view is not None:
+                self.collapse_cluster(self.scene.nodes[ind])
+            return
+        if kind == 'node' and self.cluster_view is not None and self.scene.nodes[ind] in self.cluster_view.clusters:
+            self.expand_cluster(self.cluster_view.clusters[self.scene.nodes[ind]])
+            return
+        if kind == 'aggregate':
+            # Clicking a collapsed region zooms into it; Back on the toolbar returns
+            self.toolbar.push_current()
+            self.lod.zoom_to(ind)
+            self.canvas.draw_idle()
+            return
+        self._drag_node = (self.scene.nodes[ind], event.x, event.y)
+        self.select_node(ind)
+
+    def select_node(self, ind):
+        node = self.scene.nodes[ind]
+        self.impact = None
+        self.highlighter.set(self.scene.xy[ind], size=self.scene.node_size)
+        if self.view_area == "Overview":
+            self.show_area_details(node)
         else:
-            if isinstance(event.artist, PathCollection):
-                ind = event.ind[0]
-                node = list(self.subgraph.nodes())[ind]
-                self.show_asset_details(node)
+            self.selected_node = node
+            self.show_asset_details(node)
 
-    def show_area_details(self, area):
-        details = f"Functional Area: {area}\n\n"
-        details += f"Assets in this area:\n"
-        for asset in self.functional_areas[area]:
-            details += f"- {asset}\n"
-        details += f"\nConnected Areas:\n"
-        for neighbor in self.overview_G.neighbors(area):
-            details += f"- {neighbor}\n"
+    def on_hover(self, event):
+        if event.inaxes is not self.ax or self._drag_node is not None or event.button is not None:
+            hit = None
+        else:
+            with span("pick handling", event="hover"):
+                hit = self.hit_test(event.x, event.y)
+        if hit == self._hover:
+            return
+        self._hover = hit
+        if hit is None:
+            QToolTip.hideText()
+            return
+        QToolTip.showText(QCursor.pos(), self.tooltip_text(*hit), self.canvas)
+
+    def tooltip_text(self, kind, ind):
+        if kind == 'aggregate':
+            return f"{self.lod.aggregate_counts[ind]} assets (click to zoom in)"
+        node = self.scene.nodes[ind]
+        if self.cluster_view is not None and node in self.cluster_view.clusters:
+            size = self.cluster_view.tree.size(self.cluster_view.clusters[node])
+            return f"{node}\nCluster of {size} assets (click to expand)"
+        if self.view_area == "Overview":
+            text = f"{node}\n{len(self.functional_areas[node])} assets"
+            status = self.diff.area_status().get(node, UNCHANGED) if self.diff is not None else UNCHANGED
+        else:
+            text = f"{node}\n{self.assets[node]['area']}"
+            status = self.diff.node_status([node])[0] if self.diff is not None else UNCHANGED
+        if status != UNCHANGED:
+            text += f"\n{STATUS_NAMES[status]} since baseline"
+        if self.consistency is not None and self.view_area != "Overview":
+            problem = self.consistency.node_status([self.model.store.ids[node]])[0]
+            if problem != CONSISTENT:
+                text += f"\n{PROBLEM_NAMES[problem]}"
+        return text
+
+    def on_release(self, event):
+        if self._drag_node is None:
+            return
+        node, x, y = self._drag_node
+        self._drag_node = None
+        if event.inaxes is not self.ax or event.xdata is None:
+            return
+        if abs(event.x - x) + abs(event.y - y) < 5:
+            return
+
+        # Dropping a node pins it for subsequent layouts of this view
+        area, graph_hash, _ = self.layout_key
+        pos = dict(self.node_positions)
+        pos[node] = (event.xdata, event.ydata)
+        self.pinned_nodes.setdefault(area, set()).add(node)
+        self.layout_cache.put(area, graph_hash, pos)
+        self.on_layout_ready(area, (pos, self.layout_key, self.current_graph))
 
+    def on_search_index_ready(self, model, index):
+        if model is self.model:
+            self.search_index = index
+            self.run_search(self.search_box.text())
+
+    def run_search(self, query):
+        self.search_results.clear()
+        self.search_hits = []
+        if not query.strip():
+            self.search_status.setText("")
+            self.impact = None
+            self.highlighter.clear()
+            return
+        if self.search_index is None:
+            self.search_status.setText("Indexing assets...")
+            return
+        top, matched = self.search_index.search(query)
+        names = self.model.store.names
+        self.search_hits = [names[i] for i in top.tolist()]
+        for node in self.search_hits:
+            self.search_results.addItem(f"{node} ({self.assets[node]['area']})")
+        self.search_status.setText(f"{len(matched)} matching assets")
+        # Matches are ringed in whatever view is shown; the overview rings their areas
+        self.impact = ([names[i] for i in matched.tolist()], False)
+        self.highlighter.clear()
+        self.highlight_impact()
+
+    def go_to_search_result(self, item):
+        self.go_to_asset(self.search_hits[self.search_results.row(item)])
+
+    def go_to_asset(self, node):
+        if self.view_area in ("All Assets", self.assets[node]['area']) and node in self.scene.index:
+            self.select_node(self.scene.index[node])
+            return
+        self.pending_node = node
+        if self.view_area == self.assets[node]['area']:
+            # Folded into a cluster of the drawn area
+            if not self.reveal(node):
+                self.pending_node = None
+            return
+        self.area_selector.setCurrentText(self.assets[node]['area'])
+
+    def show_downstream(self):
+        if self.selected_node is None:
+            return
+        index = self.model.reachability()
+        ids = index.downstream(self.model.store.ids[self.selected_node])
+        self.set_impact(f"Downstream of {self.selected_node}", ids)
+
+    def show_upstream(self):
+        if self.selected_node is None:
+            return
+        index = self.model.reachability()
+        ids = index.upstream(self.model.store.ids[self.selected_node])
+        self.set_impact(f"Upstream of {self.selected_node}", ids)
+
+    def mark_path_start(self):
+        if self.selected_node is None:
+            return
+        self.path_start = self.selected_node
+        self.details_text.append(f"\nPath start: {self.path_start}")
+
+    def show_path(self):
+        if self.selected_node is None or self.path_start is None:
+            return
+        ids = self.model.store.ids
+        path = self.model.reachability().shortest_path(ids[self.path_start], ids[self.selected_node])
+        title = f"Data flow from {self.path_start} to {self.selected_node}"
+        if path is None:
+            self.impact = None
+            self.highlighter.clear()
+            self.details_text.setText(f"{title}\n\nNo data-flow path exists.")
+            return
+        self.set_impact(title, path, ordered=True)
+
+    def set_impact(self, title, node_ids, ordered=False):
+        names = self.model.store.names
+        nodes = [names[i] for i in node_ids]
+        self.impact = (nodes, ordered)
+        self.highlight_impact()
+
+        shown = nodes if ordered else sorted(nodes)
+        details = f"{title}: {len(nodes)} assets\n\n"
+        if ordered:
+            details += "\n".join(f"{i}. {node}" for i, node in enumerate(shown, 1))
+        else:
+            for node in shown[:500]:
+                details += f"- {node} ({self.assets[node]['area']})\n"
+            if len(shown) > 500:
+                details += f"... and {len(shown) - 500} more\n"
         self.details_text.setText(details)
 
+    def clear_impact(self):
+        self.impact = None
+        self.path_start = None
+        self.highlighter.clear()
+
+    def highlight_impact(self):
+        # Rings the result in whatever view is drawn; the overview rings the areas involved
+        if self.impact is None or self.view_area is None:
+            return
+        nodes, ordered = self.impact
+        if self.view_area == "Overview":
+            nodes = list(dict.fromkeys(self.assets[node]['area'] for node in nodes))
+        elif self.cluster_view is not None:
+            # Assets folded into a cluster ring the cluster
+            ids = self.model.store.ids
+            local = self.cluster_view.tree.local
+            nodes = list(dict.fromkeys(self.cluster_view.element_of(ids[node]) for node in nodes
+                                       if node in ids and ids[node] in local))
+        index = self.scene.index
+        ids = [index[node] for node in nodes if node in index]
+        xy = self.scene.xy[ids]
+        self.highlighter.set(xy, size=self.scene.node_size, path=xy if ordered else None)
+
+    def expand_cluster(self, k):
+        view = self.cluster_view
+        tree = view.tree
+        xy = self.scene.xy[self.scene.index[tree.name(k)]]
+        # Children start around the cluster they replace, a small fraction of the view apart
+        spread = 0.02 * max(np.ptp(self.scene.xy, axis=0).max(), 1e-9)
+        children = [tree.name(c) for c in tree.children[k]] + [tree.names[i] for i in tree.direct[k].tolist()]
+        angles = np.linspace(0, 2 * np.pi, len(children), endpoint=False)
+        self.seed_positions[self.view_area] = {
+            child: xy + spread * np.array([np.cos(a), np.sin(a)]) for child, a in zip(children, angles)}
+        self.live_touched[self.view_area] = set(children)
+        self.cluster_state[self.view_area] = (tree, view.expanded | {k})
+        self.draw_graph()
+
+    def collapse_cluster(self, node):
+        # Folds the cluster holding node (an asset or a cluster) back into one node
+        view = self.cluster_view
+        tree = view.tree
+        if node in view.clusters:
+            k = tree.parent[view.clusters[node]]
+        else:
+            k = int(tree.owner[tree.local[self.model.store.ids[node]]])
+        if k <= 0:
+            return
+        expanded = {c for c in view.expanded if k not in tree.lineage(c)}
+        members = {tree.names[i] for i in tree.order[tree.start[k]:tree.end[k]].tolist()}
+        folded = [i for i, name in enumerate(self.scene.nodes)
+                  if name in members or (name in view.clusters and k in tree.lineage(view.clusters[name]))]
+        self.seed_positions[self.view_area] = {tree.name(k): self.scene.xy[folded].mean(axis=0)}
+        self.live_touched[self.view_area] = {tree.name(k)}
+        self.cluster_state[self.view_area] = (tree, expanded)
+        self.draw_graph()
+
+    def collapse_all_clusters(self):
+        if self.cluster_view is not None:
+            self.cluster_state[self.view_area] = (self.cluster_view.tree, {0})
+            self.draw_graph()
+
+    def reveal(self, node):
+        # Expands the clusters hiding an asset of the drawn clustered area; False if there are none
+        view = self.cluster_view
+        ids = self.model.store.ids
+        if view is None or node not in ids or ids[node] not in view.tree.local:
+            return False
+        chain = set(view.tree.ancestors(ids[node]))
+        if chain <= view.expanded:
+            return False
+        self.cluster_state[self.view_area] = (view.tree, view.expanded | chain)
+        self.draw_graph()
+        return True
+
+    def poll_feeds(self):
+        for feed in self.feeds:
+            self.batcher.add(feed.poll())
+        # Wait for the model, and for the search index build, comparisons, consistency checks and
+        # simulations so their background work never sees the model mid-update. A search index that
+        # failed to build does not hold deltas back.
+        if (self.model is None or self.search_worker.pool.activeThreadCount() or
+                self.diff_worker.pool.activeThreadCount() or
+                self.consistency_worker.pool.activeThreadCount() or
+                self.sim_worker.pool.activeThreadCount() or not self.batcher.due()):
+            return
+        result = apply_deltas(self.model, self.batcher.take())
+        tracer.instant("live deltas", applied=result.applied, rejected=len(result.errors))
+        message = f"Applied {result.applied} live deltas"
+        if result.errors:
+            message += f", {len(result.errors)} rejected: {result.errors[0]}"
+        self.statusBar().showMessage(message, STATUS_MESSAGE_MS)
+        if not result.applied:
+            return
+
+        for area in result.areas:
+            self.live_touched.setdefault(area, set()).update(result.touched)
+        self.live_touched.setdefault("All Assets", set()).update(result.touched)
+        self.live_touched.setdefault("Overview", set()).update(result.areas)
+        if result.area_set_changed:
+            self.area_selector.blockSignals(True)
+            self.area_selector.clear()
+            self.populate_area_selector()
+            if self.current_area not in ("Overview", "All Assets") and self.current_area not in self.functional_areas:
+                self.current_area = "Overview"
+            self.area_selector.setCurrentText(self.current_area)
+            self.area_selector.blockSignals(False)
+        if self.selected_node not in self.assets:
+            self.selected_node = None
+        if self.path_start not in self.assets:
+            self.path_start = None
+        if self.impact is not None:
+            self.impact = ([node for node in self.impact[0] if node in self.assets], self.impact[1])
+        if self.search_box.text().strip():
+            self.run_search(self.search_box.text())
+        if not self.area_lists.isHidden() and self.details_area in result.areas:
+            if self.details_area in self.functional_areas:
+                self.show_area_details(self.details_area)
+            else:
+                self.details_text.clear()
+        if self.baseline is not None:
+            self.submit_diff(self.baseline)
+        if self.consistency is not None:
+            self.submit_consistency()
+        if self.simulation is not None:
+            # Asset ids may have moved, so the recorded load no longer lines up; simulate again
+            self.clear_simulation()
+            self.run_simulation()
+        if self.current_area in ("Overview", "All Assets") or self.current_area in result.areas:
+            self.draw_graph()
+
+    def compare_with(self, path=None):
+        if path is None:
+            path, _ = QFileDialog.getOpenFileName(self, "Compare with an older inventory or snapshot")
+            if not path:
+                return
+        self.details_text.setText(f"Comparing with {path}...")
+        self.diff_worker.submit(lambda cancel: ModelDiff(load_baseline(path), self.model), context=self.model)
+
+    def submit_diff(self, baseline):
+        self.diff_worker.submit(lambda cancel: ModelDiff(baseline, self.model), context=self.model)
+
+    def on_diff_ready(self, model, diff):
+        if model is not self.model:
+            return
+        # Recomputed diffs after live updates refresh the overlay without replacing the details shown
+        if diff.old is not self.baseline:
+            self.details_text.setText("Changes since baseline\n\n" + diff.summary())
+        self.baseline = diff.old
+        self.diff = diff
+        if self.scene is not None and self.view_area is not None:
+            self.apply_overlay()
+            self.lod.refine()
+
+    def on_diff_failed(self, context, message):
+        print(f"Comparison failed:\n{message}")
+        self.details_text.setText(f"Comparison failed:\n{message}")
+
+    def clear_diff(self):
+        self.diff_worker.cancel()
+        self.baseline = None
+        self.diff = None
+        if self.scene is not None and self.view_area is not None:
+            self.apply_overlay()
+            self.lod.refine()
+
+    def apply_overlay(self):
+        # Recolours the drawn view by simulated load, else by change status with the removed assets
+        # placed, else by consistency problems; with none of them the view's own colours come back
+        scene = self.scene
+        if self.simulation is not None:
+            self.diff_ghosts.set_offsets(np.zeros((0, 2)))
+            self.apply_heat()
+            return
+        if self.diff is None:
+            self.diff_ghosts.set_offsets(np.zeros((0, 2)))
+            if self.consistency is not None:
+                self.apply_problems()
+            else:
+                scene.restore_colors()
+            return
+        overview = self.view_area == "Overview"
+        if overview:
+            area_status = self.diff.area_status()
+            status = [area_status.get(area, UNCHANGED) for area in scene.nodes]
+        else:
+            status = self.diff.node_status(scene.nodes).tolist()
+        scene.update_colors([STATUS_COLORS[s] for s in status])
+
+        ghosts = []
+        centre = scene.xy.mean(axis=0) if len(scene.xy) else np.zeros(2)
+        for name in self.diff.removed_in(self.view_area):
+            near = [scene.index[n] for n in self.diff.old_neighbours(name, overview) if n in scene.index]
+            ghosts.append(scene.xy[near].mean(axis=0) if near else centre)
+        self.diff_ghosts.set_offsets(np.asarray(ghosts, dtype=float).reshape(-1, 2))
+
+    def check_consistency(self):
+        self.details_text.setText("Checking consistency...")
+        self.submit_consistency()
+
+    def submit_consistency(self):
+        model = self.model
+        self.consistency_worker.submit(lambda cancel: ConsistencyReport(model, cancel=cancel.is_cancelled),
+                                       context=model)
+
+    def on_consistency_ready(self, model, report):
+        if model is not self.model:
+            return
+        # Rechecks after live updates refresh the overlay without replacing the details shown
+        if self.consistency is None:
+            self.details_text.setText("Consistency check\n\n" + report.summary())
+        self.consistency = report
+        if self.scene is not None and self.view_area is not None:
+            self.apply_overlay()
+            self.lod.refine()
+
+    def on_consistency_failed(self, context, message):
+        print(f"Consistency check failed:\n{message}")
+        self.details_text.setText(f"Consistency check failed:\n{message}")
+
+    def export_consistency(self):
+        if self.consistency is None:
+            self.details_text.setText("Run a consistency check before exporting its report.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export consistency report", "consistency_report.csv",
+                                              "CSV (*.csv);;JSON (*.json)")
+        if path:
+            self.consistency.write(path)
+            print(f"Consistency report written to {path}")
+
+    def clear_consistency(self):
+        self.consistency_worker.cancel()
+        self.consistency = None
+        if self.scene is not None and self.view_area is not None:
+            self.apply_overlay()
+            self.lod.refine()
+
+    def apply_problems(self):
+        # A drawn node shows the most severe problem of any asset behind it
+        order, starts = self.node_groups()
+        status = self.consistency.node_status(order)
+        worst = np.maximum.reduceat(status, starts) if len(order) else np.zeros(0, dtype=np.int8)
+        self.scene.update_colors([PROBLEM_COLORS[s] for s in worst.tolist()])
+
+    def choose_rates(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Flow parameters (JSONL)")
+        if path:
+            self.rates_path = path
+            self.run_simulation()
+
+    def run_simulation(self):
+        model = self.model
+        rates_path = self.rates_path
+
+        def job(cancel):
+            params = FlowParameters(model.store)
+            if rates_path:
+                params.load(rates_path)
+            return simulate(params, cancel=cancel)
+
+        self.details_text.setText("Simulating data flow...")
+        self.sim_worker.submit(job, context=model)
+
+    def on_simulation_ready(self, model, result):
+        if model is not self.model:
+            return
+        self.simulation = result
+        self.details_text.setText(result.summary(self.model.store.names))
+        self.sim_slider.blockSignals(True)
+        self.sim_slider.setRange(0, len(result) - 1)
+        self.sim_slider.setValue(len(result) - 1)
+        self.sim_slider.blockSignals(False)
+        self.sim_slider.setEnabled(True)
+        self.show_sim_frame(len(result) - 1)
+
+    def show_sim_frame(self, frame):
+        if self.simulation is None:
+            return
+        self.sim_time.setText(f"t = {self.simulation.times[frame]:.1f}s")
+        if self.scene is not None and self.view_area is not None:
+            self.apply_overlay()
+            self.lod.refine()
+
+    def next_sim_frame(self):
+        frame = self.sim_slider.value() + 1
+        if frame > self.sim_slider.maximum():
+            self.play_button.setChecked(False)
+            return
+        self.sim_slider.setValue(frame)
+
+    def toggle_playback(self, playing):
+        if playing and self.simulation is not None:
+            if self.sim_slider.value() == self.sim_slider.maximum():
+                self.sim_slider.setValue(0)
+            self.sim_timer.start()
+        else:
+            self.sim_timer.stop()
+            self.play_button.setChecked(False)
+
+    def clear_simulation(self):
+        self.sim_worker.cancel()
+        self.play_button.setChecked(False)
+        self.simulation = None
+        self.sim_slider.setEnabled(False)
+        self.sim_time.setText("")
+        if self.scene is not None and self.view_area is not None:
+            self.apply_overlay()
+            self.lod.refine()
+
+    def node_groups(self):
+        # Asset ids behind each drawn node, as one array sorted by node with each node's start
+        scene = self.scene
+        if self._node_groups is not None and self._node_groups[0] is scene:
+            return self._node_groups[1:]
+        store = self.model.store
+        if self.view_area == "Overview":
+            groups = [self.model.area_ids(area) for area in scene.nodes]
+        elif self.cluster_view is not None:
+            view = self.cluster_view
+            groups = [view.tree.members(view.clusters[node]) if node in view.clusters else [store.ids[node]]
+                      for node in scene.nodes]
+        else:
+            groups = None
+        if groups is None:
+            order = store.id_array(scene.nodes)
+            starts = np.arange(len(order))
+        else:
+            order = np.concatenate([np.asarray(g, dtype=np.int64) for g in groups])
+            starts = np.cumsum([0] + [len(g) for g in groups[:-1]])
+        self._node_groups = (scene, order, starts)
+        return order, starts
+
+    def apply_heat(self):
+        # A drawn node is as hot as the busiest asset behind it
+        order, starts = self.node_groups()
+        utilisation = self.simulation.utilisation[self.sim_slider.value()]
+        heat = np.maximum.reduceat(utilisation[order], starts) if len(order) else np.zeros(0)
+        self.scene.update_colors(HEAT_CMAP(np.clip(heat, 0.0, 1.0)))
+
+    def show_frame_times(self, checked):
+        self.frame_text.set_visible(checked)
+        self.canvas.draw_idle()
+
+    def closeEvent(self, event):
+        self.sim_timer.stop()
+        self.feed_timer.stop()
+        for feed in self.feeds:
+            feed.close()
+        self.layout_worker.cancel()
+        self.layout_worker.wait()
+        self.model_worker.wait()
+        self.search_worker.wait()
+        self.diff_worker.wait()
+        self.consistency_worker.wait()
+        self.sim_worker.wait()
+        super().closeEvent(event)
+
+    def go_to_area(self, area):
+        # Selects the area in the overview, or just shows its details from any other view
+        if self.view_area == "Overview" and area in self.scene.index:
+            self.select_node(self.scene.index[area])
+        elif area in self.functional_areas:
+            self.show_area_details(area)
+
+    def show_area_details(self, area):
+        details = self.details.area(area)
+        self.details_text.setPlainText(details.text)
+        self.details_area = area
+        self.member_rows.set_rows(details.members)
+        self.connected_rows.set_rows(details.connected, lambda row: f"{row[0]}: {row[1]} out / {row[2]} in")
+        self.member_list.scrollToTop()
+        self.connected_list.scrollToTop()
+        self.area_lists.setVisible(True)
+
     def show_asset_details(self, node):
-        asset_data = self.assets[node]
-        details = f"Asset: {node}\n\n"
-        details += f"Functional Area: {asset_data['area']}\n\n"
-        details += f"Description: {asset_data['description']}\n\n"
-        details += "Key Features:\n"
-        for feature in asset_data['key_features']:
-            details += f"- {feature}\n"
-        details += f"\nRelated Systems: {', '.join(asset_data['related_systems'])}\n\n"
-        details += f"Data Flow: {asset_data['data_flow']}\n\n"
-        details += f"Business Impact: {asset_data['business_impact']}"
+        self.details_text.setPlainText(self.details.asset_text(node))
 
-        self.details_text.setText(details)
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="CBA System Visualization")
+    parser.add_argument("--inventory", action="append", metavar="FILE",
+                        help="Asset/edge inventory (.jsonl or .csv); may be given more than once")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="Open a binary snapshot instead of building the model")
+    parser.add_argument("--save-snapshot", metavar="FILE",
+                        help="Write the built model and its layouts to a snapshot file")
+    parser.add_argument("--layout-cache", default=os.environ.get("CBA_LAYOUT_CACHE", DEFAULT_CACHE_DIR),
+                        help="Directory for persisted layouts (default: %(default)s)")
+    parser.add_argument("--no-layout-cache", action="store_true",
+                        help="Keep layouts in memory only")
+    parser.add_argument("--watch", action="append", default=[], metavar="SPEC",
+                        help="Apply live topology deltas from a JSONL file being appended to, "
+                             "or from tcp:PORT on localhost; may be given more than once")
+    parser.add_argument("--rates", metavar="FILE",
+                        help="Flow simulation parameters: JSONL asset rates/injections and edge volumes")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="Highlight what changed since an older inventory or snapshot")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="On exit, write timing spans as a Chrome trace (chrome://tracing, Perfetto) "
+                             "and print a summary")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="Run the GUI thread under cProfile and write the stats on exit")
+    parser.add_argument("--frame-times", action="store_true",
+                        help="Show recent canvas draw times on the graph")
+    parser.add_argument("--startup-report", metavar="FILE",
+                        help="Once the first view is drawn, print how long each step of startup took "
+                             "and write it to FILE as JSON")
+    parser.add_argument("--quit-after-startup", action="store_true",
+                        help="Exit as soon as the first view is drawn, e.g. to measure startup")
+    return parser.parse_known_args(argv)
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    main_window = CBAVisualization()
+    # Consistency checks of large estates run in spawned processes, which a frozen build must let start
+    multiprocessing.freeze_support()
+    args, qt_args = parse_args(sys.argv[1:])
+    app = QApplication(sys.argv[:1] + qt_args)
+    if args.trace:
+        tracer.enable()
+    if args.profile:
+        tracer.start_profile()
+    main_window = CBAVisualization(inventory_paths=args.inventory,
+                                   snapshot_path=args.snapshot,
+                                   layout_cache_dir=None if args.no_layout_cache else args.layout_cache,
+                                   watch=args.watch, compare_path=args.compare,
+                                   rates_path=args.rates, frame_times=args.frame_times)
+    if args.save_snapshot:
+        main_window.model_loaded.connect(lambda: main_window.save_snapshot(args.save_snapshot))
+
+    def on_started():
+        if args.startup_report:
+            print(main_window.startup_report())
+            with open(args.startup_report, "w", encoding="utf-8") as f:
+                json.dump(main_window.startup, f, indent=1)
+        if args.quit_after_startup:
+            main_window.close()
+
+    main_window.started.connect(on_started)
     main_window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    status = app.exec_()
+    if args.profile:
+        tracer.stop_profile(args.profile)
+        print(f"Profile written to {args.profile}")
+    if args.trace:
+        tracer.export_chrome_trace(args.trace)
+        print(tracer.summary())
+        print(f"Trace written to {args.trace}")
+    sys.exit(status)
\ No newline at end of file
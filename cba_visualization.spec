@@ -1,5 +1,13 @@
 # -*- mode: python ; coding: utf-8 -*-
+#
+# pyinstaller cba_visualization.spec               one-file executable (unpacked on every launch)
+# pyinstaller cba_visualization.spec -- --onedir   a folder with the executable and its libraries,
+#                                                  which starts much faster
+import argparse
 
+parser = argparse.ArgumentParser()
+parser.add_argument("--onedir", action="store_true")
+options = parser.parse_args()
 
 a = Analysis(
     ['cba_visualization.py'],
@@ -10,29 +18,60 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # GUI toolkits and tools matplotlib and networkx can use but this application does not
+    excludes=['tkinter', 'matplotlib.backends.backend_tkagg', 'matplotlib.backends.backend_wxagg',
+              'matplotlib.backends.backend_gtk3agg', 'IPython', 'pytest'],
     noarchive=False,
-    optimize=0,
+    # Bytecode is compiled once at build time, with asserts stripped
+    optimize=1 if options.onedir else 0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='cba_visualization',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-)
+if options.onedir:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='cba_visualization',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        # UPX-packed libraries would have to be unpacked on every start
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        name='cba_visualization',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='cba_visualization',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
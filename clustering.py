@@ -0,0 +1,264 @@
+import numpy as np
+
+# Areas with more assets than this are drawn as expandable clusters instead of one node per asset
+CLUSTER_THRESHOLD = 200
+# Most elements (child clusters plus loose assets) revealed by expanding one cluster
+MAX_CHILDREN = 40
+PROPAGATION_ROUNDS = 30
+
+
+def _undirected(src, dst, weights):
+    keep = src != dst
+    u = np.concatenate([src[keep], dst[keep]]).astype(np.int64)
+    v = np.concatenate([dst[keep], src[keep]]).astype(np.int64)
+    return u, v, np.concatenate([weights[keep], weights[keep]])
+
+
+def _best_labels(n, u, v, w, labels, rng, degree=None, two_m=None):
+    # For every node the neighbouring label (or its own) with the best score, where the score is the
+    # weight linking the node to the label. With degrees given, the expected weight under the
+    # configuration model is subtracted, which is the modularity gain Louvain uses; that stops one
+    # label from swallowing a sparse graph. A little noise breaks ties at random.
+    nodes = np.arange(n, dtype=np.int64)
+    u = np.concatenate([u, nodes])
+    lab = np.concatenate([labels[v], labels])
+    w = np.concatenate([w, np.zeros(n)])
+    keys, inverse = np.unique(u * n + lab, return_inverse=True)
+    score = np.bincount(inverse.reshape(-1), weights=w)
+    node, label = keys // n, keys % n
+    if degree is not None:
+        volume = np.bincount(labels, weights=degree, minlength=n)
+        volume = volume[label] - np.where(label == labels[node], degree[node], 0.0)
+        score = score - degree[node] * volume / two_m
+    score = score + rng.random(len(keys)) * 1e-9
+    order = np.lexsort((-score, node))
+    first = order[np.r_[True, node[order][1:] != node[order][:-1]]]
+    best = labels.copy()
+    best[node[first]] = label[first]
+    return best
+
+
+def label_propagation(n, src, dst, weights=None, internal=None, seed=0, rounds=PROPAGATION_ROUNDS):
+    # Modularity-aware label propagation on the undirected graph (Louvain's local moving phase,
+    # vectorised over all edges). Each round a random half of the nodes moves to its best label,
+    # which keeps the synchronous update from oscillating. internal is the weight of edges already
+    # collapsed inside each node. Returns compact labels 0..k-1.
+    weights = np.ones(len(src)) if weights is None else np.asarray(weights, dtype=float)
+    u, v, w = _undirected(src, dst, weights)
+    labels = np.arange(n, dtype=np.int64)
+    if n == 0 or len(u) == 0:
+        return labels
+    degree = np.bincount(u, weights=w, minlength=n)
+    if internal is not None:
+        degree = degree + 2 * internal
+    two_m = degree.sum()
+    rng = np.random.default_rng(seed)
+    for _ in range(rounds):
+        best = _best_labels(n, u, v, w, labels, rng, degree, two_m)
+        moving = best != labels
+        if not moving.any():
+            break
+        update = moving & (rng.random(n) < 0.5)
+        labels[update] = best[update]
+    return np.unique(labels, return_inverse=True)[1].reshape(-1)
+
+
+def heavy_edge_matching(n, src, dst, weights, internal, seed=0):
+    # Pairs every node with the neighbour it is most tightly linked to, relative to both of their
+    # volumes so big groups do not snowball, where the choice is mutual (as in multilevel graph
+    # coarsening). The best edge of each component is always matched, so this makes progress on any
+    # graph with edges.
+    u, v, w = _undirected(src, dst, np.asarray(weights, dtype=float))
+    volume = np.bincount(u, weights=w, minlength=n) + 2 * internal
+    nodes = np.arange(n, dtype=np.int64)
+    # Staying put scores zero, so every node with an edge picks a neighbour
+    best = _best_labels(n, u, v, w / (volume[u] * volume[v]), nodes, np.random.default_rng(seed))
+    mutual = best[best] == nodes
+    labels = np.where(mutual, np.minimum(nodes, best), nodes)
+    return np.unique(labels, return_inverse=True)[1].reshape(-1)
+
+
+def _group_edges(labels, count, src, dst, weights):
+    # Collapse edges onto groups, summing weights; returns the edges between groups and the weight
+    # of the edges inside each group
+    gs, gd = labels[src], labels[dst]
+    cross = gs != gd
+    internal = np.bincount(gs[~cross], weights=weights[~cross], minlength=count)
+    pairs, inverse = np.unique(np.stack([gs[cross], gd[cross]], axis=1), axis=0, return_inverse=True)
+    pairs = pairs.reshape(-1, 2)
+    summed = np.bincount(inverse.reshape(-1), weights=weights[cross], minlength=len(pairs))
+    return pairs[:, 0], pairs[:, 1], summed, internal
+
+
+def partition(n, src, dst, max_groups=MAX_CHILDREN, seed=0):
+    # At most max_groups groups of densely linked nodes. Communities are found Louvain style: local
+    # moving, then the same on the graph of communities, until nothing moves. If that leaves too
+    # many, unlinked communities are pooled and the rest merged along their heaviest links.
+    labels = np.arange(n, dtype=np.int64)
+    count = n
+    g_src, g_dst, g_w = src, dst, np.ones(len(src))
+    internal = np.zeros(n)
+    louvain = True
+    while count > 1:
+        if louvain:
+            coarse = label_propagation(count, g_src, g_dst, g_w, internal, seed=seed)
+            louvain = int(coarse.max()) + 1 < count
+        if not louvain:
+            if count <= max_groups:
+                break
+            linked = np.zeros(count, dtype=bool)
+            linked[g_src] = True
+            linked[g_dst] = True
+            if (~linked).sum() > 1:
+                # Groups with no links to any other are pooled into one
+                coarse = np.where(linked, np.cumsum(linked) - 1, linked.sum())
+            else:
+                coarse = heavy_edge_matching(count, g_src, g_dst, g_w, internal, seed=seed)
+                if int(coarse.max()) + 1 == count:
+                    coarse = np.arange(count) * max_groups // count
+        coarse_count = int(coarse.max()) + 1
+        labels = coarse[labels]
+        merged = np.bincount(coarse, weights=internal, minlength=coarse_count)
+        g_src, g_dst, g_w, inside = _group_edges(coarse, coarse_count, g_src, g_dst, g_w)
+        internal = merged + inside
+        count = coarse_count
+    return labels
+
+
+class ClusterTree:
+    # Clusters within one area, nested so that expanding any cluster reveals at most max_children
+    # elements. Cluster 0 is the root. Members of cluster k are order[start[k]:end[k]] (local indices
+    # into ids); direct[k] are the members not inside any child cluster. Built from the members'
+    # names, ids and the edges among them only, never the store, so it can be built on a worker.
+    def __init__(self, names, ids, src, dst, max_children=MAX_CHILDREN, seed=0):
+        self.names = names
+        self.ids = np.asarray(ids, dtype=np.int64)
+        n = len(self.ids)
+        self.local = {node_id: i for i, node_id in enumerate(self.ids.tolist())}
+        lookup = np.full(int(self.ids.max()) + 1 if n else 0, -1, dtype=np.int64)
+        lookup[self.ids] = np.arange(n)
+        self.src, self.dst = lookup[src], lookup[dst]
+        self.degree = np.bincount(np.concatenate([self.src, self.dst]), minlength=n)
+
+        self.parent = []
+        self.children = []
+        self.direct = []
+        self.start = []
+        self.end = []
+        self.order = np.empty(n, dtype=np.int64)
+        # Cluster directly holding each asset
+        self.owner = np.zeros(n, dtype=np.int64)
+        self._build(max_children, seed)
+        self.hub = [self.names[self.order[s:e][np.argmax(self.degree[self.order[s:e]])]]
+                    for s, e in zip(self.start, self.end)]
+
+    def _build(self, max_children, seed):
+        stack = [(-1, np.arange(len(self.ids)))]
+        while stack:
+            parent, members = stack.pop()
+            k = len(self.parent)
+            self.parent.append(parent)
+            self.children.append([])
+            if parent >= 0:
+                self.children[parent].append(k)
+            if len(members) <= max_children:
+                self.direct.append(members)
+                continue
+            # Sub-partition on the edges inside this cluster only
+            lookup = np.full(len(self.ids), -1, dtype=np.int64)
+            lookup[members] = np.arange(len(members))
+            keep = (lookup[self.src] >= 0) & (lookup[self.dst] >= 0)
+            labels = partition(len(members), lookup[self.src[keep]], lookup[self.dst[keep]], max_children, seed)
+            if labels.max() == 0:
+                # One tight blob: split it into as few even chunks as keep each within max_children
+                chunks = min(-(-len(members) // max_children), max_children)
+                labels = np.arange(len(members)) * chunks // len(members)
+            order = np.argsort(labels, kind="stable")
+            groups = np.split(members[order], np.flatnonzero(np.diff(labels[order])) + 1)
+            self.direct.append(np.concatenate([g for g in groups if len(g) == 1] or [np.zeros(0, dtype=np.int64)]))
+            for group in reversed([g for g in groups if len(g) > 1]):
+                stack.append((k, group))
+
+        # Depth-first order, so every cluster's members are contiguous
+        self.start = [0] * len(self.parent)
+        self.end = [0] * len(self.parent)
+        position = 0
+        stack = [0]
+        while stack:
+            k = stack.pop()
+            if k < 0:
+                self.end[~k] = position
+                continue
+            self.start[k] = position
+            self.order[position:position + len(self.direct[k])] = self.direct[k]
+            self.owner[self.direct[k]] = k
+            position += len(self.direct[k])
+            stack.append(~k)
+            stack.extend(reversed(self.children[k]))
+
+    def __len__(self):
+        return len(self.parent)
+
+    def size(self, k):
+        return self.end[k] - self.start[k]
+
+    def name(self, k):
+        return f"{self.hub[k]} (+{self.size(k) - 1})"
+
+    def members(self, k):
+        return self.ids[self.order[self.start[k]:self.end[k]]]
+
+    def lineage(self, k):
+        # k and the clusters enclosing it, up to the root
+        chain = []
+        while k >= 0:
+            chain.append(k)
+            k = self.parent[k]
+        return chain
+
+    def ancestors(self, node_id):
+        # Clusters that must be expanded for the asset to be drawn on its own
+        return self.lineage(int(self.owner[self.local[node_id]]))
+
+    def view(self, expanded):
+        return ClusterView(self, expanded)
+
+
+class ClusterView:
+    # What is drawn for one set of expanded clusters: unexpanded clusters as single nodes, and the
+    # loose assets of expanded ones. Edges are aggregated between whatever is drawn.
+    def __init__(self, tree, expanded):
+        self.tree = tree
+        self.expanded = set(expanded) | {0}
+        names = tree.names
+        self.nodes = []
+        self.clusters = {}
+        self.element = np.empty(len(tree.ids), dtype=np.int64)
+        stack = [0]
+        while stack:
+            k = stack.pop()
+            for i in tree.direct[k].tolist():
+                self.element[i] = len(self.nodes)
+                self.nodes.append(names[i])
+            for c in reversed(tree.children[k]):
+                if c in self.expanded:
+                    stack.append(c)
+                else:
+                    self.element[tree.order[tree.start[c]:tree.end[c]]] = len(self.nodes)
+                    self.clusters[tree.name(c)] = c
+                    self.nodes.append(tree.name(c))
+
+        es, ed = self.element[tree.src], self.element[tree.dst]
+        keep = es != ed
+        pairs, weights = np.unique(np.stack([es[keep], ed[keep]], axis=1), axis=0, return_counts=True)
+        self.edges = [(self.nodes[s], self.nodes[t]) for s, t in pairs.reshape(-1, 2).tolist()]
+        self.weights = weights.tolist()
+        import networkx as nx
+        self.graph = nx.DiGraph()
+        self.graph.add_nodes_from(self.nodes)
+        self.graph.add_weighted_edges_from((s, t, w) for (s, t), w in zip(self.edges, self.weights))
+        self.graph.graph["clusters"] = self
+
+    def element_of(self, node_id):
+        # Name of the drawn node that stands for the asset
+        return self.nodes[self.element[self.tree.local[node_id]]]
@@ -0,0 +1,278 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cba_model import load_model
+from instrumentation import span
+
+# Problem kinds, least to most severe; an asset is shown with the most severe problem it is part of
+CONSISTENT = 0
+ONE_SIDED = 1
+UNBACKED_FLOW = 2
+UNDECLARED = 3
+UNBACKED = 4
+DUPLICATE = 5
+DANGLING = 6
+PROBLEM_NAMES = {
+    CONSISTENT: "consistent",
+    ONE_SIDED: "one-sided relation",
+    UNBACKED_FLOW: "data flow without integration",
+    UNDECLARED: "undeclared integration",
+    UNBACKED: "relation without integration",
+    DUPLICATE: "duplicate edge",
+    DANGLING: "dangling reference",
+}
+PROBLEM_COLORS = {CONSISTENT: "#d9d9d9", ONE_SIDED: "#bcbd22", UNBACKED_FLOW: "#17becf", UNDECLARED: "#ff7f0e",
+                  UNBACKED: "#9467bd", DUPLICATE: "#8c564b", DANGLING: "#d62728"}
+
+# Inventories with at least this many assets are checked in worker processes, in chunks of this size
+PARALLEL_MIN_ASSETS = 100_000
+CHUNK_SIZE = 20_000
+# Asset names are found in data flow text as runs of words; names longer than this are not looked for
+MAX_NAME_WORDS = 6
+WORD = re.compile(r"\w+(?:[/&.'-]\w+)*")
+# How many problems of each kind the summary lists before eliding the rest
+SUMMARY_LIMIT = 50
+REPORT_FIELDS = ("problem", "source", "target", "count")
+
+
+def name_index(names):
+    # name -> id, and how many words the longest name starting with each word has
+    ids = {}
+    longest = {}
+    for i, name in enumerate(names):
+        ids[name] = i
+        words = WORD.findall(name)
+        if words and len(words) <= MAX_NAME_WORDS and " ".join(words) not in ids:
+            ids[" ".join(words)] = i
+        if words:
+            longest[words[0]] = max(longest.get(words[0], 0), len(words))
+    return ids, longest
+
+
+def find_mentions(text, ids, longest):
+    # Ids of the assets named in text, longest name first at every word
+    words = WORD.findall(text)
+    found = []
+    i = 0
+    while i < len(words):
+        for n in range(min(longest.get(words[i], 0), len(words) - i), 0, -1):
+            node_id = ids.get(" ".join(words[i:i + n]))
+            if node_id is not None:
+                found.append(node_id)
+                i += n
+                break
+        else:
+            i += 1
+    return found
+
+
+_worker_index = None
+
+
+def _init_worker(names):
+    global _worker_index
+    _worker_index = name_index(names)
+
+
+def check_chunk(start, rows, index=None):
+    # One pass over (related systems, data flow) rows of assets start, start + 1, ...: declared
+    # relations and data flow mentions as id pairs, and names that match no asset
+    ids, longest = index or _worker_index
+    related_src, related_dst, mention_src, mention_dst, dangling = [], [], [], [], []
+    for node_id, (related, data_flow) in enumerate(rows, start):
+        for name in related:
+            other = ids.get(name)
+            if other is None:
+                dangling.append((node_id, name))
+            elif other != node_id:
+                related_src.append(node_id)
+                related_dst.append(other)
+        for other in find_mentions(data_flow, ids, longest):
+            if other != node_id:
+                mention_src.append(node_id)
+                mention_dst.append(other)
+    return (np.asarray(related_src, dtype=np.int64), np.asarray(related_dst, dtype=np.int64),
+            np.asarray(mention_src, dtype=np.int64), np.asarray(mention_dst, dtype=np.int64), dangling)
+
+
+class ConsistencyReport:
+    # Declared relations (related systems and assets named in the data flow) checked against the
+    # integration edges. Pairs are compared as sorted integer keys source * n + target.
+    def __init__(self, model, jobs=None, cancel=None):
+        self.model = model
+        store = model.store
+        self.names = list(store.names)
+        n = len(self.names)
+        self.n_assets = n
+        self.n_edges = store.number_of_edges()
+
+        with span("consistency check", assets=n):
+            rows = [(record.related_systems, record.data_flow) for record in map(store.record, range(n))]
+            chunks = [(start, rows[start:start + CHUNK_SIZE]) for start in range(0, n, CHUNK_SIZE)]
+            if jobs == 1 or n < PARALLEL_MIN_ASSETS:
+                index = name_index(self.names)
+                results = []
+                for start, chunk in chunks:
+                    if cancel is not None and cancel():
+                        return
+                    results.append(check_chunk(start, chunk, index))
+            else:
+                # Spawned rather than forked: the window runs this on a worker thread, and a fork would copy
+                # a process with Qt and matplotlib threads running
+                with ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_init_worker, initargs=(self.names,)) as pool:
+                    futures = [pool.submit(check_chunk, start, chunk) for start, chunk in chunks]
+                    results = []
+                    for future in futures:
+                        if cancel is not None and cancel():
+                            pool.shutdown(cancel_futures=True)
+                            return
+                        results.append(future.result())
+            related_src, related_dst, mention_src, mention_dst = (
+                np.concatenate([result[k] for result in results]) if results else np.zeros(0, dtype=np.int64)
+                for k in range(4))
+            self.dangling = [item for result in results for item in result[4]]
+
+            def undirected(keys):
+                a, b = keys // n, keys % n
+                return np.minimum(a, b) * n + np.maximum(a, b)
+
+            src, dst = store.edge_arrays()
+            edges = np.unique(src.astype(np.int64) * n + dst)
+            linked = np.unique(undirected(edges))
+            declared = np.unique(related_src * n + related_dst)
+            backed = np.isin(undirected(declared), linked)
+            # Listed with no integration either way; listed and integrated, but not listed back
+            self.unbacked = declared[~backed]
+            reverse = (declared % n) * n + declared // n
+            self.one_sided = declared[backed & ~np.isin(reverse, declared)]
+            self.undeclared = edges[~np.isin(undirected(edges), undirected(declared))]
+            mentions = np.unique(mention_src * n + mention_dst)
+            self.unbacked_flow = mentions[~np.isin(undirected(mentions), linked)]
+            # Edges listed more than once, with how many times; the store keeps only the first
+            self.duplicates = sorted((store.names[s], store.names[t], count + 1)
+                                     for (s, t), count in store.duplicate_edges.items())
+
+            self.status = np.zeros(n, dtype=np.int8)
+            for kind, keys in ((ONE_SIDED, self.one_sided), (UNBACKED_FLOW, self.unbacked_flow),
+                               (UNDECLARED, self.undeclared), (UNBACKED, self.unbacked)):
+                self.status[keys // n] = kind
+                self.status[keys % n] = kind
+            ids = store.ids
+            for source, target, _ in self.duplicates:
+                self.status[[ids[source], ids[target]]] = DUPLICATE
+            self.status[[node_id for node_id, _ in self.dangling]] = DANGLING
+
+    def counts(self):
+        return {PROBLEM_NAMES[DANGLING]: len(self.dangling), PROBLEM_NAMES[DUPLICATE]: len(self.duplicates),
+                PROBLEM_NAMES[UNBACKED]: len(self.unbacked), PROBLEM_NAMES[UNDECLARED]: len(self.undeclared),
+                PROBLEM_NAMES[UNBACKED_FLOW]: len(self.unbacked_flow), PROBLEM_NAMES[ONE_SIDED]: len(self.one_sided)}
+
+    def is_empty(self):
+        return not any(self.counts().values())
+
+    def problems(self):
+        # (problem, source, target, count) rows, most severe kinds first
+        names, n = self.names, self.n_assets
+        for node_id, name in self.dangling:
+            yield PROBLEM_NAMES[DANGLING], names[node_id], name, 1
+        for source, target, count in self.duplicates:
+            yield PROBLEM_NAMES[DUPLICATE], source, target, count
+        for kind, keys in ((UNBACKED, self.unbacked), (UNDECLARED, self.undeclared),
+                           (UNBACKED_FLOW, self.unbacked_flow), (ONE_SIDED, self.one_sided)):
+            for key in keys.tolist():
+                yield PROBLEM_NAMES[kind], names[key // n], names[key % n], 1
+
+    def node_status(self, ids):
+        # Problem of each asset id; assets added since the check count as consistent until it is rerun
+        ids = np.asarray(ids, dtype=np.int64)
+        status = np.zeros(len(ids), dtype=np.int8)
+        known = ids < len(self.status)
+        status[known] = self.status[ids[known]]
+        return status
+
+    def summary(self):
+        details = f"Checked {self.n_assets} assets and {self.n_edges} edges\n\n"
+        if self.is_empty():
+            return details + "No problems found."
+        headings = {
+            PROBLEM_NAMES[DANGLING]: "Dangling references (related systems not in the inventory)",
+            PROBLEM_NAMES[DUPLICATE]: "Duplicate edges (listed more than once)",
+            PROBLEM_NAMES[UNBACKED]: "Relations without an integration (no edge either way)",
+            PROBLEM_NAMES[UNDECLARED]: "Undeclared integrations (edges neither asset lists as related)",
+            PROBLEM_NAMES[UNBACKED_FLOW]: "Data flows without an integration (asset named, no edge either way)",
+            PROBLEM_NAMES[ONE_SIDED]: "One-sided relations (related system does not list the asset back)",
+        }
+        listed = {}
+        lines = {}
+        for problem, source, target, count in self.problems():
+            listed[problem] = listed.get(problem, 0) + 1
+            if listed[problem] <= SUMMARY_LIMIT:
+                suffix = f" ({count} times)" if count > 1 else ""
+                lines.setdefault(problem, []).append(f"- {source} -> {target}{suffix}")
+        for problem, count in self.counts().items():
+            if not count:
+                continue
+            details += f"{headings[problem]}: {count}\n"
+            details += "\n".join(lines[problem]) + "\n"
+            if count > SUMMARY_LIMIT:
+                details += f"... and {count - SUMMARY_LIMIT} more\n"
+            details += "\n"
+        return details
+
+    def write(self, path):
+        # CSV for a .csv path, otherwise JSON with the counts alongside the problems
+        if os.path.splitext(path)[1].lower() == ".csv":
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(REPORT_FIELDS)
+                writer.writerows(self.problems())
+            return
+        report = {
+            "assets": self.n_assets,
+            "edges": self.n_edges,
+            "counts": self.counts(),
+            "problems": [dict(zip(REPORT_FIELDS, row)) for row in self.problems()],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Check declared related systems and data flows against the "
+                                                 "integration edges")
+    parser.add_argument("--inventory", action="append", metavar="FILE",
+                        help="Asset/edge inventory (.jsonl or .csv); may be given more than once")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="Open a binary snapshot instead of building the model")
+    parser.add_argument("--out", metavar="FILE", help="Write the problems found to a .csv or .json report")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help=f"Worker processes for inventories of {PARALLEL_MIN_ASSETS} assets or more "
+                             f"(default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    model, _ = load_model(args.inventory, args.snapshot)
+    start = time.perf_counter()
+    report = ConsistencyReport(model, jobs=args.jobs)
+    print(report.summary().rstrip())
+    print(f"Checked in {time.perf_counter() - start:.2f}s")
+    if args.out:
+        report.write(args.out)
+        print(f"Report written to {args.out}")
+    return 0 if report.is_empty() else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+ASSET_TEMPLATE = ("Asset: {name}\n\n"
+                  "Functional Area: {area}\n\n"
+                  "Description: {description}\n\n"
+                  "Key Features:\n{features}\n"
+                  "Related Systems: {related}\n\n"
+                  "Data Flow: {data_flow}\n\n"
+                  "Business Impact: {business_impact}")
+AREA_TEMPLATE = ("Functional Area: {area}\n\n"
+                 "{assets} assets, {connected} connected areas\n"
+                 "{out_count} integrations out, {in_count} in")
+# Rendered asset details kept at once; areas are few enough to keep them all
+MAX_CACHED_ASSETS = 10_000
+
+
+class AreaDetails:
+    def __init__(self, text, members, connected):
+        self.text = text
+        # Asset names, and (area, integrations out, integrations in) most connected first
+        self.members = members
+        self.connected = connected
+
+
+class DetailsCache:
+    # Details pane contents, rendered once and reused until the data behind them changes. Asset text is
+    # checked against the asset's record, which the model replaces whenever the asset is updated; area
+    # details depend on membership and integration counts, so they go whenever the model changes.
+    def __init__(self, model):
+        self.model = model
+        self._assets = OrderedDict()
+        self._areas = {}
+        self._version = model.version
+
+    def asset_text(self, name):
+        record = self.model.assets[name]
+        cached = self._assets.get(name)
+        if cached is not None and cached[0] is record:
+            self._assets.move_to_end(name)
+            return cached[1]
+        text = ASSET_TEMPLATE.format(
+            name=name, area=record.area, description=record.description,
+            features="".join(f"- {feature}\n" for feature in record.key_features),
+            related=", ".join(record.related_systems), data_flow=record.data_flow,
+            business_impact=record.business_impact)
+        self._assets[name] = (record, text)
+        if len(self._assets) > MAX_CACHED_ASSETS:
+            self._assets.popitem(last=False)
+        return text
+
+    def area(self, area):
+        if self.model.version != self._version:
+            self._areas.clear()
+            self._version = self.model.version
+        details = self._areas.get(area)
+        if details is None:
+            counts = self.model.integration_counts(area)
+            connected = [(other, out_count, in_count) for other, (out_count, in_count) in
+                         sorted(counts.items(), key=lambda item: -sum(item[1]))]
+            # A copy, so live updates to the model never change rows under a view showing them
+            members = list(self.model.functional_areas[area])
+            text = AREA_TEMPLATE.format(area=area, assets=len(members), connected=len(connected),
+                                        out_count=sum(row[1] for row in connected),
+                                        in_count=sum(row[2] for row in connected))
+            details = self._areas[area] = AreaDetails(text, members, connected)
+        return details
+
+
+class LazyListModel(QAbstractListModel):
+    # Read-only rows for a QListView, formatted only when the view asks for them, i.e. when they
+    # scroll into sight; with uniform item sizes a list of any length costs the same to show
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = ()
+        self.format = str
+
+    def set_rows(self, rows, format=str):
+        self.beginResetModel()
+        self.rows = rows
+        self.format = format
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.format(self.rows[index.row()])
+        return None
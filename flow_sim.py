@@ -0,0 +1,140 @@
+import json
+
+import numpy as np
+
+# Messages per second an asset can process, unless the parameters say otherwise
+DEFAULT_RATE = 100.0
+# Messages per second every asset originates itself
+DEFAULT_INJECT = 10.0
+# Share of the messages an asset processes that it passes on downstream; the rest end there, so load
+# circulating through feedback loops dies out
+DEFAULT_FORWARD = 0.5
+DEFAULT_DT = 0.1
+DEFAULT_STEPS = 600
+# Recorded history is thinned so steps * assets stays under this many values per series (4 MB as
+# float32); the last step is always recorded
+MAX_RECORDED_VALUES = 1_000_000
+# An asset is saturated once it runs at this fraction of its rate
+SATURATION = 0.99
+
+
+def _amount(row, field):
+    # Rates, arrivals and volumes must be finite and not negative, or queues go negative or NaN
+    value = float(row[field])
+    if not np.isfinite(value) or value < 0:
+        raise ValueError(f"{field} must be a finite number of at least 0, not {row[field]!r}")
+    return value
+
+
+class FlowParameters:
+    # Per-asset processing rates and external arrivals, and per-edge volumes: the messages sent
+    # along an edge for each message its source processes. Edges follow store.edge_arrays() order.
+    def __init__(self, store):
+        self.store = store
+        n = len(store)
+        self.src, self.dst = store.edge_arrays()
+        self.rate = np.full(n, DEFAULT_RATE)
+        self.inject = np.full(n, DEFAULT_INJECT)
+        # By default what is passed on is split evenly over the outgoing edges
+        out_degree = np.bincount(self.src, minlength=n)
+        self.volume = DEFAULT_FORWARD / out_degree[self.src] if len(self.src) else np.zeros(0)
+
+    def load(self, path):
+        # JSONL rows {"name", "rate", "inject"} for assets and {"source", "target", "volume"} for edges
+        ids = self.store.ids
+        edge_index = {}
+        for e, (s, t) in enumerate(zip(self.src.tolist(), self.dst.tolist())):
+            edge_index.setdefault((s, t), e)
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    row = json.loads(line)
+                    if "source" in row:
+                        key = (ids[row["source"]], ids[row["target"]])
+                        if key not in edge_index:
+                            raise KeyError(f"{row['source']} -> {row['target']}")
+                        self.volume[edge_index[key]] = _amount(row, "volume")
+                    else:
+                        node_id = ids[row["name"]]
+                        if "rate" in row:
+                            self.rate[node_id] = _amount(row, "rate")
+                        if "inject" in row:
+                            self.inject[node_id] = _amount(row, "inject")
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"{path}:{line_number}: ignoring flow parameter: {e}")
+        return self
+
+
+class SimulationResult:
+    def __init__(self, times, queue, utilisation, processed):
+        self.times = times
+        # Recorded steps x assets
+        self.queue = queue
+        self.utilisation = utilisation
+        self.processed = processed
+
+    def __len__(self):
+        return len(self.times)
+
+    def saturated(self):
+        # Assets at capacity in the last recorded step, longest queue first
+        last = self.utilisation[-1]
+        ids = np.flatnonzero(last >= SATURATION)
+        return ids[np.argsort(-self.queue[-1, ids], kind="stable")]
+
+    def growing(self):
+        # Assets whose queue grew over the second half of the run
+        half = len(self.times) // 2
+        return np.flatnonzero(self.queue[-1] > self.queue[half] + 1e-9)
+
+    def summary(self, names, limit=30):
+        saturated = self.saturated()
+        growing = set(self.growing().tolist())
+        details = f"Simulated {self.times[-1]:.1f}s over {len(names)} assets\n\n"
+        details += f"Saturated assets: {len(saturated)} ({len(growing)} with growing queues)\n"
+        for i in saturated[:limit].tolist():
+            trend = "growing" if i in growing else "steady"
+            details += f"- {names[i]}: queue {self.queue[-1, i]:.0f} ({trend})\n"
+        if len(saturated) > limit:
+            details += f"... and {len(saturated) - limit} more\n"
+        busiest = np.argsort(-self.processed)[:10]
+        details += "\nBusiest assets (messages/s):\n"
+        details += "".join(f"- {names[i]}: {self.processed[i]:.1f}\n" for i in busiest.tolist())
+        return details
+
+
+def simulate(params, steps=DEFAULT_STEPS, dt=DEFAULT_DT, cancel=None):
+    # Time-stepped fluid queues: every step each asset processes up to rate * dt queued messages and
+    # the output reaches its successors in the next step, scaled by the edge volumes. Each step is a
+    # handful of array operations over all assets and edges.
+    n = len(params.rate)
+    src, dst = params.src, params.dst
+    capacity = params.rate * dt
+    arrivals = params.inject * dt
+    every = min(max(1, -(-steps * n // MAX_RECORDED_VALUES)), steps)
+    recorded = -(-steps // every)
+    queue_history = np.zeros((recorded, n), dtype=np.float32)
+    utilisation_history = np.zeros((recorded, n), dtype=np.float32)
+    times = np.zeros(recorded)
+
+    queue = np.zeros(n)
+    in_flight = np.zeros(n)
+    total = np.zeros(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for step in range(steps):
+            if cancel is not None and step % 50 == 0:
+                cancel.check()
+            queue += arrivals + in_flight
+            done = np.minimum(queue, capacity)
+            queue -= done
+            total += done
+            in_flight = np.bincount(dst, weights=done[src] * params.volume, minlength=n)
+            if (step + 1) % every == 0 or step == steps - 1:
+                r = step // every
+                queue_history[r] = queue
+                utilisation_history[r] = np.where(capacity > 0, done / capacity, 1.0)
+                times[r] = (step + 1) * dt
+    return SimulationResult(times, queue_history, utilisation_history, total / (steps * dt))
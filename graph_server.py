@@ -0,0 +1,421 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit
+
+import matplotlib
+matplotlib.use("Agg")
+import networkx as nx
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from batch_export import EXPORT_MAX_LABELS, view_tasks
+from cba_model import load_model
+from clustering import CLUSTER_THRESHOLD
+from layout_cache import LayoutCache, DEFAULT_CACHE_DIR, layout_key
+from layout_engine import get_engine, resolve_engine_name
+from scene import NODE_SIZE, ViewScene, generate_colors, view_limits
+
+TILE_SIZE = 256
+TILE_DPI = 100
+MAX_ZOOM = 12
+# Width in pixels at which a view is drawn at full scale, as on the desktop; tiles that show the whole
+# view in fewer pixels are drawn scaled down
+VIEW_PIXELS = 1200
+# Marker size for the whole estate and for areas too large to draw with full-size markers (the
+# desktop draws those as clusters)
+SMALL_NODE_SIZE = 120
+# Pixels around a tile whose nodes are drawn too, enough for a marker or most of a label
+TILE_MARGIN = 64
+# Views a tile figure is kept for
+RENDERER_VIEWS = 4
+# Responses (JSON and tiles) kept ready to send
+RESPONSE_CACHE_ENTRIES = 4096
+# Requests waiting for a worker, per worker, before new ones wait to be read
+QUEUE_PER_WORKER = 4
+# Bodies smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 512
+MAX_HEADER_BYTES = 16384
+# Nothing here takes a body; larger ones are refused rather than waited for
+MAX_BODY_BYTES = 65536
+# ASCII digits only: str.isdigit() also accepts characters such as "\u00b2" that int() rejects
+CONTENT_LENGTH = re.compile(r"[0-9]+")
+STATUS_TEXT = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+               405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class View:
+    # What one view draws: the same nodes, edges, colours and layout as the desktop application
+    def __init__(self, name, nodes, edges, colors, edge_widths, node_size, graph_hash, pos):
+        self.name = name
+        self.nodes = nodes
+        self.edges = edges
+        self.colors = colors
+        self.edge_widths = edge_widths
+        self.node_size = node_size
+        self.key = graph_hash
+        self.pos = pos
+        # Tiles cover a square around the view so every zoom level keeps the aspect ratio
+        (x0, x1), (y0, y1) = view_limits(np.asarray([pos[node] for node in nodes], dtype=float).reshape(-1, 2))
+        half = max(x1 - x0, y1 - y0) / 2
+        self.center = ((x0 + x1) / 2, (y0 + y1) / 2)
+        self.half = half
+
+
+class GraphService:
+    # The model, built once, and everything derived from it for the server; safe to call from the
+    # worker threads
+    def __init__(self, model, layouts=None, cache_dir=None):
+        self.model = model
+        # The model builds these on first use without a lock; build them before any worker can
+        model.G
+        model.store.csr()
+        model.store.reverse_csr()
+        self.layout_cache = LayoutCache(max_entries=len(model.functional_areas) + 2, cache_dir=cache_dir)
+        self.layout_cache.preload(layouts or {})
+        self._views = {}
+        self._lock = threading.Lock()
+        self._view_locks = {}
+        # matplotlib is not thread-safe, so tiles are drawn one at a time; layouts and JSON still
+        # run in parallel
+        self._render_lock = threading.Lock()
+        self._renderers = OrderedDict()
+
+    def view_names(self):
+        return ["Overview", "All Assets"] + sorted(self.model.functional_areas)
+
+    def view(self, name):
+        view = self._views.get(name)
+        if view is not None:
+            return view
+        with self._lock:
+            lock = self._view_locks.setdefault(name, threading.Lock())
+        # Concurrent first requests for a view wait for one layout instead of each computing it
+        with lock:
+            view = self._views.get(name)
+            if view is None:
+                view = self._views[name] = self._build_view(name)
+        return view
+
+    def _build_view(self, name):
+        model = self.model
+        if name == "All Assets":
+            graph = model.G
+            areas = sorted(model.functional_areas)
+            area_colors = dict(zip(areas, generate_colors(len(areas))))
+            nodes = list(graph.nodes())
+            task = (name, nodes, list(graph.edges()), [area_colors[model.assets[node].area] for node in nodes],
+                    0.5)
+        elif name == "Overview" or name in model.functional_areas:
+            task = view_tasks(model, [name])[0 if name == "Overview" else 1]
+        else:
+            raise HTTPError(404, f"unknown view {name!r}")
+        _, nodes, edges, colors, edge_widths = task
+        node_size = NODE_SIZE if name == "Overview" or len(nodes) <= CLUSTER_THRESHOLD else SMALL_NODE_SIZE
+        if name != "All Assets":
+            graph = nx.DiGraph()
+            graph.add_nodes_from(nodes)
+            graph.add_edges_from(edges)
+        engine_name = resolve_engine_name("auto", graph)
+        engine = get_engine(engine_name)
+        graph_hash = layout_key(graph, engine_name)
+        pos = self.layout_cache.layout(name, graph, lambda g, initial: engine.compute(g, initial),
+                                       graph_hash=graph_hash)
+        return View(name, nodes, edges, colors, edge_widths, node_size, graph_hash, pos)
+
+    def views_json(self):
+        areas = self.model.functional_areas
+        return {"views": [{"name": name, "assets": len(areas[name]) if name in areas else None}
+                          for name in self.view_names()],
+                "tile_size": TILE_SIZE, "max_zoom": MAX_ZOOM}
+
+    def graph_json(self, name):
+        view = self.view(name)
+        widths = np.broadcast_to(np.asarray(view.edge_widths, dtype=float), (len(view.edges),)).tolist()
+        weights = (dict(((u, v), w) for u, v, w in self.model.overview_G.edges(data="weight"))
+                   if name == "Overview" else {})
+        return {"view": name, "nodes": view.nodes,
+                "edges": [{"source": u, "target": v, "weight": weights.get((u, v), 1), "width": width}
+                          for (u, v), width in zip(view.edges, widths)]}
+
+    def positions_json(self, name):
+        view = self.view(name)
+        return {"view": name, "layout": view.key,
+                "bounds": [[view.center[0] - view.half, view.center[0] + view.half],
+                           [view.center[1] - view.half, view.center[1] + view.half]],
+                "positions": {node: [float(view.pos[node][0]), float(view.pos[node][1])] for node in view.nodes}}
+
+    def asset_json(self, name):
+        store = self.model.store
+        node_id = store.ids.get(name)
+        if node_id is None:
+            raise HTTPError(404, f"unknown asset {name!r}")
+        record = store.record(node_id)
+        details = {"name": name}
+        details.update(record.to_dict())
+        details["successors"] = [store.names[i] for i in store.successors(node_id).tolist()]
+        details["predecessors"] = [store.names[i] for i in store.predecessors(node_id).tolist()]
+        return details
+
+    def render_tile(self, name, z, x, y):
+        if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise HTTPError(404, f"no tile {z}/{x}/{y}")
+        view = self.view(name)
+        with self._render_lock:
+            return self._render_tile(view, z, x, y)
+
+    def _render_tile(self, view, z, x, y):
+        # Called with the render lock held
+        name = view.name
+        renderers = self._renderers
+        entry = renderers.get((name, view.key))
+        if entry is None:
+            figure = Figure(figsize=(TILE_SIZE / TILE_DPI, TILE_SIZE / TILE_DPI), dpi=TILE_DPI)
+            FigureCanvasAgg(figure)
+            ax = figure.add_axes([0, 0, 1, 1])
+            ax.axis('off')
+            scene = ViewScene(ax, view.key, view.nodes, view.pos, view.edges, view.colors,
+                              node_size=view.node_size, edge_widths=view.edge_widths, max_labels=0)
+            entry = renderers[(name, view.key)] = (figure, ax, scene)
+            if len(renderers) > RENDERER_VIEWS:
+                renderers.popitem(last=False)
+        renderers.move_to_end((name, view.key))
+        figure, ax, scene = entry
+
+        # Slippy-map numbering: x to the right, y downwards from the top of the view
+        size = 2 * view.half / 2 ** z
+        left = view.center[0] - view.half + x * size
+        top = view.center[1] + view.half - y * size
+        ax.set_xlim(left, left + size)
+        ax.set_ylim(top - size, top)
+        # Markers, lines, arrowheads and labels are sized in points; a lower dpi shrinks them all
+        # together, so a tile looks like the desktop drawing scaled down to fit
+        dpi = TILE_DPI * min(1.0, TILE_SIZE * 2 ** z / VIEW_PIXELS)
+        figure.set_dpi(dpi)
+        figure.set_size_inches(TILE_SIZE / dpi, TILE_SIZE / dpi)
+        # Only what reaches into the tile is drawn. Nodes are taken from a margin around it so markers
+        # and labels crossing the edge of a tile look the same on both sides.
+        pad = TILE_MARGIN * size / TILE_SIZE
+        x0, x1, y0, y1 = left - pad, left + size + pad, top - size - pad, top + pad
+        xy = scene.xy
+        nodes = np.flatnonzero((xy[:, 0] >= x0) & (xy[:, 0] <= x1) & (xy[:, 1] >= y0) & (xy[:, 1] <= y1))
+        a, b = xy[scene.edge_src], xy[scene.edge_dst]
+        edges = np.flatnonzero((np.minimum(a[:, 0], b[:, 0]) <= x1) & (np.maximum(a[:, 0], b[:, 0]) >= x0) &
+                               (np.minimum(a[:, 1], b[:, 1]) <= y1) & (np.maximum(a[:, 1], b[:, 1]) >= y0))
+        scene.show_subset(nodes, edges, nodes if len(nodes) <= EXPORT_MAX_LABELS else ())
+        buffer = io.BytesIO()
+        figure.savefig(buffer, format="png", dpi=dpi)
+        return buffer.getvalue()
+
+
+class Response:
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.gzipped = None
+        if content_type.startswith("application/json") and len(body) >= COMPRESS_MIN_BYTES:
+            self.gzipped = gzip.compress(body, compresslevel=6)
+
+
+class GraphServer:
+    # A small HTTP/1.1 server on asyncio streams. Requests are parsed on the event loop; layouts, JSON
+    # and tiles are produced on a bounded pool of worker threads and cached with their ETags.
+    def __init__(self, service, host="127.0.0.1", port=8765, workers=None):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="graph-server")
+        self.cache = OrderedDict()
+        self.server = None
+        self._slots = None
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(self.workers * QUEUE_PER_WORKER)
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, limit=MAX_HEADER_BYTES)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        key, value = line.split(":", 1)
+                        headers[key.strip().lower()] = value.strip()
+                length = headers.get("content-length") or "0"
+                length_error = None
+                if not CONTENT_LENGTH.fullmatch(length):
+                    length, length_error = None, "invalid Content-Length"
+                elif int(length) > MAX_BODY_BYTES:
+                    length, length_error = None, "request body too large"
+                else:
+                    length = int(length)
+                if length:
+                    # Nothing here takes a body; read it so the connection stays in step
+                    try:
+                        await reader.readexactly(length)
+                    except asyncio.IncompleteReadError:
+                        break
+                parts = lines[0].split(" ")
+                # Without a usable length the body cannot be skipped, so the connection is closed
+                keep_alive = (len(parts) == 3 and parts[2] == "HTTP/1.1" and length is not None and
+                              headers.get("connection", "").lower() != "close")
+                if len(parts) != 3:
+                    status, response = 400, _error_response("malformed request line")
+                elif length_error:
+                    status, response = 400, _error_response(length_error)
+                else:
+                    status, response = await self.respond(parts[0], parts[1])
+                self.write(writer, status, response, headers, parts[0] == "HEAD", keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method, target):
+        if method not in ("GET", "HEAD"):
+            return 405, _error_response(f"{method} is not supported")
+        # Split before unquoting so view and asset names may contain an encoded "/"
+        parts = tuple(unquote(part) for part in urlsplit(target).path.split("/") if part)
+        response = self.cache.get(parts)
+        if response is not None:
+            self.cache.move_to_end(parts)
+            return 200, response
+        try:
+            produce, content_type = self.route(parts)
+            async with self._slots:
+                body = await asyncio.get_running_loop().run_in_executor(self.pool, produce)
+        except HTTPError as e:
+            return e.status, _error_response(str(e))
+        except Exception as e:
+            print(f"{target}: {e!r}")
+            return 500, _error_response("internal error")
+        if content_type == "application/json":
+            body = json.dumps(body).encode("utf-8")
+        response = Response(body, content_type)
+        self.cache[parts] = response
+        if len(self.cache) > RESPONSE_CACHE_ENTRIES:
+            self.cache.popitem(last=False)
+        return 200, response
+
+    def route(self, parts):
+        # Returns a function producing the body on a worker, and its content type
+        service = self.service
+        if not parts:
+            return service.views_json, "application/json"
+        if parts == ("api", "views"):
+            return service.views_json, "application/json"
+        if len(parts) == 3 and parts[:2] == ("api", "graph"):
+            return lambda: service.graph_json(parts[2]), "application/json"
+        if len(parts) == 3 and parts[:2] == ("api", "positions"):
+            return lambda: service.positions_json(parts[2]), "application/json"
+        if len(parts) == 3 and parts[:2] == ("api", "assets"):
+            return lambda: service.asset_json(parts[2]), "application/json"
+        if len(parts) == 5 and parts[0] == "tiles" and parts[4].endswith(".png"):
+            try:
+                z, x, y = int(parts[2]), int(parts[3]), int(parts[4][:-4])
+            except ValueError:
+                raise HTTPError(400, "tile coordinates must be integers")
+            return lambda: service.render_tile(parts[1], z, x, y), "image/png"
+        raise HTTPError(404, "not found")
+
+    def write(self, writer, status, response, headers, head_only, keep_alive):
+        body = response.body
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}", f"Content-Type: {response.content_type}",
+                 f"ETag: {response.etag}", "Cache-Control: no-cache", "Vary: Accept-Encoding",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 200 and response.etag in (tag.strip() for tag in headers.get("if-none-match", "").split(",")):
+            status = 304
+            lines[0] = f"HTTP/1.1 304 {STATUS_TEXT[304]}"
+            body = b""
+        elif response.gzipped is not None and "gzip" in headers.get("accept-encoding", ""):
+            body = response.gzipped
+            lines.append("Content-Encoding: gzip")
+        lines.append(f"Content-Length: {len(body)}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if not head_only and status != 304:
+            writer.write(body)
+
+
+def _error_response(message):
+    return Response(json.dumps({"error": message}).encode("utf-8"), "application/json")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Serve the CBA model, layouts and map tiles over local HTTP")
+    parser.add_argument("--inventory", action="append", metavar="FILE",
+                        help="Asset/edge inventory (.jsonl or .csv); may be given more than once")
+    parser.add_argument("--snapshot", metavar="FILE",
+                        help="Open a binary snapshot instead of building the model")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Threads laying out views and rendering tiles (default: CPUs, at most 8)")
+    parser.add_argument("--layout-cache", default=os.environ.get("CBA_LAYOUT_CACHE", DEFAULT_CACHE_DIR),
+                        help="Directory for persisted layouts (default: %(default)s)")
+    parser.add_argument("--no-layout-cache", action="store_true",
+                        help="Keep layouts in memory only")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    model, layouts = load_model(args.inventory, args.snapshot)
+    service = GraphService(model, layouts, cache_dir=None if args.no_layout_cache else args.layout_cache)
+    server = GraphServer(service, args.host, args.port, args.workers)
+
+    async def run():
+        await server.start()
+        print(f"Serving {model.number_of_assets()} assets on http://{server.host}:{server.port}/ "
+              f"with {server.workers} workers")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,312 @@
+import sys
+from array import array
+from collections.abc import Mapping
+
+import numpy as np
+
+ASSET_FIELDS = ("area", "description", "key_features", "related_systems", "data_flow", "business_impact")
+
+
+class AssetRecord:
+    __slots__ = ASSET_FIELDS
+
+    def __init__(self, area, description="", key_features=(), related_systems=(), data_flow="",
+                 business_impact=""):
+        self.area = sys.intern(area)
+        self.description = description
+        self.key_features = list(key_features)
+        self.related_systems = list(related_systems)
+        self.data_flow = data_flow
+        self.business_impact = business_impact
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in ASSET_FIELDS if field in data})
+
+    # Dict-style access so existing code can keep using asset_data['area']
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return ASSET_FIELDS
+
+    def items(self):
+        return [(field, getattr(self, field)) for field in ASSET_FIELDS]
+
+    def to_dict(self):
+        return dict(self.items())
+
+
+class AssetMap(Mapping):
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, name):
+        return self._store.record(self._store.ids[name])
+
+    def __contains__(self, name):
+        return name in self._store.ids
+
+    def __iter__(self):
+        return iter(self._store.ids)
+
+    def __len__(self):
+        return len(self._store.ids)
+
+
+class GraphStore:
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.records = []
+        self._record_factory = None
+
+        # Edge list in insertion order; removed edges are marked with -1 until compacted
+        self._src = array("i")
+        self._dst = array("i")
+        self._edge_pos = None
+        self._removed = 0
+        self.duplicate_edges = {}
+        # Per-node successor/predecessor sets, built on first use by updates that need O(degree) access
+        self._out = None
+        self._in = None
+
+        self._csr = None
+        self._reverse_csr = None
+
+    @classmethod
+    def from_arrays(cls, names, indptr, indices, record_factory):
+        # Bulk construction (e.g. from a snapshot); records are materialised on first access
+        store = cls()
+        store.names = names
+        store.ids = {name: i for i, name in enumerate(names)}
+        store.records = [None] * len(names)
+        store._record_factory = record_factory
+        indptr = np.asarray(indptr, dtype=np.int64)
+        src = np.repeat(np.arange(len(names), dtype=np.int32), np.diff(indptr))
+        store._src.frombytes(src.tobytes())
+        store._dst.frombytes(np.asarray(indices, dtype=np.int32).tobytes())
+        store._csr = (indptr, np.asarray(indices, dtype=np.int32))
+        return store
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def number_of_edges(self):
+        return len(self._src) - self._removed
+
+    def record(self, node_id):
+        rec = self.records[node_id]
+        if rec is None:
+            rec = self.records[node_id] = self._record_factory(node_id)
+        return rec
+
+    def add_node(self, name, record):
+        node_id = self.ids.get(name)
+        if node_id is None:
+            node_id = len(self.names)
+            self.ids[name] = node_id
+            self.names.append(name)
+            self.records.append(record)
+            if self._out is not None:
+                self._out.append(set())
+                self._in.append(set())
+            self._invalidate()
+        else:
+            self.records[node_id] = record
+        return node_id
+
+    def _edge_index(self):
+        if self._edge_pos is None:
+            self._edge_pos = {}
+            for pos, (s, t) in enumerate(zip(self._src, self._dst)):
+                if s >= 0:
+                    self._edge_pos[(s, t)] = pos
+        return self._edge_pos
+
+    def add_edge(self, source_id, target_id):
+        edge_pos = self._edge_index()
+        key = (source_id, target_id)
+        if key in edge_pos:
+            self.duplicate_edges[key] = self.duplicate_edges.get(key, 0) + 1
+            return False
+        edge_pos[key] = len(self._src)
+        self._src.append(source_id)
+        self._dst.append(target_id)
+        if self._out is not None:
+            self._out[source_id].add(target_id)
+            self._in[target_id].add(source_id)
+        self._invalidate()
+        return True
+
+    def has_edge(self, source_id, target_id):
+        return (source_id, target_id) in self._edge_index()
+
+    def remove_edge(self, source_id, target_id):
+        pos = self._edge_index().pop((source_id, target_id), None)
+        if pos is None:
+            return False
+        self._src[pos] = -1
+        self._dst[pos] = -1
+        self._removed += 1
+        if self._out is not None:
+            self._out[source_id].discard(target_id)
+            self._in[target_id].discard(source_id)
+        self._invalidate()
+        if self._removed > len(self._src) // 2:
+            self._compact()
+        return True
+
+    def _adjacency(self):
+        if self._out is None:
+            indptr, indices = self.csr()
+            rindptr, rindices = self.reverse_csr()
+            n = len(self.names)
+            self._out = [set(indices[indptr[i]:indptr[i + 1]].tolist()) for i in range(n)]
+            self._in = [set(rindices[rindptr[i]:rindptr[i + 1]].tolist()) for i in range(n)]
+        return self._out, self._in
+
+    def incident_edges(self, node_id):
+        # (source, target) pairs touching node_id, in O(degree) once the adjacency sets exist
+        out, into = self._adjacency()
+        edges = [(node_id, t) for t in out[node_id]]
+        edges.extend((s, node_id) for s in into[node_id] if s != node_id)
+        return edges
+
+    def remove_node(self, node_id):
+        # Removes the node and its edges. The last node is moved into the freed id so ids stay dense;
+        # returns the moved node's old id, or None if nothing moved.
+        for s, t in self.incident_edges(node_id):
+            self.remove_edge(s, t)
+        if self.duplicate_edges:
+            self.duplicate_edges = {key: count for key, count in self.duplicate_edges.items() if node_id not in key}
+        out, into = self._adjacency()
+        del self.ids[self.names[node_id]]
+        last = len(self.names) - 1
+        moved = None
+        if node_id != last:
+            self.record(last)
+            remap = lambda v: node_id if v == last else v
+            edge_pos = self._edge_index()
+            for s, t in self.incident_edges(last):
+                pos = edge_pos.pop((s, t))
+                ns, nt = remap(s), remap(t)
+                self._src[pos] = ns
+                self._dst[pos] = nt
+                edge_pos[(ns, nt)] = pos
+            for t in out[last]:
+                if t != last:
+                    into[t].discard(last)
+                    into[t].add(node_id)
+            for s in into[last]:
+                if s != last:
+                    out[s].discard(last)
+                    out[s].add(node_id)
+            out[node_id] = {remap(t) for t in out[last]}
+            into[node_id] = {remap(s) for s in into[last]}
+            if self.duplicate_edges:
+                self.duplicate_edges = {(remap(s), remap(t)): count for (s, t), count in self.duplicate_edges.items()}
+            self.names[node_id] = self.names[last]
+            self.ids[self.names[node_id]] = node_id
+            self.records[node_id] = self.records[last]
+            moved = last
+        self.names.pop()
+        self.records.pop()
+        out.pop()
+        into.pop()
+        self._invalidate()
+        return moved
+
+    def _compact(self):
+        src, dst = self.edge_arrays()
+        self._src = array("i")
+        self._src.frombytes(src.tobytes())
+        self._dst = array("i")
+        self._dst.frombytes(dst.tobytes())
+        self._removed = 0
+        self._edge_pos = None
+
+    def _invalidate(self):
+        self._csr = None
+        self._reverse_csr = None
+
+    def edge_arrays(self):
+        src = np.frombuffer(self._src, dtype=np.int32) if len(self._src) else np.zeros(0, dtype=np.int32)
+        dst = np.frombuffer(self._dst, dtype=np.int32) if len(self._dst) else np.zeros(0, dtype=np.int32)
+        if self._removed:
+            keep = src >= 0
+            src, dst = src[keep], dst[keep]
+        return src.copy(), dst.copy()
+
+    @staticmethod
+    def _build_csr(n, src, dst):
+        order = np.argsort(src, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        return indptr, dst[order].astype(np.int32)
+
+    def csr(self):
+        if self._csr is None:
+            src, dst = self.edge_arrays()
+            self._csr = self._build_csr(len(self.names), src, dst)
+        return self._csr
+
+    def reverse_csr(self):
+        if self._reverse_csr is None:
+            src, dst = self.edge_arrays()
+            self._reverse_csr = self._build_csr(len(self.names), dst, src)
+        return self._reverse_csr
+
+    def successors(self, node_id):
+        indptr, indices = self.csr()
+        return indices[indptr[node_id]:indptr[node_id + 1]]
+
+    def predecessors(self, node_id):
+        indptr, indices = self.reverse_csr()
+        return indices[indptr[node_id]:indptr[node_id + 1]]
+
+    def id_array(self, names):
+        ids = self.ids
+        return np.fromiter((ids[name] for name in names), dtype=np.int32, count=len(names))
+
+    def subgraph_edges(self, node_ids):
+        # Edges with both endpoints in node_ids, gathered from the CSR rows of node_ids only
+        indptr, indices = self.csr()
+        node_ids = np.asarray(node_ids, dtype=np.int32)
+        starts = indptr[node_ids]
+        counts = indptr[node_ids + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32)
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+        targets = indices[offsets]
+        sources = np.repeat(node_ids, counts)
+
+        member = np.zeros(len(self.names), dtype=bool)
+        member[node_ids] = True
+        keep = member[targets]
+        return sources[keep], targets[keep]
+
+    def to_networkx(self, node_ids=None):
+        # networkx is slow to import and only needed once a view is laid out
+        import networkx as nx
+        graph = nx.DiGraph()
+        names = self.names
+        if node_ids is None:
+            graph.add_nodes_from(names)
+            src, dst = self.edge_arrays()
+        else:
+            node_ids = np.asarray(node_ids, dtype=np.int32)
+            graph.add_nodes_from(names[i] for i in node_ids.tolist())
+            src, dst = self.subgraph_edges(node_ids)
+        graph.add_edges_from(zip([names[i] for i in src.tolist()], [names[i] for i in dst.tolist()]))
+        return graph
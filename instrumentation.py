@@ -0,0 +1,123 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Oldest events are dropped beyond this many, so tracing can stay on for a whole session
+MAX_EVENTS = 200_000
+# Durations kept per span name for recent(), e.g. the frame-time overlay
+RECENT_SPANS = 1000
+# Set to record the event log for export from startup; --trace does the same
+TRACE_ENV = "CBA_TRACE"
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "category", "args", "start")
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        self.tracer._record(self.name, self.category, self.start, end - self.start, self.args)
+        return False
+
+
+class Tracer:
+    # Named timing spans from any thread. Recent durations and running totals per name are always
+    # kept, being small; the event log exported as a Chrome trace (chrome://tracing or
+    # https://ui.perfetto.dev) is only recorded once enabled.
+    def __init__(self, max_events=MAX_EVENTS, enabled=False):
+        self.events = deque(maxlen=max_events)
+        self.enabled = enabled
+        self.origin = time.perf_counter_ns()
+        self._durations = {}
+        # name -> [count, total ns, max ns] over every span since the last clear
+        self._totals = {}
+        self._lock = threading.Lock()
+        self._profile = None
+
+    def enable(self):
+        self.enabled = True
+
+    def span(self, name, category="app", **args):
+        return _Span(self, name, category, args)
+
+    def instant(self, name, category="app", **args):
+        if self.enabled:
+            self.events.append(("i", name, category, time.perf_counter_ns(), 0, threading.get_ident(), args))
+
+    def _record(self, name, category, start, duration, args):
+        if self.enabled:
+            self.events.append(("X", name, category, start, duration, threading.get_ident(), args))
+        with self._lock:
+            durations = self._durations.get(name)
+            if durations is None:
+                durations = self._durations[name] = deque(maxlen=RECENT_SPANS)
+                self._totals[name] = [0, 0, 0]
+            durations.append(duration)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += duration
+            totals[2] = max(totals[2], duration)
+
+    def recent(self, name, count=30):
+        # Durations in milliseconds of the last count spans with this name
+        with self._lock:
+            durations = list(self._durations.get(name, ()))[-count:]
+        return [d / 1e6 for d in durations]
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self._durations.clear()
+            self._totals.clear()
+
+    def summary(self):
+        # One line per span name over every span since the last clear: count, mean, max and total ms
+        with self._lock:
+            totals = {name: list(values) for name, values in self._totals.items()}
+        lines = [f"{'span':<24}{'count':>8}{'mean ms':>10}{'max ms':>10}{'total ms':>12}"]
+        for name, (count, total, longest) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<24}{count:>8}{total / count / 1e6:>10.2f}{longest / 1e6:>10.2f}"
+                         f"{total / 1e6:>12.1f}")
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, path):
+        pid = os.getpid()
+        trace = []
+        for phase, name, category, start, duration, tid, args in list(self.events):
+            event = {"name": name, "cat": category, "ph": phase, "ts": (start - self.origin) / 1e3,
+                     "pid": pid, "tid": tid, "args": {key: str(value) for key, value in args.items()}}
+            if phase == "X":
+                event["dur"] = duration / 1e3
+            else:
+                event["s"] = "t"
+            trace.append(event)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+    def start_profile(self):
+        # cProfile sees the calling (GUI) thread only; the worker threads show up as spans
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop_profile(self, path):
+        if self._profile is None:
+            return
+        self._profile.disable()
+        self._profile.dump_stats(path)
+        self._profile = None
+
+
+tracer = Tracer(enabled=bool(os.environ.get(TRACE_ENV)))
+span = tracer.span
@@ -0,0 +1,172 @@
+import csv
+import json
+import os
+
+ASSET_FIELDS = ["name", "area", "description", "key_features", "related_systems", "data_flow", "business_impact"]
+EDGE_FIELDS = ["source", "target"]
+TEXT_FIELDS = ("description", "data_flow", "business_impact")
+LIST_FIELDS = ("key_features", "related_systems")
+LIST_SEPARATOR = ";"
+
+
+class MalformedRow(ValueError):
+    pass
+
+
+class LoadReport:
+    def __init__(self, max_errors=100):
+        self.max_errors = max_errors
+        self.assets = 0
+        self.edges = 0
+        self.error_count = 0
+        self.errors = []
+
+    def error(self, path, line, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((path, line, message))
+
+    def summary(self):
+        lines = [f"Loaded {self.assets} assets and {self.edges} edges, {self.error_count} malformed rows"]
+        for path, line, message in self.errors:
+            lines.append(f"  {path}:{line}: {message}")
+        if self.error_count > len(self.errors):
+            lines.append(f"  ... {self.error_count - len(self.errors)} more")
+        return "\n".join(lines)
+
+
+def asset_from_record(record):
+    name = record.get("name")
+    area = record.get("area")
+    if not isinstance(name, str) or not name.strip():
+        raise MalformedRow("asset row has no name")
+    if not isinstance(area, str) or not area.strip():
+        raise MalformedRow(f"asset {name!r} has no area")
+
+    data = {"area": area.strip()}
+    for field in TEXT_FIELDS:
+        value = record.get(field)
+        if value is None:
+            value = ""
+        elif not isinstance(value, str):
+            raise MalformedRow(f"asset {name!r} field {field!r} is not text")
+        data[field] = value
+    for field in LIST_FIELDS:
+        value = record.get(field) or []
+        if isinstance(value, str):
+            value = [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+        elif not isinstance(value, list):
+            raise MalformedRow(f"asset {name!r} field {field!r} is not a list")
+        elif not all(isinstance(item, str) for item in value):
+            raise MalformedRow(f"asset {name!r} field {field!r} has items that are not text")
+        data[field] = value
+    return name.strip(), data
+
+
+def edge_from_record(record):
+    source = record.get("source")
+    target = record.get("target")
+    if not isinstance(source, str) or not source.strip() or not isinstance(target, str) or not target.strip():
+        raise MalformedRow("edge row needs a source and a target")
+    return source.strip(), target.strip()
+
+
+def iter_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_no, None, MalformedRow(f"invalid JSON: {e}")
+                continue
+            if not isinstance(record, dict):
+                yield line_no, None, MalformedRow("row is not a JSON object")
+                continue
+            kind = record.get("type") or ("edge" if "source" in record else "asset")
+            yield line_no, kind, record
+
+
+def iter_csv(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        header = set(reader.fieldnames or [])
+        if "type" in header:
+            default_kind = None
+        elif {"source", "target"} <= header:
+            default_kind = "edge"
+        elif {"name", "area"} <= header:
+            default_kind = "asset"
+        else:
+            yield 1, None, MalformedRow(f"unrecognised CSV header {sorted(header)}")
+            return
+        for record in reader:
+            # Line 1 is the header
+            line_no = reader.line_num
+            if None in record:
+                yield line_no, None, MalformedRow("row has more columns than the header")
+                continue
+            yield line_no, default_kind or record.get("type"), record
+
+
+def iter_inventory(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return iter_csv(path)
+    if ext in (".jsonl", ".ndjson", ".json"):
+        return iter_jsonl(path)
+    raise ValueError(f"Unsupported inventory format: {path}")
+
+
+def load_inventory(model, paths, report=None):
+    if report is None:
+        report = LoadReport()
+    if isinstance(paths, str):
+        paths = [paths]
+
+    # Edges whose endpoints have not been seen yet; stays empty when assets precede edges
+    pending = {}
+
+    for path in paths:
+        for line_no, kind, record in iter_inventory(path):
+            if isinstance(record, MalformedRow):
+                report.error(path, line_no, str(record))
+                continue
+            try:
+                if kind == "asset":
+                    name, data = asset_from_record(record)
+                    model.add_asset(name, data)
+                    report.assets += 1
+                elif kind == "edge":
+                    source, target = edge_from_record(record)
+                    if source in model.assets and target in model.assets:
+                        model.add_edge(source, target)
+                        report.edges += 1
+                    else:
+                        pending[(source, target)] = (path, line_no)
+                else:
+                    raise MalformedRow(f"unknown row type {kind!r}")
+            except MalformedRow as e:
+                report.error(path, line_no, str(e))
+
+    for (source, target), (path, line_no) in pending.items():
+        missing = source if source not in model.assets else target
+        if missing in model.assets:
+            model.add_edge(source, target)
+            report.edges += 1
+        else:
+            report.error(path, line_no, f"edge {source!r} -> {target!r} references unknown asset {missing!r}")
+
+    return report
+
+
+def write_jsonl(model, path, edges=None):
+    with open(path, "w", encoding="utf-8") as f:
+        for name, data in model.assets.items():
+            record = {"type": "asset", "name": name}
+            record.update(data)
+            f.write(json.dumps(record) + "\n")
+        for source, target in (edges if edges is not None else model.edges()):
+            f.write(json.dumps({"type": "edge", "source": source, "target": target}) + "\n")
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+LAYOUT_SEED = 42
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "cba_visualization", "layouts")
+
+
+def structural_hash(graph):
+    # Hash of the node set and edge set only; attributes do not affect the layout
+    h = hashlib.blake2b(digest_size=16)
+    for node in sorted(graph.nodes()):
+        h.update(str(node).encode("utf-8"))
+        h.update(b"\x00")
+    h.update(b"\x01")
+    for source, target in sorted(graph.edges()):
+        h.update(str(source).encode("utf-8"))
+        h.update(b"\x00")
+        h.update(str(target).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+def layout_key(graph, variant=""):
+    graph_hash = structural_hash(graph)
+    return f"{graph_hash}:{variant}" if variant else graph_hash
+
+
+class LayoutCache:
+    def __init__(self, max_entries=32, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        # Layouts may be computed off the GUI thread
+        self._lock = threading.RLock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _key(self, area, graph_hash):
+        return (area, graph_hash)
+
+    def _path(self, area, graph_hash):
+        name = hashlib.blake2b(f"{area}\x00{graph_hash}".encode("utf-8"), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, name + ".json")
+
+    def get(self, area, graph_hash):
+        key = self._key(area, graph_hash)
+        with self._lock:
+            pos = self._entries.get(key)
+            if pos is not None:
+                self._entries.move_to_end(key)
+                return dict(pos)
+
+            if self.cache_dir:
+                pos = self._read(area, graph_hash)
+                if pos is not None:
+                    self._remember(key, pos)
+                    return dict(pos)
+        return None
+
+    def put(self, area, graph_hash, pos):
+        pos = {node: np.asarray(xy, dtype=float) for node, xy in pos.items()}
+        with self._lock:
+            self._remember(self._key(area, graph_hash), pos)
+            if self.cache_dir:
+                self._write(area, graph_hash, pos)
+
+    def preload(self, layouts):
+        # Seed the in-memory cache, e.g. from a snapshot, without touching the disk store
+        with self._lock:
+            for (area, graph_hash), pos in layouts.items():
+                self._remember(self._key(area, graph_hash), pos)
+
+    def entries(self):
+        with self._lock:
+            return dict(self._entries)
+
+    def latest(self, area):
+        # Most recently used layout of this area under any graph hash, used as a warm start
+        with self._lock:
+            for (cached_area, _), pos in reversed(self._entries.items()):
+                if cached_area == area:
+                    return dict(pos)
+        return None
+
+    def layout(self, area, graph, compute, variant="", graph_hash=None):
+        if graph_hash is None:
+            graph_hash = layout_key(graph, variant)
+        pos = self.get(area, graph_hash)
+        if pos is None:
+            pos = compute(graph, self.latest(area))
+            self.put(area, graph_hash, pos)
+        return pos
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, pos):
+        self._entries[key] = pos
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _read(self, area, graph_hash):
+        path = self._path(area, graph_hash)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored.get("area") != area or stored.get("hash") != graph_hash:
+            return None
+        return {node: np.asarray(xy, dtype=float) for node, xy in stored["positions"].items()}
+
+    def _write(self, area, graph_hash, pos):
+        path = self._path(area, graph_hash)
+        stored = {
+            "area": area,
+            "hash": graph_hash,
+            "positions": {node: [float(xy[0]), float(xy[1])] for node, xy in pos.items()},
+        }
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stored, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write layout cache {path}: {e}")
@@ -0,0 +1,276 @@
+import numpy as np
+
+from layout_cache import LAYOUT_SEED
+
+LAYOUT_ENGINES = {}
+
+# "auto" picks spring layout for small views and Barnes-Hut above this many nodes
+AUTO_BARNES_HUT_THRESHOLD = 300
+
+
+def register_engine(cls):
+    LAYOUT_ENGINES[cls.name] = cls
+    return cls
+
+
+def get_engine(name, **options):
+    return LAYOUT_ENGINES[name](**options)
+
+
+def resolve_engine_name(name, graph):
+    if name == "auto":
+        return "barnes_hut" if len(graph) > AUTO_BARNES_HUT_THRESHOLD else "spring"
+    return name
+
+
+@register_engine
+class SpringLayout:
+    name = "spring"
+
+    def __init__(self, k=0.5, iterations=50, warm_iterations=15, seed=LAYOUT_SEED):
+        self.k = k
+        self.iterations = iterations
+        self.warm_iterations = warm_iterations
+        self.seed = seed
+
+    def compute(self, graph, initial=None, fixed=None, cancel=None):
+        if cancel is not None:
+            cancel.check()
+        initial = {n: xy for n, xy in (initial or {}).items() if n in graph}
+        fixed = [n for n in (fixed or ()) if n in initial] or None
+        iterations = self.warm_iterations if initial else self.iterations
+        import networkx as nx
+        return nx.spring_layout(graph, k=self.k, pos=initial or None, fixed=fixed,
+                                iterations=iterations, seed=self.seed)
+
+
+@register_engine
+class BarnesHutLayout:
+    name = "barnes_hut"
+
+    def __init__(self, k=None, iterations=100, warm_iterations=20, theta=1.2, tolerance=1e-4,
+                 seed=LAYOUT_SEED):
+        self.k = k
+        self.iterations = iterations
+        self.warm_iterations = warm_iterations
+        self.theta = theta
+        self.tolerance = tolerance
+        self.seed = seed
+
+    def compute(self, graph, initial=None, fixed=None, cancel=None):
+        nodes = list(graph.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        edges = np.asarray([(index[u], index[v]) for u, v in graph.edges()], dtype=np.int64).reshape(-1, 2)
+
+        initial = initial or {}
+        known = np.asarray([node in initial for node in nodes], dtype=bool)
+        pos0 = None
+        if known.any():
+            pos0 = np.full((len(nodes), 2), np.nan)
+            for node, i in index.items():
+                if known[i]:
+                    pos0[i] = initial[node]
+        pinned = np.zeros(len(nodes), dtype=bool)
+        for node in fixed or ():
+            i = index.get(node)
+            if i is not None and known[i]:
+                pinned[i] = True
+
+        pos = barnes_hut_layout(len(nodes), edges[:, 0], edges[:, 1], pos0=pos0, pinned=pinned, k=self.k,
+                                iterations=self.warm_iterations if pos0 is not None else self.iterations,
+                                theta=self.theta, tolerance=self.tolerance, seed=self.seed, cancel=cancel)
+        return dict(zip(nodes, pos))
+
+
+def _initial_positions(n, src, dst, pos0, rng):
+    pos = rng.random((n, 2))
+    if pos0 is None:
+        return pos, False
+
+    known = ~np.isnan(pos0[:, 0])
+    if not known.any():
+        return pos, False
+    pos[known] = pos0[known]
+
+    # New nodes start at the centroid of their already placed neighbours, else inside the known extent
+    lo = pos0[known].min(axis=0)
+    span = np.maximum(pos0[known].max(axis=0) - lo, 1e-3)
+    unknown = ~known
+    pos[unknown] = lo + rng.random((int(unknown.sum()), 2)) * span
+    a = np.concatenate([src, dst])
+    b = np.concatenate([dst, src])
+    link = unknown[a] & known[b]
+    if link.any():
+        counts = np.bincount(a[link], minlength=n)
+        sums = np.stack([np.bincount(a[link], weights=pos[b[link], d], minlength=n) for d in (0, 1)], axis=1)
+        placed = counts > 0
+        jitter = (rng.random((int(placed.sum()), 2)) - 0.5) * span * 0.01
+        pos[placed] = sums[placed] / counts[placed, None] + jitter
+    return pos, True
+
+
+# Quadtree depth; positions are quantised to 2**TREE_DEPTH cells per axis
+TREE_DEPTH = 16
+
+
+def _interleave(v):
+    v = v & 0xFFFF
+    v = (v | (v << 8)) & 0x00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F
+    v = (v | (v << 2)) & 0x33333333
+    v = (v | (v << 1)) & 0x55555555
+    return v
+
+
+def _build_quadtree(pos, leaf_size):
+    # Sorting by Morton code makes every quadtree cell a contiguous run of the sorted points,
+    # so each level is just the run boundaries of the code prefixes at that depth
+    lo = pos.min(axis=0)
+    size = max(np.ptp(pos[:, 0]), np.ptp(pos[:, 1])) * (1 + 1e-9) + 1e-12
+    side = 1 << TREE_DEPTH
+    q = np.clip(((pos - lo) / size * side).astype(np.int64), 0, side - 1)
+    codes = _interleave(q[:, 0]) | (_interleave(q[:, 1]) << 1)
+    order = np.argsort(codes, kind="stable")
+    codes = codes[order]
+    xs = np.ascontiguousarray(pos[order, 0])
+    ys = np.ascontiguousarray(pos[order, 1])
+    n = len(pos)
+
+    levels = []
+    for level in range(TREE_DEPTH + 1):
+        prefix = codes >> (2 * (TREE_DEPTH - level))
+        starts = np.flatnonzero(np.concatenate(([True], prefix[1:] != prefix[:-1])))
+        counts = np.diff(np.append(starts, n))
+        com_x = np.add.reduceat(xs, starts) / counts
+        com_y = np.add.reduceat(ys, starts) / counts
+        levels.append((starts, counts, com_x, com_y))
+        if counts.max() <= leaf_size:
+            break
+    return order, xs, ys, size, levels
+
+
+def _runs(starts, counts):
+    # Concatenated ranges [start, start + count) for each pair
+    total = int(counts.sum())
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+
+
+def _repulsion(pos, k2, theta, leaf_size):
+    n = len(pos)
+    order, xs, ys, size, levels = _build_quadtree(pos, leaf_size)
+    fx = np.zeros(n)
+    fy = np.zeros(n)
+
+    # Walk the tree for all points at once: (point, cell) pairs are either accepted as a
+    # single mass, resolved exactly at a leaf, or replaced by the cell's children
+    points = np.arange(n)
+    cells = np.zeros(n, dtype=np.int64)
+    last = len(levels) - 1
+    for level, (starts, counts, com_x, com_y) in enumerate(levels):
+        if len(points) == 0:
+            break
+        cell_start = starts[cells]
+        cell_count = counts[cells]
+        dx = xs[points] - com_x[cells]
+        dy = ys[points] - com_y[cells]
+        dist2 = dx * dx + dy * dy
+        width = size / (1 << level)
+        far = dist2 * (theta * theta) > width * width
+        far &= (points < cell_start) | (points >= cell_start + cell_count)
+
+        p = points[far]
+        if len(p):
+            scale = k2 * cell_count[far] / dist2[far]
+            fx += np.bincount(p, weights=dx[far] * scale, minlength=n)
+            fy += np.bincount(p, weights=dy[far] * scale, minlength=n)
+
+        near = ~far
+        if level == last:
+            leaf = near
+        else:
+            leaf = near & (cell_count <= leaf_size)
+        if leaf.any():
+            leaf_counts = cell_count[leaf]
+            i = np.repeat(points[leaf], leaf_counts)
+            j = _runs(cell_start[leaf], leaf_counts)
+            keep = i != j
+            i, j = i[keep], j[keep]
+            pdx = xs[i] - xs[j]
+            pdy = ys[i] - ys[j]
+            scale = k2 / np.maximum(pdx * pdx + pdy * pdy, 1e-12)
+            fx += np.bincount(i, weights=pdx * scale, minlength=n)
+            fy += np.bincount(i, weights=pdy * scale, minlength=n)
+
+        expand = near & ~leaf
+        if not expand.any():
+            break
+        next_starts = levels[level + 1][0]
+        parent_start = cell_start[expand]
+        first = np.searchsorted(next_starts, parent_start)
+        children = np.searchsorted(next_starts, parent_start + cell_count[expand]) - first
+        points = np.repeat(points[expand], children)
+        cells = _runs(first, children)
+
+    # Back from Morton order to node order
+    force = np.empty((n, 2))
+    force[order, 0] = fx
+    force[order, 1] = fy
+    return force
+
+
+def barnes_hut_layout(n, src, dst, pos0=None, pinned=None, k=None, iterations=100, theta=1.2, leaf_size=8,
+                      tolerance=1e-4, seed=LAYOUT_SEED, cancel=None):
+    if n == 0:
+        return np.zeros((0, 2))
+    rng = np.random.default_rng(seed)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+    pos, warm = _initial_positions(n, src, dst, pos0, rng)
+    if n == 1:
+        return pos
+    if pinned is None:
+        pinned = np.zeros(n, dtype=bool)
+
+    # Integrations are symmetric for layout purposes; drop self loops
+    keep = src != dst
+    src, dst = src[keep], dst[keep]
+
+    if k is None:
+        k = np.sqrt(1.0 / n)
+    k2 = k * k
+
+    extent = max(np.ptp(pos[:, 0]), np.ptp(pos[:, 1]), 1e-3)
+    # A warm start is already close to equilibrium, so start cooler
+    temperature = extent * (0.02 if warm else 0.1)
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        # cancel is any object with a check() that raises to abandon the layout
+        if cancel is not None:
+            cancel.check()
+        force = _repulsion(pos, k2, theta, leaf_size)
+
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.sqrt((delta ** 2).sum(axis=1))
+            pull = delta * (dist / k)[:, None]
+            for d in (0, 1):
+                force[:, d] -= np.bincount(src, weights=pull[:, d], minlength=n)
+                force[:, d] += np.bincount(dst, weights=pull[:, d], minlength=n)
+
+        length = np.maximum(np.sqrt((force ** 2).sum(axis=1)), 1e-9)
+        step = force * (np.minimum(length, temperature) / length)[:, None]
+        step[pinned] = 0
+        pos += step
+        temperature -= cooling
+
+        if np.abs(step).max() / extent < tolerance:
+            break
+
+    if not pinned.any():
+        # Centred and scaled into [-1, 1], as networkx layouts are
+        pos -= pos.mean(axis=0)
+        largest = np.abs(pos).max()
+        if largest > 0:
+            pos /= largest
+    return pos
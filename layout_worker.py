@@ -0,0 +1,92 @@
+import threading
+import traceback
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class LayoutCancelled(Exception):
+    pass
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    def is_cancelled(self):
+        return self._event.is_set()
+
+    def check(self):
+        if self._event.is_set():
+            raise LayoutCancelled()
+
+
+class _JobSignals(QObject):
+    finished = pyqtSignal(int, object, object)
+    failed = pyqtSignal(int, object, str)
+
+
+class _LayoutJob(QRunnable):
+    def __init__(self, request_id, func, context, token, signals):
+        super().__init__()
+        self.request_id = request_id
+        self.func = func
+        self.context = context
+        self.token = token
+        self.signals = signals
+
+    def run(self):
+        if self.token.is_cancelled():
+            return
+        try:
+            result = self.func(self.token)
+        except LayoutCancelled:
+            return
+        except Exception:
+            self.signals.failed.emit(self.request_id, self.context, traceback.format_exc())
+            return
+        if not self.token.is_cancelled():
+            self.signals.finished.emit(self.request_id, self.context, result)
+
+
+class LayoutWorker(QObject):
+    # Emitted on the GUI thread with (context, result) for the latest request only
+    ready = pyqtSignal(object, object)
+    failed = pyqtSignal(object, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # One thread is enough: only the newest request is ever worth finishing
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._signals = _JobSignals()
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+        self._request_id = 0
+        self._token = None
+
+    def submit(self, func, context=None):
+        self.cancel()
+        self._request_id += 1
+        self._token = CancelToken()
+        self.pool.start(_LayoutJob(self._request_id, func, context, self._token, self._signals))
+        return self._request_id
+
+    def cancel(self):
+        if self._token is not None:
+            self._token.cancel()
+        # Drop jobs that were queued behind the running one
+        self.pool.clear()
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)
+
+    def _on_finished(self, request_id, context, result):
+        if request_id == self._request_id:
+            self.ready.emit(context, result)
+
+    def _on_failed(self, request_id, context, message):
+        if request_id == self._request_id:
+            self.failed.emit(context, message)
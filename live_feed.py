@@ -0,0 +1,192 @@
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+from inventory_loader import MalformedRow, asset_from_record, edge_from_record
+
+# Deltas are inventory rows (see inventory_loader) with an optional "op": "add" (the default, which
+# also updates existing assets) or "remove". Assets are removed by "name", edges by "source"/"target".
+
+
+class FileFeed:
+    # Follows a JSONL file that other tools append deltas to, like tail -f
+    def __init__(self, path, from_start=False):
+        self.path = path
+        self.offset = 0
+        self.partial = b""
+        if not from_start and os.path.exists(path):
+            self.offset = os.path.getsize(path)
+
+    def poll(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self.offset:
+            # Truncated or replaced: start over
+            self.offset = 0
+            self.partial = b""
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(size - self.offset)
+        self.offset = size
+        lines = (self.partial + data).split(b"\n")
+        # The last piece has no newline yet; keep it for the next poll
+        self.partial = lines.pop()
+        return _parse_lines(lines, self.path)
+
+    def close(self):
+        pass
+
+
+class SocketFeed:
+    # Accepts newline-delimited JSON deltas on a local TCP port; connections are read on a thread
+    def __init__(self, port, host="127.0.0.1"):
+        self.queue = queue.Queue()
+        self.server = socket.create_server((host, port))
+        self.address = self.server.getsockname()
+        self._closed = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while not self._closed.is_set():
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._read, args=(conn,), daemon=True).start()
+
+    def _read(self, conn):
+        source = "socket"
+        with conn, conn.makefile("rb") as f:
+            for line in f:
+                for record in _parse_lines([line], source):
+                    self.queue.put(record)
+
+    def poll(self):
+        records = []
+        while True:
+            try:
+                records.append(self.queue.get_nowait())
+            except queue.Empty:
+                return records
+
+    def close(self):
+        self._closed.set()
+        self.server.close()
+
+
+def _parse_lines(lines, source):
+    records = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith(b"#"):
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            print(f"{source}: ignoring invalid delta: {e}")
+            continue
+        if isinstance(record, dict):
+            records.append(record)
+        else:
+            print(f"{source}: ignoring delta that is not a JSON object")
+    return records
+
+
+def open_feed(spec):
+    # "tcp:PORT" listens on localhost, anything else is a file to follow
+    if spec.startswith("tcp:"):
+        return SocketFeed(int(spec[4:]))
+    return FileFeed(spec)
+
+
+class DeltaBatcher:
+    # Coalesces bursts: a batch is due once the feed has been quiet for `quiet` seconds, or
+    # `max_delay` seconds after its first delta, whichever comes first
+    def __init__(self, quiet=0.3, max_delay=1.0):
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.pending = []
+        self.first = None
+        self.last = None
+
+    def add(self, records, now=None):
+        if not records:
+            return
+        now = time.monotonic() if now is None else now
+        if not self.pending:
+            self.first = now
+        self.pending.extend(records)
+        self.last = now
+
+    def due(self, now=None):
+        if not self.pending:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self.last >= self.quiet or now - self.first >= self.max_delay
+
+    def take(self):
+        records, self.pending = self.pending, []
+        self.first = self.last = None
+        return records
+
+
+class DeltaResult:
+    def __init__(self):
+        self.applied = 0
+        self.errors = []
+        # Asset names whose position may need to change, and areas whose membership or links changed
+        self.touched = set()
+        self.areas = set()
+        self.area_set_changed = False
+
+
+def apply_deltas(model, records):
+    result = DeltaResult()
+    areas_before = set(model.functional_areas)
+    for record in records:
+        op = record.get("op", "add")
+        kind = record.get("type") or ("edge" if "source" in record else "asset")
+        try:
+            if kind == "asset" and op == "add":
+                name, data = asset_from_record(record)
+                if name in model.assets:
+                    result.areas.add(model.assets[name].area)
+                model.add_asset(name, data)
+                result.touched.add(name)
+                result.areas.add(data["area"])
+            elif kind == "asset" and op == "remove":
+                name = record.get("name")
+                if not isinstance(name, str):
+                    raise MalformedRow("asset removal needs a name")
+                if name not in model.assets:
+                    raise MalformedRow(f"cannot remove unknown asset {name!r}")
+                area = model.assets[name].area
+                neighbours = [model.store.names[i] for edge in model.store.incident_edges(model.store.ids[name])
+                              for i in edge]
+                model.remove_asset(name)
+                result.touched.update(n for n in neighbours if n != name)
+                result.areas.add(area)
+            elif kind == "edge" and op in ("add", "remove"):
+                source, target = edge_from_record(record)
+                for name in (source, target):
+                    if name not in model.assets:
+                        raise MalformedRow(f"edge {source!r} -> {target!r} references unknown asset {name!r}")
+                changed = model.add_edge(source, target) if op == "add" else model.remove_edge(source, target)
+                if changed:
+                    result.touched.update((source, target))
+                    result.areas.update((model.assets[source].area, model.assets[target].area))
+            else:
+                raise MalformedRow(f"unknown delta {op!r} {kind!r}")
+            result.applied += 1
+        except MalformedRow as e:
+            result.errors.append(str(e))
+    result.touched = {name for name in result.touched if name in model.assets}
+    result.area_set_changed = set(model.functional_areas) != areas_before
+    return result
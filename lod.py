@@ -0,0 +1,148 @@
+import numpy as np
+from matplotlib.collections import LineCollection
+
+from scene import EDGE_COLOR, EDGE_WIDTH
+
+
+class LevelOfDetail:
+    # Decides what part of a ViewScene is drawn for the current view limits. During pan/zoom a
+    # cheap coarse pass runs on every limit change; once interaction settles a fine pass adds labels
+    # and a larger node budget.
+    def __init__(self, ax, max_labels=150, max_nodes=2000, coarse_nodes=800, grid=48, settle_ms=250):
+        self.ax = ax
+        self.canvas = ax.figure.canvas
+        self.max_labels = max_labels
+        self.max_nodes = max_nodes
+        self.coarse_nodes = coarse_nodes
+        self.grid = grid
+        self.scene = None
+
+        # Dense screen cells are drawn as one marker each, with deduplicated cell-to-cell edges
+        self.aggregate_edges = LineCollection([], colors=EDGE_COLOR, alpha=0.6, zorder=1)
+        ax.add_collection(self.aggregate_edges, autolim=False)
+        self.aggregate_artist = ax.scatter([], [], edgecolors='black', linewidths=0.5, zorder=2)
+        self.aggregate_counts = np.zeros(0, dtype=np.int64)
+        self.aggregate_bounds = np.zeros((0, 4))
+
+        self.timer = self.canvas.new_timer(interval=settle_ms)
+        self.timer.single_shot = True
+        self.timer.add_callback(self.refine)
+        ax.callbacks.connect('xlim_changed', self._on_limits_changed)
+        ax.callbacks.connect('ylim_changed', self._on_limits_changed)
+
+    def attach(self, scene):
+        self.scene = scene
+        self.apply(fine=True)
+
+    def detach(self):
+        self.timer.stop()
+        self.scene = None
+        self._clear_aggregates()
+
+    def refine(self):
+        if self.scene is not None:
+            self.apply(fine=True)
+            self.canvas.draw_idle()
+
+    def _on_limits_changed(self, ax):
+        if self.scene is None:
+            return
+        self.apply(fine=False)
+        self.timer.stop()
+        self.timer.start()
+
+    def apply(self, fine=True):
+        scene = self.scene
+        (x0, x1), (y0, y1) = sorted(self.ax.get_xlim()), sorted(self.ax.get_ylim())
+        xy = scene.xy
+        # A small margin so markers straddling the border do not pop in and out
+        mx = (x1 - x0) * 0.02
+        my = (y1 - y0) * 0.02
+        inview = ((xy[:, 0] >= x0 - mx) & (xy[:, 0] <= x1 + mx) &
+                  (xy[:, 1] >= y0 - my) & (xy[:, 1] <= y1 + my))
+        idx = np.flatnonzero(inview)
+        src, dst = scene.edge_src, scene.edge_dst
+
+        budget = self.max_nodes if fine else self.coarse_nodes
+        if len(idx) <= budget:
+            edges = np.flatnonzero(inview[src] | inview[dst])
+            labels = ()
+            if len(idx) <= self.max_labels:
+                # The coarse pass never creates labels, it only keeps the ones that already exist
+                labels = idx if fine else [i for i in idx.tolist() if i in scene.labels]
+            scene.show_subset(idx, edges, labels)
+            self._clear_aggregates()
+            return
+
+        grid = self.grid
+        cx = np.clip(((xy[idx, 0] - x0) / (x1 - x0) * grid).astype(np.int64), 0, grid - 1)
+        cy = np.clip(((xy[idx, 1] - y0) / (y1 - y0) * grid).astype(np.int64), 0, grid - 1)
+        cells, inverse, counts = np.unique(cx * grid + cy, return_inverse=True, return_counts=True)
+        inverse = inverse.reshape(-1)
+
+        # Cells holding a single node keep the real node; the rest collapse into aggregates
+        dense = counts > 1
+        n_agg = int(dense.sum())
+        agg_id = np.full(len(cells), -1, dtype=np.int64)
+        agg_id[dense] = np.arange(n_agg)
+        group = np.full(len(xy), -2, dtype=np.int64)
+        group[idx] = agg_id[inverse]
+        singles = idx[group[idx] == -1]
+
+        sums = np.stack([np.bincount(inverse, weights=xy[idx, d], minlength=len(cells)) for d in (0, 1)], axis=1)
+        centroids = sums[dense] / counts[dense, None]
+        colors = np.stack([np.bincount(inverse, weights=scene.node_colors[idx, c], minlength=len(cells))
+                           for c in range(4)], axis=1)[dense] / counts[dense, None]
+        sizes = scene.node_size * np.minimum(np.sqrt(counts[dense]), 8.0)
+        cell_w = (x1 - x0) / grid
+        cell_h = (y1 - y0) / grid
+        bx = x0 + (cells[dense] // grid) * cell_w
+        by = y0 + (cells[dense] % grid) * cell_h
+        bounds = np.stack([bx, bx + cell_w, by, by + cell_h], axis=1)
+
+        gs, gd = group[src], group[dst]
+        plain = (gs < 0) & (gd < 0) & (inview[src] | inview[dst])
+        linked = inview[src] & inview[dst] & ((gs >= 0) | (gd >= 0))
+        # Endpoint keys: aggregates first, then single nodes offset by the aggregate count
+        ks = np.where(gs >= 0, gs, n_agg + src)[linked]
+        kd = np.where(gd >= 0, gd, n_agg + dst)[linked]
+        keep = ks != kd
+        pairs, weight = np.unique(np.stack([ks[keep], kd[keep]], axis=1), axis=0, return_counts=True)
+        points = np.concatenate([centroids, xy])
+        segments = points[pairs.reshape(-1)].reshape(-1, 2, 2)
+        widths = np.minimum(EDGE_WIDTH * 0.5 * (1 + np.log2(np.maximum(weight, 1))), 6.0)
+
+        scene.show_subset(singles, np.flatnonzero(plain), ())
+        self._set_aggregates(centroids, colors, sizes, counts[dense], bounds, segments, widths)
+
+    def _set_aggregates(self, offsets, colors, sizes, counts, bounds, segments, widths):
+        self.aggregate_artist.set_offsets(np.asarray(offsets, dtype=float).reshape(-1, 2))
+        self.aggregate_artist.set_facecolor(colors)
+        self.aggregate_artist.set_sizes(sizes)
+        self.aggregate_counts = counts
+        self.aggregate_bounds = bounds
+        self.aggregate_edges.set_segments(segments)
+        self.aggregate_edges.set_linewidths(widths)
+
+    def _clear_aggregates(self):
+        if len(self.aggregate_counts) or len(self.aggregate_edges.get_segments()):
+            self._set_aggregates(np.zeros((0, 2)), np.zeros((0, 4)), [], np.zeros(0, dtype=np.int64),
+                                 np.zeros((0, 4)), [], [])
+
+    def aggregate_near(self, x, y, slack=2.0):
+        # There are at most grid * grid aggregates, so a direct test in display space is enough
+        if len(self.aggregate_counts) == 0:
+            return None
+        offsets = self.ax.transData.transform(self.aggregate_artist.get_offsets())
+        radius = np.sqrt(self.aggregate_artist.get_sizes()) / 2.0 * self.ax.figure.dpi / 72.0 + slack
+        d = np.hypot(offsets[:, 0] - x, offsets[:, 1] - y) - radius
+        ind = int(np.argmin(d))
+        return ind if d[ind] <= 0 else None
+
+    def zoom_to(self, ind):
+        # Zoom onto an aggregate's cell with half a cell of context on every side
+        x0, x1, y0, y1 = self.aggregate_bounds[ind]
+        pad_x = (x1 - x0) / 2
+        pad_y = (y1 - y0) / 2
+        self.ax.set_xlim(x0 - pad_x, x1 + pad_x)
+        self.ax.set_ylim(y0 - pad_y, y1 + pad_y)
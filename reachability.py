@@ -0,0 +1,171 @@
+import numpy as np
+
+# Above this many strongly connected components the bitset closure (components^2 / 8 bytes) is
+# skipped and queries walk the condensation DAG instead
+CLOSURE_LIMIT = 16384
+
+
+def _build_csr(n, src, dst):
+    order = np.argsort(src, kind="stable")
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, np.asarray(dst)[order]
+
+
+def _neighbours(indptr, indices, frontier):
+    starts = indptr[frontier]
+    counts = indptr[frontier + 1] - starts
+    total = int(counts.sum())
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return np.repeat(frontier, counts), indices[offsets]
+
+
+def _bfs(indptr, indices, n, start, target=None):
+    # Level-synchronous BFS; parent[v] is the node v was first reached from
+    seen = np.zeros(n, dtype=bool)
+    parent = np.full(n, -1, dtype=np.int64)
+    seen[start] = True
+    frontier = np.asarray([start], dtype=np.int64)
+    while len(frontier):
+        owners, nbrs = _neighbours(indptr, indices, frontier)
+        new = ~seen[nbrs]
+        nbrs, first = np.unique(nbrs[new], return_index=True)
+        seen[nbrs] = True
+        parent[nbrs] = owners[new][first]
+        if target is not None and seen[target]:
+            break
+        frontier = nbrs.astype(np.int64)
+    return seen, parent
+
+
+def strongly_connected_components(n, indptr, indices):
+    # Iterative Tarjan. Components are numbered in the order they complete, which is a reverse
+    # topological order: every edge of the condensation goes from a higher to a lower id.
+    indptr = indptr.tolist()
+    indices = indices.tolist()
+    order = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    component = [-1] * n
+    stack = []
+    counter = 0
+    n_components = 0
+    for root in range(n):
+        if order[root] != -1:
+            continue
+        work = [(root, indptr[root])]
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            v, i = work[-1]
+            if i < indptr[v + 1]:
+                work[-1] = (v, i + 1)
+                w = indices[i]
+                if order[w] == -1:
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, indptr[w]))
+                elif on_stack[w] and order[w] < low[v]:
+                    low[v] = order[w]
+                continue
+            work.pop()
+            if work:
+                u = work[-1][0]
+                if low[v] < low[u]:
+                    low[u] = low[v]
+            if low[v] == order[v]:
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    component[w] = n_components
+                    if w == v:
+                        break
+                n_components += 1
+    return np.asarray(component, dtype=np.int64), n_components
+
+
+class ReachabilityIndex:
+    def __init__(self, store, closure_limit=CLOSURE_LIMIT):
+        self.n = n = len(store)
+        self.indptr, self.indices = store.csr()
+        self.component, self.n_components = strongly_connected_components(n, self.indptr, self.indices)
+        c = self.n_components
+
+        # Component membership as a CSR: members of component k are members[member_ptr[k]:member_ptr[k + 1]]
+        self.member_ptr, self.members = _build_csr(c, self.component, np.arange(n))
+
+        src, dst = store.edge_arrays()
+        cs, cd = self.component[src], self.component[dst]
+        keep = cs != cd
+        pairs = np.unique(np.stack([cs[keep], cd[keep]], axis=1), axis=0).reshape(-1, 2)
+        self.dag = _build_csr(c, pairs[:, 0], pairs[:, 1])
+        self.reverse_dag = _build_csr(c, pairs[:, 1], pairs[:, 0])
+
+        self.closure = None
+        if c <= closure_limit:
+            self.closure = self._build_closure()
+
+    def _build_closure(self):
+        # Row k holds one bit per component reachable from k (including k). Successors always have
+        # lower ids, so a single pass in id order sees every successor's row complete.
+        c = self.n_components
+        words = (c + 63) // 64
+        closure = np.zeros((c, words), dtype=np.uint64)
+        indptr, indices = self.dag
+        for k in range(c):
+            succ = indices[indptr[k]:indptr[k + 1]]
+            if len(succ):
+                closure[k] = np.bitwise_or.reduce(closure[succ], axis=0)
+            closure[k, k >> 6] |= np.uint64(1) << np.uint64(k & 63)
+        return closure
+
+    def _components_to_nodes(self, mask, exclude):
+        nodes = np.flatnonzero(mask[self.component])
+        return nodes[nodes != exclude]
+
+    def downstream(self, node_id):
+        # Every node reachable from node_id along data flow, excluding node_id itself
+        k = self.component[node_id]
+        if self.closure is not None:
+            bits = np.unpackbits(self.closure[k].view(np.uint8), bitorder="little")[:self.n_components]
+            mask = bits.astype(bool)
+        else:
+            mask, _ = _bfs(*self.dag, self.n_components, k)
+        return self._components_to_nodes(mask, node_id)
+
+    def upstream(self, node_id):
+        # Every node that can reach node_id, excluding node_id itself
+        k = self.component[node_id]
+        if self.closure is not None:
+            mask = ((self.closure[:, k >> 6] >> np.uint64(k & 63)) & np.uint64(1)).astype(bool)
+        else:
+            mask, _ = _bfs(*self.reverse_dag, self.n_components, k)
+        return self._components_to_nodes(mask, node_id)
+
+    def reaches(self, source_id, target_id):
+        a, b = self.component[source_id], self.component[target_id]
+        if a == b:
+            return True
+        if b > a:
+            return False
+        if self.closure is not None:
+            return bool((self.closure[a, b >> 6] >> np.uint64(b & 63)) & np.uint64(1))
+        seen, _ = _bfs(*self.dag, self.n_components, a, target=b)
+        return bool(seen[b])
+
+    def shortest_path(self, source_id, target_id):
+        # Fewest-hop path as a list of node ids, or None; the index rules out unreachable pairs
+        # before any search runs
+        if source_id == target_id:
+            return [source_id]
+        if not self.reaches(source_id, target_id):
+            return None
+        _, parent = _bfs(self.indptr, self.indices, self.n, source_id, target=target_id)
+        path = [target_id]
+        while path[-1] != source_id:
+            path.append(int(parent[path[-1]]))
+        return path[::-1]
@@ -0,0 +1,338 @@
+import colorsys
+from collections import OrderedDict
+
+import numpy as np
+from matplotlib.collections import LineCollection, PathCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.path import Path
+from matplotlib.transforms import IdentityTransform
+
+from spatial_index import GridIndex
+
+NODE_SIZE = 3000
+NODE_ALPHA = 0.8
+FONT_SIZE = 10
+EDGE_COLOR = 'gray'
+EDGE_WIDTH = 1.5
+# Arrowhead length and width in points
+ARROW_LENGTH = 12.0
+ARROW_WIDTH = 8.0
+
+
+def generate_colors(n):
+    HSV_tuples = [(x * 1.0 / n, 0.5, 0.5) for x in range(n)]
+    RGB_tuples = list(map(lambda x: colorsys.hsv_to_rgb(*x), HSV_tuples))
+    return ['#%02x%02x%02x' % (int(r * 255), int(g * 255), int(b * 255)) for r, g, b in RGB_tuples]
+
+
+def integration_widths(weights, max_width=6.0):
+    # Line widths for area-to-area edges; logarithmic so a few very busy links do not swamp the rest
+    weights = np.asarray(weights, dtype=float)
+    if len(weights) == 0:
+        return weights
+    return 0.75 + (max_width - 0.75) * np.log1p(weights) / np.log1p(max(weights.max(), 1.0))
+
+
+def view_limits(xy, margin=0.1):
+    if len(xy) == 0:
+        return (-1, 1), (-1, 1)
+    lo = xy.min(axis=0)
+    hi = xy.max(axis=0)
+    pad = (hi - lo) * margin + 0.15
+    return (lo[0] - pad[0], hi[0] + pad[0]), (lo[1] - pad[1], hi[1] + pad[1])
+
+
+def nearest_in_display(ax, index, x, y, radius, mask=None):
+    # The index is in data space; a pixel radius becomes an ellipse there when the axes scale
+    # x and y differently
+    scale = np.abs(ax.transData.transform([(1.0, 1.0)]) - ax.transData.transform([(0.0, 0.0)]))[0]
+    if not (scale > 0).all():
+        return None
+    cx, cy = ax.transData.inverted().transform((x, y))
+    return index.nearest(cx, cy, radius / scale[0], radius / scale[1], mask)
+
+
+class ArrowCollection(PathCollection):
+    # Arrowheads whose paths are only built when drawn, and only for the edges drawn then, so edges
+    # that level of detail culls before the first draw never get one
+    def __init__(self, build, **kwargs):
+        super().__init__([], **kwargs)
+        self.build = build
+        self.paths_stale = True
+
+    def invalidate(self):
+        self.paths_stale = True
+        self.stale = True
+
+    def draw(self, renderer):
+        if self.paths_stale:
+            # Set directly: set_paths would mark the artist stale again in the middle of a draw
+            self._paths = self.build()
+            self.paths_stale = False
+        super().draw(renderer)
+
+
+class ViewScene:
+    def __init__(self, ax, key, nodes, pos, edges, node_colors, node_size=NODE_SIZE, edge_widths=EDGE_WIDTH,
+                 font_size=FONT_SIZE, max_labels=None):
+        self.ax = ax
+        self.key = key
+        self.nodes = list(nodes)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        self.xy = np.asarray([pos[node] for node in self.nodes], dtype=float).reshape(-1, 2)
+        self.node_size = node_size
+        self.font_size = font_size
+        self.node_colors = self._rgba(node_colors)
+        # Colours the view was built with, restored when an overlay such as a diff is removed
+        self.base_colors = self.node_colors
+        self.visible = True
+
+        edges = [(self.index[u], self.index[v]) for u, v in edges if u != v]
+        edge_index = np.asarray(edges, dtype=np.int64).reshape(-1, 2)
+        self.edge_src = edge_index[:, 0]
+        self.edge_dst = edge_index[:, 1]
+        self.edge_widths = np.broadcast_to(np.asarray(edge_widths, dtype=float), self.edge_src.shape).copy()
+
+        # What is currently drawn, as indices into nodes / edges; level of detail narrows these
+        self.drawn_nodes = np.arange(len(self.nodes))
+        self.drawn_edges = np.arange(len(self.edge_src))
+        self.drawn_mask = np.ones(len(self.nodes), dtype=bool)
+        self._spatial_index = None
+        # Labels are created on first use so huge views never build one Text per node
+        self.labels = {}
+        self.shown_labels = set()
+
+        self.edge_artist = LineCollection(self._segments(), colors=EDGE_COLOR, linewidths=self.edge_widths,
+                                          zorder=1)
+        ax.add_collection(self.edge_artist, autolim=False)
+
+        self.arrow_artist = ArrowCollection(self._arrow_paths, sizes=[1.0], facecolors=EDGE_COLOR,
+                                            edgecolors='none', offsets=self.xy[self.edge_dst],
+                                            offset_transform=ax.transData, zorder=1.5)
+        # Paths are in points, only the offsets live in data space
+        self.arrow_artist.set_transform(IdentityTransform())
+        ax.add_collection(self.arrow_artist, autolim=False)
+
+        self.node_artist = ax.scatter(self.xy[:, 0], self.xy[:, 1], s=node_size, c=self.node_colors,
+                                      zorder=2)
+        if max_labels is None or len(self.nodes) <= max_labels:
+            self.show_labels(self.drawn_nodes)
+
+        self.limits = view_limits(self.xy)
+
+    def artists(self):
+        return [self.edge_artist, self.arrow_artist, self.node_artist] + list(self.labels.values())
+
+    def spatial_index(self):
+        if self._spatial_index is None:
+            self._spatial_index = GridIndex(self.xy)
+        return self._spatial_index
+
+    def node_near(self, x, y, slack=2.0):
+        # Hit test in display coordinates against drawn nodes; the marker radius is in points
+        radius = np.sqrt(self.node_size) / 2.0 * self.ax.figure.dpi / 72.0 + slack
+        return nearest_in_display(self.ax, self.spatial_index(), x, y, radius, self.drawn_mask)
+
+    def _segments(self):
+        src = self.edge_src[self.drawn_edges]
+        dst = self.edge_dst[self.drawn_edges]
+        return np.stack([self.xy[src], self.xy[dst]], axis=1).reshape(-1, 2, 2)
+
+    def _arrow_paths(self):
+        # Arrowheads are drawn in points around the target node, so they keep their size when
+        # zooming; only the direction depends on the current data-to-display transform
+        if len(self.drawn_edges) == 0:
+            return []
+        display = self.ax.transData.transform(self.xy)
+        delta = display[self.edge_dst[self.drawn_edges]] - display[self.edge_src[self.drawn_edges]]
+        angle = np.arctan2(delta[:, 1], delta[:, 0])
+        radius = np.sqrt(self.node_size) / 2.0
+        base = np.array([[0.0, 0.0], [-ARROW_LENGTH, ARROW_WIDTH / 2], [-ARROW_LENGTH, -ARROW_WIDTH / 2],
+                         [0.0, 0.0]])
+        base[:, 0] -= radius
+        # Points to pixels
+        base *= self.ax.figure.dpi / 72.0
+        cos, sin = np.cos(angle), np.sin(angle)
+        xs = base[None, :, 0] * cos[:, None] - base[None, :, 1] * sin[:, None]
+        ys = base[None, :, 0] * sin[:, None] + base[None, :, 1] * cos[:, None]
+        codes = [Path.MOVETO, Path.LINETO, Path.LINETO, Path.CLOSEPOLY]
+        return [Path(np.column_stack([x, y]), codes) for x, y in zip(xs, ys)]
+
+    def set_visible(self, visible):
+        self.visible = visible
+        self.edge_artist.set_visible(visible)
+        self.arrow_artist.set_visible(visible)
+        self.node_artist.set_visible(visible)
+        for i, label in self.labels.items():
+            label.set_visible(visible and i in self.shown_labels)
+
+    def show_labels(self, node_idx):
+        wanted = set(np.asarray(node_idx).tolist())
+        for i in self.shown_labels - wanted:
+            self.labels[i].set_visible(False)
+        for i in wanted - self.shown_labels:
+            label = self.labels.get(i)
+            if label is None:
+                x, y = self.xy[i]
+                label = self.labels[i] = self.ax.text(x, y, self.nodes[i], fontsize=self.font_size, ha='center',
+                                                      va='center', zorder=3, clip_on=True)
+            label.set_visible(self.visible)
+        self.shown_labels = wanted
+
+    def show_subset(self, node_idx, edge_idx, label_idx=()):
+        self.drawn_nodes = np.asarray(node_idx, dtype=np.int64)
+        self.drawn_edges = np.asarray(edge_idx, dtype=np.int64)
+        self.drawn_mask = np.zeros(len(self.nodes), dtype=bool)
+        self.drawn_mask[self.drawn_nodes] = True
+        self.node_artist.set_offsets(self.xy[self.drawn_nodes].reshape(-1, 2))
+        self.node_artist.set_facecolor(self.node_colors[self.drawn_nodes])
+        self.edge_artist.set_segments(self._segments())
+        self.edge_artist.set_linewidths(self.edge_widths[self.drawn_edges])
+        self.arrow_artist.set_offsets(self.xy[self.edge_dst[self.drawn_edges]].reshape(-1, 2))
+        self.refresh_arrows()
+        self.show_labels(label_idx)
+
+    def refresh_arrows(self):
+        # Directions and sizes depend on the view and dpi; rebuilt for the drawn edges on the next draw
+        self.arrow_artist.invalidate()
+
+    def update_positions(self, pos):
+        xy = np.asarray([pos[node] for node in self.nodes], dtype=float).reshape(-1, 2)
+        if np.array_equal(xy, self.xy):
+            return False
+        moved = np.flatnonzero((xy != self.xy).any(axis=1))
+        self.xy = xy
+        self._spatial_index = None
+        self.node_artist.set_offsets(xy[self.drawn_nodes].reshape(-1, 2))
+        for i in moved.tolist():
+            if i in self.labels:
+                self.labels[i].set_position(xy[i])
+        self.edge_artist.set_segments(self._segments())
+        self.arrow_artist.set_offsets(xy[self.edge_dst[self.drawn_edges]].reshape(-1, 2))
+        self.refresh_arrows()
+        return True
+
+    def _rgba(self, colors):
+        rgba = to_rgba_array(colors, alpha=NODE_ALPHA)
+        if len(rgba) == 1 and len(self.nodes) > 1:
+            rgba = np.repeat(rgba, len(self.nodes), axis=0)
+        return rgba
+
+    def update_colors(self, node_colors):
+        self.node_colors = self._rgba(node_colors)
+        self.node_artist.set_facecolor(self.node_colors[self.drawn_nodes])
+
+    def restore_colors(self):
+        if self.node_colors is not self.base_colors:
+            self.node_colors = self.base_colors
+            self.node_artist.set_facecolor(self.node_colors[self.drawn_nodes])
+
+    def update_edge_widths(self, widths):
+        self.edge_widths = np.broadcast_to(np.asarray(widths, dtype=float), self.edge_src.shape).copy()
+        self.edge_artist.set_linewidths(self.edge_widths[self.drawn_edges])
+
+    def remove(self):
+        for artist in self.artists():
+            artist.remove()
+
+
+class SceneLayer:
+    def __init__(self, ax, max_scenes=8):
+        self.ax = ax
+        self.max_scenes = max_scenes
+        self.scenes = OrderedDict()
+        self.current = None
+        ax.callbacks.connect('xlim_changed', self._on_limits_changed)
+        ax.callbacks.connect('ylim_changed', self._on_limits_changed)
+        ax.figure.canvas.mpl_connect('resize_event', lambda event: self._on_limits_changed(ax))
+
+    def show(self, area, key, build, pos):
+        # Reuse the area's artists when the structure is unchanged; only positions may differ
+        scene = self.scenes.get(area)
+        if scene is not None and scene.key != key:
+            scene.remove()
+            del self.scenes[area]
+            scene = None
+
+        if self.current is not None and self.current is not scene:
+            self.current.limits = (self.ax.get_xlim(), self.ax.get_ylim())
+            self.current.set_visible(False)
+
+        if scene is None:
+            scene = build()
+            self.scenes[area] = scene
+            self._evict()
+        else:
+            self.scenes.move_to_end(area)
+            scene.set_visible(True)
+            if scene.update_positions(pos):
+                scene.limits = view_limits(scene.xy)
+
+        self.current = scene
+        self.ax.set_xlim(*scene.limits[0])
+        self.ax.set_ylim(*scene.limits[1])
+        scene.refresh_arrows()
+        return scene
+
+    def hide(self):
+        if self.current is not None:
+            self.current.limits = (self.ax.get_xlim(), self.ax.get_ylim())
+            self.current.set_visible(False)
+            self.current = None
+
+    def discard(self, area=None):
+        areas = [area] if area is not None else list(self.scenes)
+        for name in areas:
+            scene = self.scenes.pop(name, None)
+            if scene is not None:
+                if scene is self.current:
+                    self.current = None
+                scene.remove()
+
+    def _evict(self):
+        while len(self.scenes) > self.max_scenes:
+            _, scene = self.scenes.popitem(last=False)
+            scene.remove()
+
+    def _on_limits_changed(self, ax):
+        if self.current is not None:
+            self.current.refresh_arrows()
+
+
+class Highlighter:
+    # Draws the selection ring by blitting over a cached background instead of a full redraw
+    def __init__(self, canvas, ax):
+        self.canvas = canvas
+        self.ax = ax
+        self.background = None
+        self.artist = ax.scatter([], [], s=NODE_SIZE, facecolors='none', edgecolors='red', linewidths=2.5,
+                                 zorder=4, animated=True)
+        self.path_artist, = ax.plot([], [], color='red', linewidth=2.5, zorder=4, animated=True)
+        canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.ax.draw_artist(self.path_artist)
+        self.ax.draw_artist(self.artist)
+
+    def set(self, xy, size=NODE_SIZE, path=None):
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        self.artist.set_offsets(xy)
+        self.artist.set_sizes(np.full(len(xy), size))
+        path = np.zeros((0, 2)) if path is None else np.asarray(path, dtype=float).reshape(-1, 2)
+        self.path_artist.set_data(path[:, 0], path[:, 1])
+        self._blit()
+
+    def clear(self):
+        self.artist.set_offsets(np.zeros((0, 2)))
+        self.path_artist.set_data([], [])
+        self._blit()
+
+    def _blit(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.path_artist)
+        self.ax.draw_artist(self.artist)
+        self.canvas.blit(self.ax.bbox)
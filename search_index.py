@@ -0,0 +1,209 @@
+import bisect
+import math
+import re
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+SEPARATOR = "\x01"
+SEPARATED_TOKEN_RE = re.compile(r"[a-z0-9]+|\x01")
+
+# Relative weight of a term occurring in each field
+FIELD_WEIGHTS = {
+    "name": 5.0,
+    "area": 1.0,
+    "description": 1.0,
+    "key_features": 2.0,
+    "related_systems": 1.5,
+    "data_flow": 1.0,
+    "business_impact": 1.0,
+}
+# Term frequency saturation, as in BM25
+SATURATION = 1.2
+# Prefix matches score below an exact match of the same term
+PREFIX_PENALTY = 0.7
+# A short prefix can match a large part of the vocabulary; only its most common terms are used
+MAX_EXPANSIONS = 64
+MIN_PREFIX = 2
+# Rebuild the frozen postings once this fraction of assets has been updated since the last build
+REBUILD_FRACTION = 0.1
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def _field_text(value):
+    if not value:
+        return ""
+    return value if isinstance(value, str) else " ".join(value)
+
+
+class _Vocabulary(dict):
+    # term -> id, handing out the next id to unseen terms
+    def __missing__(self, term):
+        term_id = self[term] = len(self)
+        return term_id
+
+
+def asset_terms(name, record):
+    # Weighted term frequencies for one asset over all of its fields
+    weights = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        value = name if field == "name" else _field_text(record.get(field))
+        for term in tokenize(value):
+            weights[term] = weights.get(term, 0.0) + weight
+    return {term: s * (SATURATION + 1) / (s + SATURATION) for term, s in weights.items()}
+
+
+class SearchIndex:
+    # Postings are frozen into CSR arrays at build time. Assets changed later are masked out of
+    # the frozen arrays and served from a small dict overlay until the next rebuild.
+    def __init__(self, store):
+        self.store = store
+        self.build()
+
+    def build(self):
+        # One regex pass per field over all assets joined with a separator token, so the per-token
+        # work stays in C; the separators tell which asset each token came from
+        store = self.store
+        n = len(store)
+        vocabulary = _Vocabulary()
+        separator = vocabulary[SEPARATOR]
+        term_ids = []
+        doc_ids = []
+        weights = []
+        records = [store.record(node_id) for node_id in range(n)]
+        for field, weight in FIELD_WEIGHTS.items():
+            if field == "name":
+                values = store.names
+            else:
+                values = [_field_text(record.get(field)) for record in records]
+            tokens = SEPARATED_TOKEN_RE.findall(SEPARATOR.join(values).lower())
+            ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+            boundary = ids == separator
+            term_ids.append(ids[~boundary])
+            doc_ids.append(np.cumsum(boundary)[~boundary])
+            weights.append(np.full(len(term_ids[-1]), weight, dtype=np.float32))
+        del vocabulary[SEPARATOR]
+        term_ids = np.concatenate(term_ids)
+        doc_ids = np.concatenate(doc_ids)
+        weights = np.concatenate(weights)
+
+        self.terms = sorted(vocabulary)
+        rank = np.empty(len(vocabulary) + 1, dtype=np.int64)
+        # Term ids in first-seen order -> position in the sorted vocabulary
+        rank[[vocabulary[term] for term in self.terms]] = np.arange(len(self.terms))
+        keys = rank[term_ids] * max(n, 1) + doc_ids
+        keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse.reshape(-1), weights=weights)
+
+        self.doc_ids = (keys % max(n, 1)).astype(np.int32)
+        self.weights = (totals * (SATURATION + 1) / (totals + SATURATION)).astype(np.float32)
+        self.term_ptr = np.zeros(len(self.terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys // max(n, 1), minlength=len(self.terms)), out=self.term_ptr[1:])
+        self.frozen_docs = n
+        self.stale = np.zeros(n, dtype=bool)
+
+        self.overlay = {}
+        self.overlay_terms = []
+        self.overlay_docs = {}
+
+    def __len__(self):
+        return len(self.store)
+
+    def update(self, node_id):
+        # Re-index one asset after it was added or its record replaced
+        name = self.store.names[node_id]
+        if node_id < self.frozen_docs:
+            self.stale[node_id] = True
+        for term in self.overlay_docs.pop(node_id, ()):
+            self.overlay[term].pop(node_id, None)
+        terms = asset_terms(name, self.store.record(node_id))
+        for term, weight in terms.items():
+            entry = self.overlay.get(term)
+            if entry is None:
+                entry = self.overlay[term] = {}
+                bisect.insort(self.overlay_terms, term)
+            entry[node_id] = weight
+        self.overlay_docs[node_id] = tuple(terms)
+        if len(self.overlay_docs) > max(1000, REBUILD_FRACTION * len(self.store)):
+            self.build()
+
+    def remove(self, node_id, moved_from=None):
+        # node_id no longer exists; if moved_from is given, the asset that had that id now has node_id
+        for old_id in (node_id, moved_from):
+            if old_id is None:
+                continue
+            if old_id < self.frozen_docs:
+                self.stale[old_id] = True
+            for term in self.overlay_docs.pop(old_id, ()):
+                self.overlay[term].pop(old_id, None)
+        if moved_from is not None:
+            self.update(node_id)
+
+    def _document_frequency(self, term):
+        df = len(self.overlay.get(term, ()))
+        i = bisect.bisect_left(self.terms, term)
+        if i < len(self.terms) and self.terms[i] == term:
+            df += int(self.term_ptr[i + 1] - self.term_ptr[i])
+        return df
+
+    def _expand(self, token, prefix):
+        # Terms matching token exactly, plus (if prefix) the most common terms it prefixes
+        if not prefix or len(token) < MIN_PREFIX:
+            return [token]
+        matches = set()
+        for terms in (self.terms, self.overlay_terms):
+            lo = bisect.bisect_left(terms, token)
+            hi = bisect.bisect_left(terms, token + "\uffff")
+            matches.update(terms[lo:hi])
+        if len(matches) > MAX_EXPANSIONS:
+            matches = sorted(matches, key=self._document_frequency, reverse=True)[:MAX_EXPANSIONS]
+            if token not in matches:
+                matches.append(token)
+        return matches
+
+    def _token_scores(self, token, prefix, n):
+        scores = np.zeros(n, dtype=np.float32)
+        for term in self._expand(token, prefix):
+            df = self._document_frequency(term)
+            if df == 0:
+                continue
+            boost = math.log(1.0 + n / df) * (1.0 if term == token else PREFIX_PENALTY)
+            i = bisect.bisect_left(self.terms, term)
+            if i < len(self.terms) and self.terms[i] == term:
+                docs = self.doc_ids[self.term_ptr[i]:self.term_ptr[i + 1]]
+                values = self.weights[self.term_ptr[i]:self.term_ptr[i + 1]] * boost
+                values[self.stale[docs]] = 0.0
+                scores[docs] = np.maximum(scores[docs], values)
+            entry = self.overlay.get(term)
+            if entry:
+                docs = np.fromiter(entry.keys(), dtype=np.int64, count=len(entry))
+                values = np.fromiter(entry.values(), dtype=np.float32, count=len(entry)) * boost
+                scores[docs] = np.maximum(scores[docs], values)
+        return scores
+
+    def search(self, query, limit=50):
+        # Every query token must match; the last one is treated as a prefix while the user is typing.
+        # Returns the best `limit` node ids ranked best first, and every matching node id.
+        tokens = tokenize(query)
+        if not tokens:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        # Frozen postings may still name ids past the end of a store that has shrunk; they are stale
+        n = max(len(self.store), self.frozen_docs)
+        total = None
+        for position, token in enumerate(tokens):
+            scores = self._token_scores(token, position == len(tokens) - 1, n)
+            if total is None:
+                total = scores
+            else:
+                total = np.where((total > 0) & (scores > 0), total + scores, 0.0)
+        matched = np.flatnonzero(total > 0)
+        top = matched
+        if len(matched) > limit:
+            top = matched[np.argpartition(-total[matched], limit)[:limit]]
+        # Best score first, ties in node order so results are stable between keystrokes
+        top = top[np.lexsort((top, -total[top]))]
+        return top, matched
@@ -0,0 +1,234 @@
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from cba_model import CBAModel
+from graph_store import AssetRecord, GraphStore
+from instrumentation import span
+
+SNAPSHOT_MAGIC = b"CBASNAP\x00"
+SNAPSHOT_VERSION = 3
+ALIGNMENT = 64
+
+# magic, version, header length
+_PREAMBLE = struct.Struct("<8sII")
+
+TEXT_FIELDS = ("description", "data_flow", "business_impact")
+LIST_FIELDS = ("key_features", "related_systems")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+class StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def intern(self, value):
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+    def to_arrays(self):
+        encoded = [s.encode("utf-8") for s in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return data, offsets
+
+
+class SnapshotStrings:
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, string_id):
+        value = self._decoded.get(string_id)
+        if value is None:
+            start, end = self.offsets[string_id], self.offsets[string_id + 1]
+            value = sys.intern(self.data[start:end].tobytes().decode("utf-8"))
+            self._decoded[string_id] = value
+        return value
+
+
+def _ragged(rows, strings):
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    ids = []
+    for i, row in enumerate(rows):
+        ids.extend(strings.intern(item) for item in row)
+        indptr[i + 1] = len(ids)
+    return indptr, np.asarray(ids, dtype=np.int32)
+
+
+def save_snapshot(model, path, layouts=None):
+    strings = StringTable()
+    arrays = {}
+
+    store = model.store
+    names = store.names
+    records = [store.record(i) for i in range(len(names))]
+    arrays["asset_name"] = np.asarray([strings.intern(n) for n in names], dtype=np.int32)
+    arrays["asset_area"] = np.asarray([strings.intern(r.area) for r in records], dtype=np.int32)
+    for field in TEXT_FIELDS:
+        arrays["asset_" + field] = np.asarray([strings.intern(getattr(r, field)) for r in records], dtype=np.int32)
+    for field in LIST_FIELDS:
+        indptr, ids = _ragged([getattr(r, field) for r in records], strings)
+        arrays[field + "_indptr"] = indptr
+        arrays[field + "_ids"] = ids
+
+    # Integer-indexed adjacency (CSR) straight from the store
+    arrays["adj_indptr"], arrays["adj_indices"] = store.csr()
+
+    # Area membership keeps functional_areas order
+    areas = list(model.overview_G.nodes())
+    area_index = {area: i for i, area in enumerate(areas)}
+    arrays["area_name"] = np.asarray([strings.intern(a) for a in areas], dtype=np.int32)
+    member_indptr = np.zeros(len(areas) + 1, dtype=np.int64)
+    members = []
+    for i, area in enumerate(areas):
+        members.extend(store.ids[n] for n in model.functional_areas.get(area, []))
+        member_indptr[i + 1] = len(members)
+    arrays["area_indptr"] = member_indptr
+    arrays["area_members"] = np.asarray(members, dtype=np.int32)
+
+    # Integration counts between areas, so opening a snapshot does not aggregate the adjacency again
+    overview_edges = list(model.overview_G.edges(data="weight"))
+    arrays["overview_src"] = np.asarray([area_index[s] for s, _, _ in overview_edges], dtype=np.int32)
+    arrays["overview_dst"] = np.asarray([area_index[t] for _, t, _ in overview_edges], dtype=np.int32)
+    arrays["overview_weight"] = np.asarray([w for _, _, w in overview_edges], dtype=np.int64)
+
+    # Edges listed more than once in the inventory, with the number of extra listings
+    duplicates = list(store.duplicate_edges.items())
+    arrays["duplicate_src"] = np.asarray([s for (s, _), _ in duplicates], dtype=np.int32)
+    arrays["duplicate_dst"] = np.asarray([t for (_, t), _ in duplicates], dtype=np.int32)
+    arrays["duplicate_count"] = np.asarray([count for _, count in duplicates], dtype=np.int64)
+
+    # Cached layouts: (area, structural hash) -> {node: (x, y)}
+    layout_keys, layout_hashes, layout_indptr, layout_nodes, layout_xy = [], [], [0], [], []
+    for (area, graph_hash), pos in (layouts or {}).items():
+        layout_keys.append(strings.intern(area))
+        layout_hashes.append(strings.intern(graph_hash))
+        for node, xy in pos.items():
+            layout_nodes.append(strings.intern(node))
+            layout_xy.append((float(xy[0]), float(xy[1])))
+        layout_indptr.append(len(layout_nodes))
+    arrays["layout_area"] = np.asarray(layout_keys, dtype=np.int32)
+    arrays["layout_hash"] = np.asarray(layout_hashes, dtype=np.int32)
+    arrays["layout_indptr"] = np.asarray(layout_indptr, dtype=np.int64)
+    arrays["layout_nodes"] = np.asarray(layout_nodes, dtype=np.int32)
+    arrays["layout_xy"] = np.asarray(layout_xy, dtype=np.float64).reshape(-1, 2)
+
+    arrays["strings_data"], arrays["strings_offsets"] = strings.to_arrays()
+
+    _write(path, arrays)
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _write(path, arrays):
+    # Offsets are relative to the start of the data section so the header can be sized last
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        offset = _align(offset)
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = json.dumps({"version": SNAPSHOT_VERSION, "arrays": layout}).encode("utf-8")
+    data_start = _align(_PREAMBLE.size + len(header))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+
+def open_snapshot(path):
+    mm = np.memmap(path, dtype=np.uint8, mode="r")
+    if len(mm) < _PREAMBLE.size:
+        raise SnapshotError(f"{path} is not a CBA snapshot")
+    magic, version, header_len = _PREAMBLE.unpack(mm[:_PREAMBLE.size].tobytes())
+    if magic != SNAPSHOT_MAGIC:
+        raise SnapshotError(f"{path} is not a CBA snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"{path} has snapshot version {version}, expected {SNAPSHOT_VERSION}")
+
+    header = json.loads(mm[_PREAMBLE.size:_PREAMBLE.size + header_len].tobytes().decode("utf-8"))
+    data_start = _align(_PREAMBLE.size + header_len)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+        array = np.frombuffer(mm, dtype=dtype, count=count, offset=data_start + spec["offset"])
+        arrays[name] = array.reshape(spec["shape"])
+    return arrays
+
+
+def load_snapshot(path):
+    arrays = open_snapshot(path)
+    strings = SnapshotStrings(arrays["strings_data"], arrays["strings_offsets"])
+
+    names = [strings[i] for i in arrays["asset_name"].tolist()]
+    area_column = arrays["asset_area"]
+    text_columns = {field: arrays["asset_" + field] for field in TEXT_FIELDS}
+    list_columns = {field: (arrays[field + "_indptr"], arrays[field + "_ids"]) for field in LIST_FIELDS}
+
+    # Asset records are decoded from the mapped columns only when first looked at
+    def record_factory(i):
+        data = {"area": strings[int(area_column[i])]}
+        for field in TEXT_FIELDS:
+            data[field] = strings[int(text_columns[field][i])]
+        for field, (indptr, ids) in list_columns.items():
+            data[field] = [strings[s] for s in ids[indptr[i]:indptr[i + 1]].tolist()]
+        return AssetRecord.from_dict(data)
+
+    store = GraphStore.from_arrays(names, arrays["adj_indptr"], arrays["adj_indices"], record_factory)
+    store.duplicate_edges = {(s, t): count for s, t, count in zip(arrays["duplicate_src"].tolist(),
+                                                                   arrays["duplicate_dst"].tolist(),
+                                                                   arrays["duplicate_count"].tolist())}
+    model = CBAModel(store)
+
+    areas = [strings[i] for i in arrays["area_name"].tolist()]
+    area_indptr = arrays["area_indptr"]
+    area_members = arrays["area_members"]
+    model.overview_G.add_nodes_from(areas)
+    for i, area in enumerate(areas):
+        members = area_members[area_indptr[i]:area_indptr[i + 1]]
+        model.functional_areas[area] = [names[m] for m in members.tolist()]
+        model._area_ids[area] = members
+    with span("overview load"):
+        model.overview_G.add_weighted_edges_from(
+            (areas[s], areas[t], w) for s, t, w in zip(arrays["overview_src"].tolist(), arrays["overview_dst"].tolist(),
+                                                       arrays["overview_weight"].tolist()))
+
+    layouts = {}
+    layout_indptr = arrays["layout_indptr"].tolist()
+    layout_nodes = arrays["layout_nodes"]
+    layout_xy = arrays["layout_xy"]
+    for i, (area_id, hash_id) in enumerate(zip(arrays["layout_area"].tolist(), arrays["layout_hash"].tolist())):
+        start, end = layout_indptr[i], layout_indptr[i + 1]
+        layouts[(strings[area_id], strings[hash_id])] = {
+            strings[n]: np.array(xy) for n, xy in zip(layout_nodes[start:end].tolist(), layout_xy[start:end])
+        }
+
+    return model, layouts
@@ -0,0 +1,175 @@
+import numpy as np
+
+from cba_model import load_model
+from graph_store import ASSET_FIELDS
+from snapshot import SNAPSHOT_MAGIC
+
+# Status of each asset in the newer model; removed assets only exist in the older one
+UNCHANGED = 0
+ADDED = 1
+CHANGED = 2
+REWIRED = 3
+REMOVED = 4
+STATUS_NAMES = {UNCHANGED: "unchanged", ADDED: "added", CHANGED: "changed", REWIRED: "rewired", REMOVED: "removed"}
+STATUS_COLORS = {UNCHANGED: "#d9d9d9", ADDED: "#2ca02c", CHANGED: "#ff7f0e", REWIRED: "#1f77b4", REMOVED: "#d62728"}
+
+CONTENT_FIELDS = tuple(field for field in ASSET_FIELDS if field != "area")
+# How many names of each kind the summary lists before eliding the rest
+SUMMARY_LIMIT = 50
+
+
+def load_baseline(path):
+    # A snapshot or a single inventory file, told apart by the snapshot magic
+    with open(path, "rb") as f:
+        is_snapshot = f.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+    model, _ = load_model(None, path) if is_snapshot else load_model([path])
+    return model
+
+
+def record_hashes(store):
+    # One 64-bit hash per asset over every field except the area, which is compared on its own.
+    # Both models are hashed in the same process, so the built-in string hash is consistent.
+    hashes = np.empty(len(store), dtype=np.int64)
+    for i in range(len(store)):
+        record = store.record(i)
+        hashes[i] = hash((record.description, tuple(record.key_features), tuple(record.related_systems),
+                          record.data_flow, record.business_impact))
+    return hashes
+
+
+def _edge_keys(store, to_union, size):
+    src, dst = store.edge_arrays()
+    return np.unique(to_union[src].astype(np.int64) * size + to_union[dst])
+
+
+class ModelDiff:
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+        old_store, new_store = old.store, new.store
+        n_old, n_new = len(old_store), len(new_store)
+
+        # Match assets by name: old_of_new[j] is the old id of new asset j, or -1 if it was added
+        old_ids = old_store.ids
+        self.old_of_new = np.fromiter((old_ids.get(name, -1) for name in new_store.names), dtype=np.int64,
+                                      count=n_new)
+        kept = np.flatnonzero(self.old_of_new >= 0)
+        matched = np.zeros(n_old, dtype=bool)
+        matched[self.old_of_new[kept]] = True
+        self.added = np.flatnonzero(self.old_of_new < 0)
+        self.removed = np.flatnonzero(~matched)
+
+        # Records are compared by hash; only assets whose hashes differ are looked at field by field
+        old_hash = record_hashes(old_store)
+        new_hash = record_hashes(new_store)
+        self.edited = kept[old_hash[self.old_of_new[kept]] != new_hash[kept]]
+        old_area = [old_store.record(i).area for i in self.old_of_new[kept].tolist()]
+        new_area = [new_store.record(j).area for j in kept.tolist()]
+        self.moved = kept[np.fromiter((a != b for a, b in zip(old_area, new_area)), dtype=bool, count=len(kept))]
+
+        # Edges are compared as sorted integer keys in one id space covering both models: new ids,
+        # then the removed assets
+        size = n_new + len(self.removed)
+        new_to_union = np.arange(n_new, dtype=np.int64)
+        old_to_union = np.empty(n_old, dtype=np.int64)
+        old_to_union[self.old_of_new[kept]] = kept
+        old_to_union[self.removed] = n_new + np.arange(len(self.removed))
+        old_keys = _edge_keys(old_store, old_to_union, size)
+        new_keys = _edge_keys(new_store, new_to_union, size)
+        added_keys = new_keys[~np.isin(new_keys, old_keys, assume_unique=True)]
+        removed_keys = old_keys[~np.isin(old_keys, new_keys, assume_unique=True)]
+        union_to_old = np.concatenate([self.old_of_new, self.removed])
+        self.added_edges = np.stack([added_keys // size, added_keys % size], axis=1)
+        self.removed_edges = union_to_old[np.stack([removed_keys // size, removed_keys % size], axis=1)]
+
+        self.status = np.full(n_new, UNCHANGED, dtype=np.int8)
+        rewired_union = np.concatenate([self.added_edges.reshape(-1), removed_keys // size, removed_keys % size])
+        rewired = rewired_union[rewired_union < n_new]
+        self.status[rewired] = REWIRED
+        self.status[self.edited] = CHANGED
+        self.status[self.moved] = CHANGED
+        self.status[self.added] = ADDED
+
+        old_areas, new_areas = set(old.functional_areas), set(new.functional_areas)
+        self.added_areas = sorted(new_areas - old_areas)
+        self.removed_areas = sorted(old_areas - new_areas)
+
+    def is_empty(self):
+        return not (len(self.added) or len(self.removed) or len(self.edited) or len(self.moved) or
+                    len(self.added_edges) or len(self.removed_edges))
+
+    def node_status(self, names):
+        # Status of each named asset of the newer model. Assets the model gained after the diff was
+        # taken (e.g. from a live feed) count as unchanged until it is recomputed.
+        ids = self.new.store.ids
+        n = len(self.status)
+        return np.asarray([self.status[i] if 0 <= i < n else UNCHANGED
+                           for i in (ids.get(name, -1) for name in names)], dtype=np.int8)
+
+    def area_status(self):
+        # Per area of the newer model: added, changed if anything in or out of it changed, else unchanged
+        store = self.new.store
+        status = {area: UNCHANGED for area in self.new.functional_areas}
+        touched = {store.record(j).area for j in np.flatnonzero(self.status != UNCHANGED).tolist()}
+        touched.update(self.old.store.record(i).area for i in self.removed.tolist())
+        touched.update(self.old.store.record(i).area for i in self.old_of_new[self.moved].tolist())
+        for area in touched:
+            if area in status:
+                status[area] = CHANGED
+        for area in self.added_areas:
+            status[area] = ADDED
+        return status
+
+    def removed_in(self, area):
+        # Names of removed assets that belonged to area in the older model ("Overview" and
+        # "All Assets" cover every area)
+        store = self.old.store
+        if area == "All Assets":
+            return [store.names[i] for i in self.removed.tolist()]
+        if area == "Overview":
+            return list(self.removed_areas)
+        return [store.names[i] for i in self.removed.tolist() if store.record(i).area == area]
+
+    def old_neighbours(self, name, overview=False):
+        # Neighbours of a removed asset (or, in the overview, a removed area) in the older model
+        if overview:
+            graph = self.old.overview_G
+            return list(set(graph.successors(name)) | set(graph.predecessors(name)))
+        store = self.old.store
+        node_id = store.ids[name]
+        ids = set(store.successors(node_id).tolist()) | set(store.predecessors(node_id).tolist())
+        return [store.names[i] for i in ids]
+
+    def changed_fields(self, name):
+        old = self.old.store.record(self.old.store.ids[name])
+        new = self.new.store.record(self.new.store.ids[name])
+        return [field for field in ("area",) + CONTENT_FIELDS if old[field] != new[field]]
+
+    def summary(self):
+        old_store, new_store = self.old.store, self.new.store
+        old_names, new_names = old_store.names, new_store.names
+
+        def listing(title, ids, describe):
+            lines = [f"{title}: {len(ids)}"]
+            lines += [f"- {describe(item)}" for item in ids[:SUMMARY_LIMIT].tolist()]
+            if len(ids) > SUMMARY_LIMIT:
+                lines.append(f"... and {len(ids) - SUMMARY_LIMIT} more")
+            return "\n".join(lines) + "\n\n"
+
+        details = (f"Assets: {len(old_store)} -> {len(new_store)}, "
+                   f"edges: {self.old.number_of_edges()} -> {self.new.number_of_edges()}\n\n")
+        if self.is_empty():
+            return details + "No differences."
+        details += listing("Added assets", self.added, lambda j: new_names[j])
+        details += listing("Removed assets", self.removed, lambda i: old_names[i])
+        details += listing("Reassigned areas", self.moved,
+                           lambda j: f"{new_names[j]}: {old_store.record(int(self.old_of_new[j])).area} -> "
+                                     f"{new_store.record(j).area}")
+        details += listing("Edited assets", self.edited,
+                           lambda j: f"{new_names[j]} ({', '.join(self.changed_fields(new_names[j]))})")
+        details += listing("Added edges", self.added_edges, lambda e: f"{new_names[e[0]]} -> {new_names[e[1]]}")
+        details += listing("Removed edges", self.removed_edges, lambda e: f"{old_names[e[0]]} -> {old_names[e[1]]}")
+        if self.added_areas or self.removed_areas:
+            details += f"New areas: {', '.join(self.added_areas) or 'none'}\n"
+            details += f"Removed areas: {', '.join(self.removed_areas) or 'none'}\n"
+        return details
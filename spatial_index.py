@@ -0,0 +1,56 @@
+import numpy as np
+
+
+class GridIndex:
+    # Uniform grid over 2D points. Points are sorted by cell key so each cell is a contiguous run
+    # found with a binary search; a query only touches the cells overlapping its search box.
+    def __init__(self, xy, points_per_cell=2.0):
+        self.xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        n = len(self.xy)
+        if n == 0:
+            self.lo = np.zeros(2)
+            self.cell = 1.0
+            self.cols = self.rows = 1
+            self.keys = np.zeros(0, dtype=np.int64)
+            self.order = np.zeros(0, dtype=np.int64)
+            return
+        self.lo = self.xy.min(axis=0)
+        span = np.maximum(self.xy.max(axis=0) - self.lo, 1e-9)
+        self.cell = max(float(np.sqrt(span[0] * span[1] * points_per_cell / n)), float(span.max()) / 4096, 1e-9)
+        self.cols = int(span[0] // self.cell) + 1
+        self.rows = int(span[1] // self.cell) + 1
+        cx, cy = self._cells(self.xy)
+        keys = cx * self.rows + cy
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def _cells(self, xy):
+        c = np.floor((xy - self.lo) / self.cell).astype(np.int64)
+        return np.clip(c[:, 0], 0, self.cols - 1), np.clip(c[:, 1], 0, self.rows - 1)
+
+    def query(self, x, y, rx, ry):
+        # Indices of the points inside the axis-aligned ellipse with radii (rx, ry) around (x, y)
+        if len(self.keys) == 0:
+            return np.zeros(0, dtype=np.int64)
+        (x0, x1), (y0, y1) = self._cells(np.array([[x - rx, y - ry], [x + rx, y + ry]]))
+        if x1 < x0 or y1 < y0:
+            return np.zeros(0, dtype=np.int64)
+        # One run of keys per grid column; its rows y0..y1 are contiguous in the sort order
+        cols = np.arange(x0, x1 + 1)
+        starts = np.searchsorted(self.keys, cols * self.rows + y0, side="left")
+        stops = np.searchsorted(self.keys, cols * self.rows + y1, side="right")
+        if not (stops > starts).any():
+            return np.zeros(0, dtype=np.int64)
+        candidates = np.concatenate([self.order[a:b] for a, b in zip(starts, stops) if b > a])
+        d = ((self.xy[candidates, 0] - x) / rx) ** 2 + ((self.xy[candidates, 1] - y) / ry) ** 2
+        return candidates[d <= 1.0]
+
+    def nearest(self, x, y, rx, ry, mask=None):
+        # Closest point within the ellipse, optionally restricted to mask[i] True; None if there is none
+        found = self.query(x, y, rx, ry)
+        if mask is not None:
+            found = found[mask[found]]
+        if len(found) == 0:
+            return None
+        d = ((self.xy[found, 0] - x) / rx) ** 2 + ((self.xy[found, 1] - y) / ry) ** 2
+        return int(found[np.argmin(d)])
@@ -0,0 +1,138 @@
+import argparse
+import json
+import re
+import sys
+
+import numpy as np
+
+from cba_model import SAMPLE_ASSETS
+
+# Areas of the real estate; larger estates repeat them as "Sales 2", "Sales 3", ...
+BASE_AREAS = tuple(sorted({data["area"] for data in SAMPLE_ASSETS.values()}))
+# Assets per area once there are more than the base areas can hold
+ASSETS_PER_AREA = 400
+# Mean outgoing integrations per asset before reverse links are added
+MEAN_OUT_DEGREE = 2.0
+# Share of integrations that stay inside the asset's own area
+LOCAL_SHARE = 0.75
+# Share of integrations that also flow back the other way
+BIDIRECTIONAL_SHARE = 0.3
+# Shape of the popularity that decides which assets are integrated with; smaller is more skewed
+POPULARITY_SHAPE = 1.2
+# Most related systems listed on one asset
+MAX_RELATED = 8
+FEATURES = ("Order capture", "Pricing", "Contract management", "Device monitoring", "Usage metering",
+            "Invoicing", "Reporting", "Case routing", "Stock replenishment", "Self-service portal",
+            "Data validation", "Workflow automation", "Audit trail", "Forecasting")
+
+
+def area_names(count):
+    names = list(BASE_AREAS[:count])
+    copy = 2
+    while len(names) < count:
+        names.extend(f"{area} {copy}" for area in BASE_AREAS[:count - len(names)])
+        copy += 1
+    return names
+
+
+def _prefix(area):
+    # "Entitlement, Billing & Invoicing 2" -> "EBI2"
+    words = re.findall(r"[A-Za-z]+|\d+", area)
+    return "".join(word if word.isdigit() else word[0].upper() for word in words)
+
+
+class SyntheticEstate:
+    # An estate shaped like the real one: areas of uneven size, a few heavily integrated hubs and
+    # many assets with one or two links, mostly within their own area, many of them in both
+    # directions. Assets of one area are numbered contiguously.
+    def __init__(self, n_assets, seed=0):
+        rng = np.random.default_rng(seed)
+        self.n_assets = n_assets
+        self.areas = area_names(max(len(BASE_AREAS), -(-n_assets // ASSETS_PER_AREA)))
+        n_areas = min(len(self.areas), n_assets)
+        self.areas = self.areas[:n_areas]
+
+        # Uneven area sizes, every area holding at least one asset
+        share = rng.lognormal(0.0, 0.6, n_areas)
+        sizes = 1 + np.floor(share / share.sum() * (n_assets - n_areas)).astype(np.int64)
+        sizes[np.argsort(-share)[:n_assets - sizes.sum()]] += 1
+        self.area_start = np.concatenate([[0], np.cumsum(sizes)])
+        self.area_of = np.repeat(np.arange(n_areas), sizes)
+        self.names = [f"{_prefix(self.areas[a])}-{i - self.area_start[a]:05d}"
+                      for i, a in enumerate(self.area_of.tolist())]
+
+        # Outgoing integrations per asset, and popularity deciding how often an asset is the target
+        out_degree = rng.poisson(MEAN_OUT_DEGREE - 1, n_assets) + 1
+        popularity = rng.pareto(POPULARITY_SHAPE, n_assets) + 1
+        cumulative = np.cumsum(popularity)
+        src = np.repeat(np.arange(n_assets), out_degree)
+        source_area = self.area_of[src]
+        # Integrations leaving an area mostly go to its neighbours in the business chain
+        step = rng.geometric(0.5, len(src)) * rng.choice([-1, 1], len(src))
+        target_area = np.where(rng.random(len(src)) < LOCAL_SHARE, source_area, (source_area + step) % n_areas)
+        # Pick a target in the chosen area in proportion to popularity
+        low = np.where(self.area_start[target_area] > 0, cumulative[self.area_start[target_area] - 1], 0.0)
+        high = cumulative[self.area_start[target_area + 1] - 1]
+        dst = np.searchsorted(cumulative, low + rng.random(len(src)) * (high - low), side="right")
+        dst = np.minimum(dst, self.area_start[target_area + 1] - 1)
+
+        back = rng.random(len(src)) < BIDIRECTIONAL_SHARE
+        src, dst = np.concatenate([src, dst[back]]), np.concatenate([dst, src[back]])
+        keep = src != dst
+        keys = np.unique(src[keep].astype(np.int64) * n_assets + dst[keep])
+        self.src, self.dst = keys // n_assets, keys % n_assets
+        self.features = rng.integers(0, len(FEATURES), (n_assets, 3))
+
+    def asset_records(self):
+        names = self.names
+        order = np.argsort(self.dst, kind="stable")
+        out_start = np.searchsorted(self.src, np.arange(self.n_assets + 1))
+        in_start = np.searchsorted(self.dst[order], np.arange(self.n_assets + 1))
+        for i, name in enumerate(names):
+            out = self.dst[out_start[i]:out_start[i + 1]].tolist()
+            into = self.src[order[in_start[i]:in_start[i + 1]]].tolist()
+            related = list(dict.fromkeys(out + into))[:MAX_RELATED]
+            area = self.areas[self.area_of[i]]
+            yield {
+                "type": "asset",
+                "name": name,
+                "area": area,
+                "description": f"Synthetic {area} system {name}.",
+                "key_features": sorted({FEATURES[f] for f in self.features[i].tolist()}),
+                "related_systems": [names[j] for j in related],
+                "data_flow": (f"Sends data to {', '.join(names[j] for j in out[:3])}" if out
+                              else "Receives data only"),
+                "business_impact": f"Supports {area} operations",
+            }
+
+    def edge_records(self):
+        names = self.names
+        for s, t in zip(self.src.tolist(), self.dst.tolist()):
+            yield {"type": "edge", "source": names[s], "target": names[t]}
+
+    def write_jsonl(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for record in self.asset_records():
+                f.write(json.dumps(record) + "\n")
+            for record in self.edge_records():
+                f.write(json.dumps(record) + "\n")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Write a synthetic CBA estate as a JSONL inventory")
+    parser.add_argument("assets", type=int, help="Number of assets")
+    parser.add_argument("out", help="Inventory file to write")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: %(default)s)")
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    estate = SyntheticEstate(args.assets, seed=args.seed)
+    estate.write_jsonl(args.out)
+    print(f"Wrote {args.assets} assets in {len(estate.areas)} areas and {len(estate.src)} edges to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,91 @@
+import numpy as np
+
+from cba_model import CBAModel, build_sample_model
+from consistency import (CONSISTENT, DANGLING, DUPLICATE, ONE_SIDED, UNBACKED, UNBACKED_FLOW, UNDECLARED,
+                         ConsistencyReport, check_chunk, name_index)
+from snapshot import load_snapshot, save_snapshot
+
+
+def build_model():
+    # A and B list each other and integrate; everything else has one problem of its own
+    model = CBAModel()
+    assets = {
+        "A": dict(related_systems=["B"]),
+        "B": dict(related_systems=["A"]),
+        "C": dict(related_systems=["A"]),
+        "D": dict(related_systems=["E"]),
+        "E": dict(),
+        "F": dict(related_systems=["Nowhere"]),
+        "G": dict(data_flow="Sends invoices to Order Desk nightly"),
+        "Order Desk": dict(),
+        "H": dict(),
+        "I": dict(),
+    }
+    for name, fields in assets.items():
+        model.add_asset(name, dict(area="Area", **fields))
+    for source, target in [("A", "B"), ("C", "A"), ("H", "I"), ("H", "I")]:
+        model.add_edge(source, target)
+    return model
+
+
+def pairs(report, keys):
+    n = report.n_assets
+    return {(report.names[key // n], report.names[key % n]) for key in keys.tolist()}
+
+
+def test_each_kind_of_problem():
+    report = ConsistencyReport(build_model(), jobs=1)
+    assert report.dangling == [(report.names.index("F"), "Nowhere")]
+    assert report.duplicates == [("H", "I", 2)]
+    assert pairs(report, report.unbacked) == {("D", "E")}
+    assert pairs(report, report.undeclared) == {("H", "I")}
+    assert pairs(report, report.unbacked_flow) == {("G", "Order Desk")}
+    assert pairs(report, report.one_sided) == {("C", "A")}
+    status = dict(zip(report.names, report.status.tolist()))
+    assert status == {"A": ONE_SIDED, "B": CONSISTENT, "C": ONE_SIDED, "D": UNBACKED, "E": UNBACKED,
+                      "F": DANGLING, "G": UNBACKED_FLOW, "Order Desk": UNBACKED_FLOW, "H": DUPLICATE,
+                      "I": DUPLICATE}
+
+
+def test_sample_findings():
+    report = ConsistencyReport(build_sample_model(), jobs=1)
+    assert report.counts() == {"dangling reference": 0, "duplicate edge": 7, "relation without integration": 0,
+                               "undeclared integration": 2, "data flow without integration": 0,
+                               "one-sided relation": 5}
+    assert ("S4", "BRIM", 2) in report.duplicates
+    # Both ends of an undeclared integration show it, unless they have something worse
+    n = report.n_assets
+    ends = np.concatenate([report.undeclared // n, report.undeclared % n])
+    assert (report.status[ends] >= UNDECLARED).all()
+    assert len(list(report.problems())) == 14
+    assert not report.is_empty()
+
+
+def test_mentions_prefer_the_longest_name():
+    names = ["Order", "Order Desk", "Desk", "Billing"]
+    index = name_index(names)
+    rows = [((), "Order Desk feeds Billing"), (("Billing", "Ghost"), "")]
+    related_src, related_dst, mention_src, mention_dst, dangling = check_chunk(0, rows, index)
+    assert mention_src.tolist() == [0, 0] and mention_dst.tolist() == [1, 3]
+    assert related_src.tolist() == [1] and related_dst.tolist() == [3]
+    assert dangling == [(1, "Ghost")]
+
+
+def test_cancel_returns_before_any_findings():
+    report = ConsistencyReport(build_model(), jobs=1, cancel=lambda: True)
+    assert not hasattr(report, "status")
+
+
+def test_node_status_of_assets_added_later():
+    model = build_model()
+    report = ConsistencyReport(model, jobs=1)
+    model.add_asset("J", dict(area="Area"))
+    ids = np.array([model.store.ids["F"], model.store.ids["J"]])
+    assert report.node_status(ids).tolist() == [DANGLING, CONSISTENT]
+
+
+def test_duplicates_survive_a_snapshot(tmp_path):
+    path = str(tmp_path / "sample.cbasnap")
+    save_snapshot(build_sample_model(), path)
+    model, _ = load_snapshot(path)
+    assert ConsistencyReport(model, jobs=1).duplicates == ConsistencyReport(build_sample_model(), jobs=1).duplicates
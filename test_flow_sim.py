@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+import pytest
+
+import flow_sim
+from cba_model import build_sample_model
+from flow_sim import DEFAULT_RATE, FlowParameters, simulate
+
+
+@pytest.mark.parametrize("steps, limit", [(600, 10**9), (600, 25 * 7), (601, 25 * 600), (7, 1)])
+def test_last_step_is_recorded(monkeypatch, steps, limit):
+    model = build_sample_model()
+    monkeypatch.setattr(flow_sim, "MAX_RECORDED_VALUES", limit)
+    params = FlowParameters(model.store)
+    full = simulate(params, steps=steps, dt=0.1)
+    assert full.times[-1] == pytest.approx(steps * 0.1)
+    assert (np.diff(full.times) > 0).all()
+    # The final row is the state after the last step, however thinly the history is recorded
+    monkeypatch.setattr(flow_sim, "MAX_RECORDED_VALUES", 10**9)
+    every_step = simulate(params, steps=steps, dt=0.1)
+    assert np.array_equal(full.queue[-1], every_step.queue[-1])
+    assert np.array_equal(full.utilisation[-1], every_step.utilisation[-1])
+
+
+def test_bad_amounts_are_ignored(tmp_path, capsys):
+    model = build_sample_model()
+    source, target = next(model.edges())
+    rows = [{"name": "DART", "rate": -5}, {"name": "DART", "inject": float("nan")},
+            {"name": "MPC", "rate": float("inf")}, {"source": source, "target": target, "volume": -1},
+            {"name": "TMC", "rate": 0, "inject": 2.5}]
+    path = tmp_path / "flow.jsonl"
+    path.write_text("\n".join(json.dumps(row) for row in rows))
+    params = FlowParameters(model.store).load(str(path))
+    ids = model.store.ids
+    assert params.rate[ids["DART"]] == params.rate[ids["MPC"]] == DEFAULT_RATE
+    assert (params.volume >= 0).all() and np.isfinite(params.inject).all()
+    assert params.rate[ids["TMC"]] == 0 and params.inject[ids["TMC"]] == 2.5
+    assert capsys.readouterr().out.count("ignoring flow parameter") == 4
+    result = simulate(params, steps=50)
+    assert (result.queue >= 0).all() and np.isfinite(result.utilisation).all()
@@ -0,0 +1,141 @@
+import numpy as np
+
+from graph_store import AssetRecord, GraphStore
+
+
+def build_store(n, edges):
+    store = GraphStore()
+    for i in range(n):
+        store.add_node(f"n{i}", AssetRecord(area="a", description=f"asset {i}"))
+    for s, t in edges:
+        store.add_edge(s, t)
+    return store
+
+
+def named_edges(store):
+    src, dst = store.edge_arrays()
+    return {(store.names[s], store.names[t]) for s, t in zip(src.tolist(), dst.tolist())}
+
+
+def check_consistent(store):
+    # ids, names, records and every edge view agree with each other
+    assert len(store.ids) == len(store.names) == len(store.records)
+    for i, name in enumerate(store.names):
+        assert store.ids[name] == i
+        assert store.record(i).description == f"asset {name[1:]}"
+    src, dst = store.edge_arrays()
+    assert len(src) == store.number_of_edges()
+    assert (src < len(store)).all() and (dst < len(store)).all()
+    for s, t in zip(src.tolist(), dst.tolist()):
+        assert store.has_edge(s, t)
+        assert t in store.successors(s)
+        assert s in store.predecessors(t)
+    out, into = store._adjacency()
+    assert sum(map(len, out)) == sum(map(len, into)) == store.number_of_edges()
+
+
+def test_add_node_replaces_record_of_known_name():
+    store = build_store(2, [])
+    assert store.add_node("n1", AssetRecord(area="b")) == 1
+    assert len(store) == 2
+    assert store.record(1).area == "b"
+
+
+def test_duplicate_edges_are_counted_not_stored():
+    store = build_store(3, [(0, 1), (0, 1), (1, 2), (0, 1)])
+    assert store.number_of_edges() == 2
+    assert store.duplicate_edges == {(0, 1): 2}
+    assert not store.add_edge(1, 2)
+    assert store.duplicate_edges == {(0, 1): 2, (1, 2): 1}
+
+
+def test_csr_follows_edge_changes():
+    rng = np.random.default_rng(5)
+    n = 40
+    edges = set(map(tuple, rng.integers(0, n, size=(200, 2)).tolist()))
+    store = build_store(n, edges)
+    # Removing most edges also compacts the edge list on the way
+    for edge in list(edges)[::3] + list(edges)[1::3]:
+        assert store.remove_edge(*edge)
+        edges.discard(edge)
+        assert not store.has_edge(*edge)
+    assert not store.remove_edge(*edge)
+    store.add_edge(*edge)
+    edges.add(edge)
+    assert store.number_of_edges() == len(edges)
+    for node in range(n):
+        assert sorted(store.successors(node).tolist()) == sorted(t for s, t in edges if s == node)
+        assert sorted(store.predecessors(node).tolist()) == sorted(s for s, t in edges if t == node)
+
+
+def test_subgraph_edges_keep_only_edges_inside():
+    store = build_store(5, [(0, 1), (1, 2), (2, 0), (3, 4), (1, 3)])
+    src, dst = store.subgraph_edges(store.id_array(["n2", "n0", "n1"]))
+    assert set(zip(src.tolist(), dst.tolist())) == {(0, 1), (1, 2), (2, 0)}
+    graph = store.to_networkx(store.id_array(["n1", "n3", "n4"]))
+    assert set(graph.edges) == {("n1", "n3"), ("n3", "n4")}
+
+
+def test_from_arrays_builds_records_on_first_access():
+    store = build_store(4, [(0, 1), (0, 3), (2, 1), (3, 3)])
+    indptr, indices = store.csr()
+    built = []
+
+    def record_factory(i):
+        built.append(i)
+        return AssetRecord(area="a", description=f"asset {i}")
+
+    copy = GraphStore.from_arrays(list(store.names), indptr, indices, record_factory)
+    assert named_edges(copy) == named_edges(store)
+    assert copy.record(2).description == "asset 2" and built == [2]
+    copy.record(2)
+    assert built == [2]
+    assert copy.add_edge(1, 0) and not copy.add_edge(0, 3)
+
+
+def test_remove_node_moves_last_node_into_freed_id():
+    store = build_store(4, [(0, 1), (1, 2), (3, 0), (2, 3), (3, 3)])
+    store.incident_edges(0)
+    assert store.remove_node(1) == 3
+    assert store.names == ["n0", "n3", "n2"]
+    assert named_edges(store) == {("n3", "n0"), ("n2", "n3"), ("n3", "n3")}
+    check_consistent(store)
+
+
+def test_remove_last_node_moves_nothing():
+    store = build_store(3, [(0, 2), (2, 1)])
+    assert store.remove_node(2) is None
+    assert store.names == ["n0", "n1"]
+    assert store.number_of_edges() == 0
+    check_consistent(store)
+
+
+def test_remove_node_remaps_duplicate_edges():
+    store = build_store(3, [(2, 0), (2, 0), (1, 2), (1, 2), (1, 2)])
+    assert store.duplicate_edges == {(2, 0): 1, (1, 2): 2}
+    store.remove_node(1)
+    # n2 now has id 1; its duplicate with n1 went with n1
+    assert store.duplicate_edges == {(1, 0): 1}
+
+
+def test_random_removals_match_a_name_level_model():
+    rng = np.random.default_rng(7)
+    n = 60
+    edges = set(map(tuple, rng.integers(0, n, size=(240, 2)).tolist()))
+    store = build_store(n, edges)
+    expected = {(f"n{s}", f"n{t}") for s, t in edges}
+    while len(store) > 1:
+        node_id = int(rng.integers(len(store)))
+        name = store.names[node_id]
+        last = store.names[-1]
+        moved = store.remove_node(node_id)
+        if name == last:
+            assert moved is None
+        else:
+            assert moved == len(store)
+            assert store.ids[last] == node_id
+        expected = {(s, t) for s, t in expected if name not in (s, t)}
+        assert named_edges(store) == expected
+        check_consistent(store)
+        indptr, indices = store.csr()
+        assert indptr[-1] == len(indices) == len(expected)
@@ -0,0 +1,57 @@
+import networkx as nx
+import numpy as np
+import pytest
+
+from graph_store import AssetRecord, GraphStore
+from reachability import ReachabilityIndex
+
+
+def random_store(n, m, seed):
+    rng = np.random.default_rng(seed)
+    store = GraphStore()
+    for i in range(n):
+        store.add_node(f"n{i}", AssetRecord(area="a"))
+    for s, t in rng.integers(0, n, size=(m, 2)).tolist():
+        store.add_edge(s, t)
+    return store
+
+
+def id_graph(store):
+    G = nx.DiGraph()
+    G.add_nodes_from(range(len(store)))
+    src, dst = store.edge_arrays()
+    G.add_edges_from(zip(src.tolist(), dst.tolist()))
+    return G
+
+
+# Sparse graphs have many small components, dense ones a few large cycles; a closure limit of 0
+# answers every query by searching the component DAG instead of the bitset closure
+@pytest.mark.parametrize("n, m, seed", [(80, 60, 1), (80, 120, 2), (120, 400, 3)])
+@pytest.mark.parametrize("closure_limit", [0, 10_000])
+def test_queries_match_networkx(n, m, seed, closure_limit):
+    store = random_store(n, m, seed)
+    G = id_graph(store)
+    index = ReachabilityIndex(store, closure_limit=closure_limit)
+    assert (index.closure is None) == (closure_limit == 0)
+    for node in range(n):
+        assert set(index.downstream(node).tolist()) == nx.descendants(G, node)
+        assert set(index.upstream(node).tolist()) == nx.ancestors(G, node)
+    rng = np.random.default_rng(seed)
+    for s, t in rng.integers(0, n, size=(300, 2)).tolist():
+        assert index.reaches(s, t) == nx.has_path(G, s, t)
+        path = index.shortest_path(s, t)
+        if not nx.has_path(G, s, t):
+            assert path is None
+            continue
+        assert path[0] == s and path[-1] == t
+        assert len(path) == nx.shortest_path_length(G, s, t) + 1
+        assert all(G.has_edge(a, b) for a, b in zip(path, path[1:]))
+
+
+def test_components_match_networkx():
+    store = random_store(100, 180, 4)
+    G = id_graph(store)
+    index = ReachabilityIndex(store)
+    for component in nx.strongly_connected_components(G):
+        assert len({int(index.component[node]) for node in component}) == 1
+    assert index.n_components == nx.number_strongly_connected_components(G)
@@ -0,0 +1,87 @@
+from cba_model import CBAModel, build_sample_model
+
+
+def asset(area, description="", **fields):
+    return dict(area=area, description=description, **fields)
+
+
+def build_model():
+    model = CBAModel()
+    model.add_asset("Payments Hub", asset("Payments", "Clears card payments", key_features=["settlement"]))
+    model.add_asset("Ledger", asset("Finance", "General ledger postings"))
+    model.add_asset("Card Vault", asset("Payments", "Tokenised card storage"))
+    model.add_asset("Statement Printer", asset("Finance", "Prints monthly statements"))
+    return model
+
+
+def found(model, query):
+    top, matched = model.search_index().search(query)
+    names = model.store.names
+    assert set(top.tolist()) == set(matched.tolist())
+    return {names[i] for i in matched.tolist()}
+
+
+def test_search_frozen_index():
+    model = build_model()
+    assert found(model, "card") == {"Payments Hub", "Card Vault"}
+    assert found(model, "settlement") == {"Payments Hub"}
+    # The last token is a prefix, earlier ones must match whole
+    assert found(model, "led") == {"Ledger"}
+    assert found(model, "card stor") == {"Card Vault"}
+    assert found(model, "") == set()
+
+
+def test_name_ranks_above_description():
+    model = build_model()
+    top, _ = model.search_index().search("card")
+    assert model.store.names[top[0]] == "Card Vault"
+
+
+def test_updated_text_replaces_frozen_text():
+    model = build_model()
+    index = model.search_index()
+    model.add_asset("Ledger", asset("Finance", "Posts card chargebacks"))
+    assert model.search_index() is index
+    assert found(model, "card") == {"Payments Hub", "Card Vault", "Ledger"}
+    assert found(model, "general") == set()
+    assert found(model, "chargebacks") == {"Ledger"}
+
+
+def test_added_asset_is_found():
+    model = build_model()
+    model.search_index()
+    model.add_asset("Fraud Scorer", asset("Risk", "Scores card payments"))
+    assert found(model, "fraud") == {"Fraud Scorer"}
+    assert found(model, "card pay") == {"Payments Hub", "Card Vault", "Fraud Scorer"}
+
+
+def test_removed_asset_is_gone_and_moved_asset_found():
+    model = build_model()
+    model.search_index()
+    model.add_asset("Fraud Scorer", asset("Risk", "Scores card payments"))
+    # Removing the first asset moves the last (overlay) asset into its id, then a frozen one
+    model.remove_asset("Payments Hub")
+    assert found(model, "card") == {"Card Vault", "Fraud Scorer"}
+    assert found(model, "settlement") == set()
+    model.remove_asset("Ledger")
+    assert found(model, "statements") == {"Statement Printer"}
+    assert found(model, "ledger") == set()
+    assert found(model, "fraud") == {"Fraud Scorer"}
+
+
+def test_overlay_matches_rebuilt_index():
+    model = build_sample_model()
+    index = model.search_index()
+    names = list(model.store.names)
+    for name in names[::3]:
+        model.remove_asset(name)
+    for name in names[1::4]:
+        if name in model.store:
+            record = model.assets[name].to_dict()
+            record["description"] += " migrated"
+            model.add_asset(name, record)
+    queries = ["migrated", "data", "customer", "account", "fleet design", "man"]
+    overlay = [(q, found(model, q)) for q in queries]
+    assert overlay[0][1]
+    index.build()
+    assert overlay == [(q, found(model, q)) for q in queries]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from cba_model import build_sample_model
+from snapshot import _PREAMBLE, SNAPSHOT_VERSION, SnapshotError, load_snapshot, save_snapshot
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "sample.cbasnap")
+    model = build_sample_model()
+    model.add_edge("DART", "Portico")
+    model.add_edge("DART", "Portico")
+    layouts = {("Overview", "abc"): {"Pre-Sales": np.array([0.5, -1.0])}}
+    save_snapshot(model, path, layouts)
+    loaded, loaded_layouts = load_snapshot(path)
+
+    assert loaded.store.names == model.store.names
+    assert set(loaded.edges()) == set(model.edges())
+    for name, record in model.assets.items():
+        assert loaded.assets[name].to_dict() == record.to_dict()
+    assert loaded.functional_areas == model.functional_areas
+    assert sorted(loaded.overview_G.edges(data="weight")) == sorted(model.overview_G.edges(data="weight"))
+    assert loaded.store.duplicate_edges == model.store.duplicate_edges
+    ids = model.store.ids
+    assert loaded.store.duplicate_edges[(ids["DART"], ids["Portico"])] == 1
+    assert loaded_layouts.keys() == layouts.keys()
+    assert loaded_layouts[("Overview", "abc")]["Pre-Sales"].tolist() == [0.5, -1.0]
+
+
+def test_other_versions_are_refused(tmp_path):
+    path = str(tmp_path / "old.cbasnap")
+    save_snapshot(build_sample_model(), path)
+    with open(path, "r+b") as f:
+        magic, _, header_len = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+        f.seek(0)
+        f.write(_PREAMBLE.pack(magic, SNAPSHOT_VERSION - 1, header_len))
+    with pytest.raises(SnapshotError, match="snapshot version"):
+        load_snapshot(path)